@@ -29,6 +29,8 @@ export class AliyunASRService {
   private audioDataCallback: ((data: Uint8Array) => void) | null = null
   private audioDataBuffer: number[] = [] // 音频数据缓冲区（参考 DemoXunfei2.vue）
   private sendInterval: number | null = null // 发送定时器（参考 DemoXunfei2.vue）
+  private currentSentence = 0 // 当前转写句序号
+  private currentSentenceText = '' // 当前句已还原的中间结果文本
 
   constructor(serverUrl = '') {
     // 如果没有提供serverUrl，使用当前域名
@@ -50,6 +52,36 @@ export class AliyunASRService {
     }
   }
 
+  /**
+   * 还原转写文本：服务端对中间结果只推送增量（base + delta），
+   * 每句的第一条、关键帧和最终结果带完整文本
+   * @returns 当前句的完整文本；缺少基准文本（如中途加入）时返回 null，等待下一个关键帧
+   */
+  private applyTranscriptUpdate(data: {
+    text?: string
+    sentence?: number
+    base?: number
+    delta?: string
+    is_final?: boolean
+  }): string | null {
+    const sentence = data.sentence ?? this.currentSentence
+    if (data.text !== undefined) {
+      this.currentSentence = sentence
+      this.currentSentenceText = data.is_final ? '' : data.text
+      if (data.is_final) this.currentSentence = sentence + 1
+      return data.text
+    }
+    if (
+      data.delta === undefined ||
+      sentence !== this.currentSentence ||
+      (data.base ?? 0) > this.currentSentenceText.length
+    ) {
+      return null
+    }
+    this.currentSentenceText = this.currentSentenceText.slice(0, data.base ?? 0) + data.delta
+    return this.currentSentenceText
+  }
+
   /**
    * 设置WebSocket事件监听
    */
@@ -74,15 +106,20 @@ export class AliyunASRService {
 
     this.socket.on('transcript_update', (data: {
       meeting_id: string
-      text: string
+      text?: string
+      sentence?: number
+      base?: number
+      delta?: string
       is_final?: boolean
       timestamp?: number
       confidence?: number
       speaker?: string
     }) => {
+      const text = this.applyTranscriptUpdate(data)
+      if (text === null) return
       if (this.onResultCallback) {
         const result: RecognitionResult = {
-          text: data.text,
+          text,
           isFinal: data.is_final ?? false,
           timestamp: data.timestamp ?? Date.now(),
           confidence: data.confidence,
@@ -349,10 +386,12 @@ export class AliyunASRService {
         try {
           // 通过 Socket.IO 发送音频数据到后端（后端会转发到阿里云）
           if (this.meetingId) {
+            // 默认上传 16kHz PCM；浏览器未按 16kHz 创建 AudioContext 时带上实际采样率，由后端重采样
             this.socket.emit('audio_data', {
               meeting_id: this.meetingId,
               audio_data: base64,
               format: 'pcm',
+              sample_rate: this.audioContext?.sampleRate ?? 16000,
             })
           }
 
@@ -317,3 +317,78 @@ export async function downloadSummary(meetingId: string): Promise<void> {
   document.body.removeChild(a)
 }
 
+
+export type MeetingExportPart = 'summary' | 'transcripts' | 'documents'
+
+export interface MeetingExportFilter {
+  date_from?: string // YYYY-MM-DD
+  date_to?: string // YYYY-MM-DD（包含当天）
+  subject?: string
+  grade?: string
+  parts?: MeetingExportPart[]
+}
+
+/**
+ * 批量导出会议（总结Word、转写记录、备课资料摘要打包为zip）
+ */
+export async function exportMeetings(filter: MeetingExportFilter = {}): Promise<void> {
+  const token = localStorage.getItem('access_token')
+  const headers: HeadersInit = {}
+
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`
+  }
+
+  const params = new URLSearchParams()
+  if (filter.date_from) params.set('date_from', filter.date_from)
+  if (filter.date_to) params.set('date_to', filter.date_to)
+  if (filter.subject) params.set('subject', filter.subject)
+  if (filter.grade) params.set('grade', filter.grade)
+  if (filter.parts?.length) params.set('parts', filter.parts.join(','))
+
+  const response = await fetch(`${API_BASE_URL}/api/meetings/export?${params.toString()}`, {
+    method: 'GET',
+    headers: headers,
+  })
+
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.message || '批量导出会议失败')
+  }
+
+  const contentDisposition = response.headers.get('Content-Disposition')
+  const filenameMatch = contentDisposition?.match(/filename="?([^";]+)"?/)
+  const filename = filenameMatch?.[1] || 'meetings_export.zip'
+
+  const blob = await response.blob()
+  const url = window.URL.createObjectURL(blob)
+  const a = document.createElement('a')
+  a.href = url
+  a.download = filename
+  document.body.appendChild(a)
+  a.click()
+  window.URL.revokeObjectURL(url)
+  document.body.removeChild(a)
+}
+
+/**
+ * 获取服务端预先排版的思维导图 SVG（没有思维导图或请求失败时返回 null）
+ */
+export async function getMindMapSvg(meetingId: string): Promise<string | null> {
+  const token = localStorage.getItem('access_token')
+  const headers: HeadersInit = {}
+
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/meetings/${meetingId}/summary/mind-map?format=svg`, {
+    method: 'GET',
+    headers: headers,
+  })
+
+  if (!response.ok) {
+    return null
+  }
+  return response.text()
+}
@@ -23,8 +23,15 @@ export interface SearchResult {
   data: RelatedMaterial[]
 }
 
-/** 搜索引擎：谷歌 | 百度 */
-export type SearchEngine = 'google' | 'baidu'
+/** 搜索引擎：谷歌 | 百度 | 同时搜索 */
+export type SearchEngine = 'google' | 'baidu' | 'both'
+
+/** 流式搜索事件 */
+export type RelatedMaterialsEvent =
+  | { type: 'keyword'; keyword: string; message?: string }
+  | { type: 'results'; engine: string; data: RelatedMaterial[] }
+  | { type: 'tags'; engine: string; data: Array<{ url: string; tags: string[] }> }
+  | { type: 'error'; message: string }
 
 /**
  * 根据对话内容搜索网络资料
@@ -64,3 +71,59 @@ export async function searchRelatedMaterials(
     data: result.data || [],
   }
 }
+
+/**
+ * 根据对话内容搜索网络资料（SSE 流式）
+ * 关键词、每个搜索引擎的结果、标签依次推送，结果先以默认标签展示，标签完成后更新
+ * @param messages 对话消息
+ * @param engine 搜索引擎，默认百度
+ * @param onEvent 事件回调
+ */
+export async function streamRelatedMaterials(
+  messages: Array<{ role: 'user' | 'assistant'; content: string }>,
+  engine: SearchEngine,
+  onEvent: (event: RelatedMaterialsEvent) => void,
+): Promise<void> {
+  const token = localStorage.getItem('access_token')
+  if (!token) {
+    throw new Error('未登录')
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/related-materials/search/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${token}`,
+    },
+    body: JSON.stringify({ messages, engine }),
+  })
+
+  if (!response.ok || !response.body) {
+    const result = await response.json().catch(() => ({}))
+    throw new Error(result.message || '搜索网络资料失败')
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop() || ''
+
+    for (const line of lines) {
+      if (!line.startsWith('data: ')) continue
+      const data = line.slice(6)
+      if (data === '[DONE]') return
+      try {
+        onEvent(JSON.parse(data) as RelatedMaterialsEvent)
+      } catch (parseError) {
+        console.warn('[网络资料] 解析SSE数据失败:', data, parseError)
+      }
+    }
+  }
+}
@@ -19,11 +19,15 @@ app = Flask(__name__)
 app.config.from_object(Config)
 # 配置JSON响应不使用ASCII编码，确保中文正确显示
 app.config['JSON_AS_ASCII'] = False
+# JSON 编解码（安装了 orjson 时使用 orjson，否则使用标准库）
+from utils.fast_json import FastJSONProvider, configure as configure_json
+app.logger.info(f"JSON 引擎: {configure_json(Config.JSON_ENGINE)}")
+app.json = FastJSONProvider(app)
 
 # 启用CORS
 CORS(app)
 
-# 初始化数据库（自动创建表和字段）
+# 初始化数据库（创建缺失的表，在数据库锁内执行待应用的迁移）
 from database import init_db
 init_db(app)
 
@@ -37,7 +41,7 @@ from services.websocket_service import init_socketio
 socketio = init_socketio(app)
 
 # 导入路由
-from routes import meeting_bp, health_bp, auth_bp, summary_bp, ai_chat_bp, tts_bp, related_materials_bp
+from routes import meeting_bp, health_bp, auth_bp, summary_bp, ai_chat_bp, tts_bp, related_materials_bp, search_bp
 from routes.teacher import teacher_bp
 from routes.document import document_bp
 from routes.tytingwu import tytingwu_bp
@@ -69,6 +73,7 @@ app.register_blueprint(summary_bp, url_prefix='/api/summary')
 app.register_blueprint(ai_chat_bp, url_prefix='/api/ai-chat')
 app.register_blueprint(tts_bp, url_prefix='/api/tts')
 app.register_blueprint(related_materials_bp, url_prefix='/api/related-materials')
+app.register_blueprint(search_bp, url_prefix='/api/search')
 
 # 配置文件上传大小限制（50MB）
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
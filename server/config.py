@@ -44,6 +44,7 @@ class Config:
     HOST = os.getenv('FLASK_HOST', '0.0.0.0')
     # 默认使用5001端口，避免与macOS AirPlay Receiver冲突
     PORT = int(os.getenv('FLASK_PORT', 5001))
+    JSON_ENGINE = os.getenv('JSON_ENGINE', 'auto').lower()  # JSON 编解码：auto（安装了 orjson 时使用）| orjson | stdlib
     
     # JWT配置
     JWT_SECRET_KEY = SECRET_KEY
@@ -60,6 +61,17 @@ class Config:
     TYTINGWU_API_ENDPOINT = 'tingwu.cn-beijing.aliyuncs.com'
     TYTINGWU_API_VERSION = '2023-09-30'
     TYTINGWU_REGION = 'cn-beijing'
+    TYTINGWU_AUDIO_FORMAT = os.getenv('TYTINGWU_AUDIO_FORMAT', 'pcm')  # 实时任务默认音频格式（上传音频在服务端转换为该格式）
+    TYTINGWU_SAMPLE_RATE = int(os.getenv('TYTINGWU_SAMPLE_RATE', 16000))  # 实时任务默认采样率
+    
+    # 实时音频语音活动检测（静默段不发送给通义听悟，需要 numpy）
+    AUDIO_VAD_ENABLED = os.getenv('AUDIO_VAD_ENABLED', 'false').lower() == 'true'
+    AUDIO_VAD_FRAME_MS = int(os.getenv('AUDIO_VAD_FRAME_MS', 20))  # 检测帧长（毫秒）
+    AUDIO_VAD_ENERGY_DB = float(os.getenv('AUDIO_VAD_ENERGY_DB', -45))  # 语音能量阈值（dBFS）
+    AUDIO_VAD_ZCR_MAX = float(os.getenv('AUDIO_VAD_ZCR_MAX', 0.35))  # 语音帧最大过零率（更高视为噪声）
+    AUDIO_VAD_HANGOVER_MS = int(os.getenv('AUDIO_VAD_HANGOVER_MS', 600))  # 语音结束后继续发送的时长，避免截断句尾
+    AUDIO_VAD_PREROLL_MS = int(os.getenv('AUDIO_VAD_PREROLL_MS', 200))  # 语音开始时补发的时长，避免截断句首
+    AUDIO_VAD_KEEPALIVE_MS = int(os.getenv('AUDIO_VAD_KEEPALIVE_MS', 1000))  # 静默期间保活帧间隔
     
     # 阿里云智能语音交互（语音合成TTS）配置
     # 注意：语音合成需要使用智能语音交互服务的AppKey，可能与通义听悟不同
@@ -72,7 +84,64 @@ class Config:
 
     # SerpApi 搜索（网络资料，支持谷歌/百度）https://serpapi.com/search-api
     SERPAPI_API_KEY = os.getenv('SERPAPI_API_KEY')
+    RELATED_MATERIALS_KEYWORD_ENGINE = os.getenv('RELATED_MATERIALS_KEYWORD_ENGINE', 'local').lower()  # 关键词提取：local | llm
+    RELATED_MATERIALS_KEYWORD_LLM_FALLBACK = os.getenv('RELATED_MATERIALS_KEYWORD_LLM_FALLBACK', 'true').lower() == 'true'  # 本地提取不足时回退到大模型
+    RELATED_MATERIALS_TAG_LLM_REFINE = os.getenv('RELATED_MATERIALS_TAG_LLM_REFINE', 'false').lower() == 'true'  # 本地未能分类的资料交给大模型打标签
+    RELATED_MATERIALS_TAG_SIMILARITY = float(os.getenv('RELATED_MATERIALS_TAG_SIMILARITY', 0.45))  # 向量最近质心分类的最低相似度
+    RELATED_MATERIALS_KEYWORD_TTL = float(os.getenv('RELATED_MATERIALS_KEYWORD_TTL', 600))  # 关键词缓存有效期（秒）
+    RELATED_MATERIALS_SEARCH_TTL = float(os.getenv('RELATED_MATERIALS_SEARCH_TTL', 1800))  # 搜索结果缓存有效期（秒）
+
+    # AI 对话上下文预算（估算的 token 数）
+    AI_CHAT_TOKEN_BUDGET = int(os.getenv('AI_CHAT_TOKEN_BUDGET', 6000))  # 单次提示词总预算
+    AI_CHAT_RECENT_TURNS = int(os.getenv('AI_CHAT_RECENT_TURNS', 6))  # 原样保留的最近对话轮数
+    AI_CHAT_DIGEST_TOKENS = int(os.getenv('AI_CHAT_DIGEST_TOKENS', 800))  # 较早对话滚动摘要的预算
+
+    # AI 对话备课资料检索
+    AI_CHAT_RETRIEVAL_TOP_K = int(os.getenv('AI_CHAT_RETRIEVAL_TOP_K', 5))  # 放入提示词的相关片段数量
+    AI_CHAT_PASSAGE_CHARS = int(os.getenv('AI_CHAT_PASSAGE_CHARS', 300))  # 单个片段的最大字符数
+    AI_CHAT_EMBEDDING_MODEL = os.getenv('AI_CHAT_EMBEDDING_MODEL', '')  # 本地向量模型（可选，如 BAAI/bge-small-zh-v1.5）
+    AI_CHAT_EMBEDDING_WEIGHT = float(os.getenv('AI_CHAT_EMBEDDING_WEIGHT', 0.5))  # 向量相似度在混合得分中的权重
+
+    # AI 对话回答缓存
+    AI_CHAT_CACHE_ENABLED = os.getenv('AI_CHAT_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CHAT_CACHE_TTL = float(os.getenv('AI_CHAT_CACHE_TTL', 3600))  # 缓存有效期（秒）
+    AI_CHAT_CACHE_MAX_ENTRIES = int(os.getenv('AI_CHAT_CACHE_MAX_ENTRIES', 1024))  # 最多缓存的回答数量
+    AI_CHAT_CACHE_SIMILARITY = float(os.getenv('AI_CHAT_CACHE_SIMILARITY', 0.92))  # 语义命中的相似度阈值（需配置向量模型）
+
+    # 多进程部署：Socket.IO 消息队列（如 redis://redis:6379/0），为空时为单进程模式
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    REALTIME_OWNER_TTL = int(os.getenv('REALTIME_OWNER_TTL', 60))  # 通义听悟连接所有权有效期（秒）
+    REALTIME_RECORD_DIR = os.getenv('REALTIME_RECORD_DIR', '')  # 实时转写会话录制目录（为空不录制，用于压测回放）
+
+    # 实时转写广播
+    TRANSCRIPT_COALESCE_MS = int(os.getenv('TRANSCRIPT_COALESCE_MS', 100))  # 中间结果合并帧（毫秒）
+    TRANSCRIPT_KEYFRAME_INTERVAL = int(os.getenv('TRANSCRIPT_KEYFRAME_INTERVAL', 10))  # 每隔多少条增量推送一次完整文本
+
+    # 大模型调用网关
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))  # 同时进行的大模型调用上限
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 30))  # 排队超时（秒）
+    LLM_CALL_TIMEOUT = float(os.getenv('LLM_CALL_TIMEOUT', 120))  # 单次调用超时（秒）
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))  # 限流时的最大重试次数
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 1.0))  # 限流重试的基础退避时间（秒）
+
+    # 会议总结Word导出：template（模板流式写入，默认）或 python-docx（逐段构建）
+    SUMMARY_DOCX_ENGINE = os.getenv('SUMMARY_DOCX_ENGINE', 'template')
+    BULK_EXPORT_WORKERS = int(os.getenv('BULK_EXPORT_WORKERS', 4))  # 批量导出时并发生成条目的线程数
     
+    # 会议全文检索（MySQL 使用 ngram 全文索引，其他数据库回退到 LIKE）
+    SEARCH_SEGMENT_CHARS = int(os.getenv('SEARCH_SEGMENT_CHARS', 300))  # 检索片段的最大字符数
+    SEARCH_INDEX_DELAY = float(os.getenv('SEARCH_INDEX_DELAY', 30))  # 转写记录、备课资料更新后延迟索引（秒，期间多次更新合并）
+
+    # 会议归档（已完成且长期未更新的会议：转写文本、资料解析内容和上传文件移入压缩归档文件，访问时恢复）
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))  # 会议最后更新多少天后归档
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '')  # 归档文件目录（为空时使用 uploads/archive）
+    ARCHIVE_CODEC = os.getenv('ARCHIVE_CODEC', 'auto').lower()  # 压缩格式：auto（安装了 zstandard 时使用 zstd）| zstd | gzip
+
+    # 数据库迁移（版本化迁移，多进程同时启动时通过数据库锁只执行一次）
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'  # 启动时执行待应用的迁移（关闭后需手动执行 scripts/migrate_db.py）
+    MIGRATION_LOCK_TIMEOUT = int(os.getenv('MIGRATION_LOCK_TIMEOUT', 600))  # 等待其他进程完成迁移的最长时间（秒）
+    MIGRATION_ALLOW_BLOCKING_DDL = os.getenv('MIGRATION_ALLOW_BLOCKING_DDL', 'false').lower() == 'true'  # 无法在线执行的 DDL 是否允许锁表执行
+
     @staticmethod
     def print_config():
         """打印配置信息（用于调试，隐藏敏感信息）"""
@@ -0,0 +1,55 @@
+"""补齐此前由启动时自动补字段添加的可选字段
+
+启动时不再逐表对比模型、自动 ALTER TABLE 补字段（每个 worker 启动都会执行，且以锁表方式执行），
+改为版本化迁移。这里固定列出此前依赖自动补字段（以及 scripts/legacy 中的旧脚本）添加的可选字段，
+旧库缺少的在 MySQL 8 上以 ALGORITHM=INSTANT 添加，已存在的跳过。
+
+之后模型新增字段时，请创建新的迁移文件并使用 utils.online_ddl.add_column。
+
+Revision ID: 5f0c3d9a7e21
+Revises: b984a6268092
+Create Date: 2026-10-19 14:00:00
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from utils.online_ddl import add_column
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c3d9a7e21'
+down_revision = 'b984a6268092'
+branch_labels = None
+depends_on = None
+
+
+def runtime_columns():
+    """(表, 字段)；每次调用生成新的 Column 对象"""
+    return [
+        ('meetings', sa.Column('description', sa.Text(), nullable=True)),
+        ('meetings', sa.Column('subject', sa.String(length=50), nullable=True)),
+        ('meetings', sa.Column('grade', sa.String(length=50), nullable=True)),
+        ('meetings', sa.Column('lesson_type', sa.String(length=50), nullable=True)),
+        ('meetings', sa.Column('task_id', sa.String(length=100), nullable=True)),
+        ('meetings', sa.Column('stream_url', sa.String(length=500), nullable=True)),
+        ('transcripts', sa.Column('summary', sa.Text(), nullable=True)),
+        ('transcripts', sa.Column('key_points', sa.Text(), nullable=True)),
+        ('transcripts', sa.Column('duration', sa.Float(), nullable=True)),
+        ('teachers', sa.Column('feature_id', sa.String(length=100), nullable=True)),
+        ('documents', sa.Column('mime_type', sa.String(length=100), nullable=True)),
+        ('documents', sa.Column('parsed_content', sa.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=True)),
+        ('documents', sa.Column('summary', sa.Text(), nullable=True)),
+        ('documents', sa.Column('parse_progress', sa.Integer(), nullable=False, server_default='0')),
+        ('documents', sa.Column('error_message', sa.Text(), nullable=True)),
+    ]
+
+
+def upgrade():
+    for table, column in runtime_columns():
+        add_column(table, column)
+
+
+def downgrade():
+    # 这些字段早于迁移系统存在，回滚时保留，避免删除数据
+    pass
@@ -0,0 +1,35 @@
+"""会议归档标记
+
+- meetings.archived_at   归档时间（为空表示未归档）
+- meetings.archive_file  归档文件名（位于 ARCHIVE_DIR）
+
+归档后转写文本、资料解析内容和上传文件移入按会议压缩的归档文件，数据库中只保留占位，
+访问时按需恢复（services/meeting_archive_service.py）。MySQL 8 上以 ALGORITHM=INSTANT 添加字段。
+
+Revision ID: 8a4e6b2c9d13
+Revises: 5f0c3d9a7e21
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.online_ddl import add_column
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6b2c9d13'
+down_revision = '5f0c3d9a7e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column('meetings', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    add_column('meetings', sa.Column('archive_file', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    # 回滚前先用 python scripts/archive_meetings.py --restore-all 恢复已归档的会议，否则占位数据无法还原
+    op.drop_column('meetings', 'archive_file')
+    op.drop_column('meetings', 'archived_at')
@@ -0,0 +1,56 @@
+"""按实际查询模式添加组合索引
+
+- meetings: (user_id, status, created_at)、(user_id, created_at)  会议列表按用户/状态筛选、按创建时间排序
+- transcripts: (meeting_id, created_at)                          按会议取最新转写记录
+- documents: (meeting_id, user_id, created_at)                   会议的资料列表
+- documents: (meeting_id, file_type, status, created_at)         AI 对话上下文中已解析完成的 docx
+
+被组合索引前缀覆盖的单列索引（meetings.user_id、transcripts.meeting_id、documents.meeting_id）随后删除，
+外键继续使用组合索引。启动时 create_all 新建的库已经包含这些索引，online_ddl 按索引名判断，已存在的跳过；
+MySQL 上以 ALGORITHM=INPLACE, LOCK=NONE 执行，建索引期间不阻塞读写。
+
+Revision ID: b984a6268092
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from utils.online_ddl import create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'b984a6268092'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (表, 索引名, 字段)
+COMPOSITE_INDEXES = [
+    ('meetings', 'ix_meetings_user_status_created', ['user_id', 'status', 'created_at']),
+    ('meetings', 'ix_meetings_user_created', ['user_id', 'created_at']),
+    ('transcripts', 'ix_transcripts_meeting_created', ['meeting_id', 'created_at']),
+    ('documents', 'ix_documents_meeting_user_created', ['meeting_id', 'user_id', 'created_at']),
+    ('documents', 'ix_documents_meeting_type_status', ['meeting_id', 'file_type', 'status', 'created_at']),
+]
+
+# 被组合索引覆盖的单列索引：(表, 索引名, 字段)
+REDUNDANT_INDEXES = [
+    ('meetings', 'ix_meetings_user_id', ['user_id']),
+    ('transcripts', 'ix_transcripts_meeting_id', ['meeting_id']),
+    ('documents', 'ix_documents_meeting_id', ['meeting_id']),
+]
+
+
+def upgrade():
+    for table, name, columns in COMPOSITE_INDEXES:
+        create_index(name, table, columns)
+
+    for table, name, _ in REDUNDANT_INDEXES:
+        drop_index(name, table)
+
+
+def downgrade():
+    for table, name, columns in REDUNDANT_INDEXES:
+        create_index(name, table, columns)
+
+    for table, name, _ in reversed(COMPOSITE_INDEXES):
+        drop_index(name, table)
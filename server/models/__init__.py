@@ -7,6 +7,7 @@ from models.transcript import Transcript
 from models.teacher import Teacher
 from models.document import Document
 from models.meeting_teacher import MeetingTeacher
+from models.search_entry import SearchEntry
 
-__all__ = ['User', 'Meeting', 'Transcript', 'Teacher', 'Document', 'MeetingTeacher']
+__all__ = ['User', 'Meeting', 'Transcript', 'Teacher', 'Document', 'MeetingTeacher', 'SearchEntry']
 
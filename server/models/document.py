@@ -12,7 +12,7 @@ class Document(db.Model):
     __tablename__ = 'documents'
     
     id = db.Column(db.Integer, primary_key=True)
-    meeting_id = db.Column(db.String(36), db.ForeignKey('meetings.id'), nullable=False, index=True)
+    meeting_id = db.Column(db.String(36), db.ForeignKey('meetings.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)  # 原始文件名
     file_path = db.Column(db.String(500), nullable=False)  # 文件存储路径
@@ -28,6 +28,12 @@ class Document(db.Model):
     created_at = db.Column(db.DateTime, default=beijing_now, nullable=False)
     updated_at = db.Column(db.DateTime, default=beijing_now, onupdate=beijing_now, nullable=False)
     
+    # 组合索引（会议的资料列表；AI 对话上下文中已解析完成的 docx）
+    __table_args__ = (
+        db.Index('ix_documents_meeting_user_created', 'meeting_id', 'user_id', 'created_at'),
+        db.Index('ix_documents_meeting_type_status', 'meeting_id', 'file_type', 'status', 'created_at'),
+    )
+    
     def to_dict(self, include_content: bool = False):
         """
         转换为字典
@@ -19,14 +19,22 @@ class Meeting(db.Model):
     status = db.Column(db.String(20), default='running', nullable=False, index=True)  # running, stopped, completed
     task_id = db.Column(db.String(100), nullable=True)  # 通义听悟任务ID
     stream_url = db.Column(db.String(500), nullable=True)  # 推流URL
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=beijing_now, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=beijing_now, onupdate=beijing_now, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=True)  # 归档时间（转写文本、解析内容和上传文件已移入归档文件）
+    archive_file = db.Column(db.String(255), nullable=True)  # 归档文件名（位于 ARCHIVE_DIR）
     
     # 关系
     transcripts = db.relationship('Transcript', backref='meeting', lazy=True, cascade='all, delete-orphan')
     documents = db.relationship('Document', backref='meeting', lazy=True, cascade='all, delete-orphan')
     
+    # 组合索引（会议列表：按用户、状态筛选，按创建时间排序）
+    __table_args__ = (
+        db.Index('ix_meetings_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_meetings_user_created', 'user_id', 'created_at'),
+    )
+    
     def to_dict(self, include_transcripts=False, include_teachers=False):
         """转换为字典"""
         data = {
@@ -42,6 +50,7 @@ class Meeting(db.Model):
             'user_id': self.user_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
             'summary': None,
             'key_points': []
         }
@@ -0,0 +1,32 @@
+"""
+全文检索条目模型
+"""
+from database import db
+from utils.datetime_utils import beijing_now
+
+
+class SearchEntry(db.Model):
+    """全文检索条目：转写记录、备课资料、会议总结切分后的片段"""
+    __tablename__ = 'search_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.String(36), db.ForeignKey('meetings.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    source_type = db.Column(db.String(20), nullable=False)  # transcript, document, summary
+    source_id = db.Column(db.String(64), nullable=False)  # 转写记录ID / 文档ID / 会议ID
+    seq = db.Column(db.Integer, default=0, nullable=False)  # 片段序号
+    title = db.Column(db.String(255), nullable=True)  # 来源标题（如文档文件名）
+    content = db.Column(db.Text, nullable=False)  # 片段文本
+    digest = db.Column(db.String(40), nullable=False)  # 片段内容哈希（增量更新时判断是否变化）
+    created_at = db.Column(db.DateTime, default=beijing_now, nullable=False)
+    updated_at = db.Column(db.DateTime, default=beijing_now, onupdate=beijing_now, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_search_entries_source', 'source_type', 'source_id', 'seq'),
+        db.Index('ix_search_entries_user_meeting', 'user_id', 'meeting_id'),
+        # MySQL 使用 ngram 分词的全文索引（中文无需空格分词）；其他数据库为普通索引，检索回退到 LIKE
+        db.Index('ft_search_entries_content', 'content', mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+    )
+
+    def __repr__(self):
+        return f'<SearchEntry {self.source_type}:{self.source_id}#{self.seq}>'
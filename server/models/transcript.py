@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from database import db
-import json
+from utils import fast_json
 from utils.datetime_utils import beijing_now
 
 
@@ -12,7 +12,7 @@ class Transcript(db.Model):
     __tablename__ = 'transcripts'
     
     id = db.Column(db.Integer, primary_key=True)
-    meeting_id = db.Column(db.String(36), db.ForeignKey('meetings.id'), nullable=False, index=True)
+    meeting_id = db.Column(db.String(36), db.ForeignKey('meetings.id'), nullable=False)
     text = db.Column(db.Text, nullable=False)  # 转写文本
     summary = db.Column(db.Text, nullable=True)  # 摘要（JSON格式）
     key_points = db.Column(db.Text, nullable=True)  # 要点（JSON格式）
@@ -20,39 +20,54 @@ class Transcript(db.Model):
     created_at = db.Column(db.DateTime, default=beijing_now, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=beijing_now, onupdate=beijing_now, nullable=False)
     
+    # 组合索引（按会议取最新转写记录）
+    __table_args__ = (
+        db.Index('ix_transcripts_meeting_created', 'meeting_id', 'created_at'),
+    )
+    
+    def _parsed(self, field: str, raw):
+        """
+        解析 JSON 字段并缓存在实例上（原始文本不变时直接返回上次的结果）
+        
+        同一个实例在一次请求里常被序列化多次（会议详情、转写列表），避免重复解析大段总结 JSON。
+        返回的对象是共享的，调用方不要原地修改。
+        """
+        cache = self.__dict__.setdefault('_parsed_cache', {})
+        cached = cache.get(field)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        value = None
+        if raw:
+            try:
+                value = fast_json.loads(raw)
+            except:
+                value = None
+        cache[field] = (raw, value)
+        return value
+    
     @property
     def summary_dict(self):
         """获取摘要字典"""
-        if self.summary:
-            try:
-                return json.loads(self.summary)
-            except:
-                return None
-        return None
+        return self._parsed('summary', self.summary)
     
     @summary_dict.setter
     def summary_dict(self, value):
         """设置摘要字典"""
         if value:
-            self.summary = json.dumps(value, ensure_ascii=False)
+            self.summary = fast_json.dumps(value)
         else:
             self.summary = None
     
     @property
     def key_points_list(self):
         """获取要点列表"""
-        if self.key_points:
-            try:
-                return json.loads(self.key_points)
-            except:
-                return []
-        return []
+        return self._parsed('key_points', self.key_points) or []
     
     @key_points_list.setter
     def key_points_list(self, value):
         """设置要点列表"""
         if value:
-            self.key_points = json.dumps(value, ensure_ascii=False)
+            self.key_points = fast_json.dumps(value)
         else:
             self.key_points = None
     
@@ -8,6 +8,8 @@ from routes.summary import summary_bp
 from routes.ai_chat import ai_chat_bp
 from routes.tts import tts_bp
 from routes.related_materials import related_materials_bp
+from routes.search import search_bp
 
-__all__ = ['health_bp', 'meeting_bp', 'auth_bp', 'summary_bp', 'ai_chat_bp', 'tts_bp', 'related_materials_bp']
+__all__ = ['health_bp', 'meeting_bp', 'auth_bp', 'summary_bp', 'ai_chat_bp', 'tts_bp', 'related_materials_bp',
+           'search_bp']
 
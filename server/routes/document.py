@@ -6,6 +6,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.exceptions import RequestEntityTooLarge
 from services.document_service import DocumentService
 from services.meeting_service import MeetingService
+from services.meeting_archive_service import meeting_archive_service
 import os
 import threading
 import logging
@@ -202,6 +203,9 @@ def get_document(document_id):
                 'message': '文档不存在或无权限'
             }), 404
         
+        # 会议已归档时先恢复解析内容
+        meeting_archive_service.ensure_restored(document.meeting_id)
+        
         return jsonify({
             'success': True,
             'data': document.to_dict(include_content=True)
@@ -215,6 +219,33 @@ def get_document(document_id):
         }), 500
 
 
+@document_bp.route('/<int:document_id>/progress', methods=['GET'])
+@jwt_required()
+def get_document_progress(document_id):
+    """获取文档解析进度（轻量接口，不返回解析内容）"""
+    try:
+        user_id = get_jwt_identity()
+        
+        progress = document_service.get_document_progress(document_id, user_id)
+        if not progress:
+            return jsonify({
+                'success': False,
+                'message': '文档不存在或无权限'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': progress
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"[获取文档进度] 获取失败 - document_id: {document_id}, 错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
 @document_bp.route('/<int:document_id>', methods=['DELETE'])
 @jwt_required()
 def delete_document(document_id):
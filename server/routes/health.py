@@ -2,6 +2,7 @@
 健康检查路由
 """
 from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
 
 health_bp = Blueprint('health', __name__)
 
@@ -14,3 +15,45 @@ def health_check():
         'message': '服务运行正常'
     }), 200
 
+
+@health_bp.route('/health/llm-gateway', methods=['GET'])
+@jwt_required()
+def llm_gateway_stats():
+    """大模型调用网关统计（并发、排队、排队耗时与模型耗时）"""
+    from services.llm_gateway import llm_gateway
+    return jsonify({
+        'success': True,
+        'data': llm_gateway.stats()
+    }), 200
+
+
+@health_bp.route('/health/ai-chat-cache', methods=['GET'])
+@jwt_required()
+def ai_chat_cache_stats():
+    """AI对话缓存统计（提示词上下文缓存、回答缓存）"""
+    from services.prompt_context_cache import prompt_context_cache
+    from services.chat_response_cache import chat_response_cache
+    return jsonify({
+        'success': True,
+        'data': {
+            'prompt_context': prompt_context_cache.stats(),
+            'responses': chat_response_cache.stats(),
+        }
+    }), 200
+
+
+@health_bp.route('/health/transcript-broadcaster', methods=['GET'])
+@jwt_required()
+def transcript_broadcaster_stats():
+    """实时转写广播统计（各会议房间的推送速率、合并数量，以及音频接入/静默检测统计）"""
+    from services.transcript_broadcaster import transcript_broadcaster
+    from services.audio_ingest import audio_ingest_manager
+    from services import websocket_service
+    data = transcript_broadcaster.stats()
+    data['audio_ingest'] = audio_ingest_manager.stats()
+    if websocket_service.connection_router:
+        data['routing'] = websocket_service.connection_router.stats()
+    return jsonify({
+        'success': True,
+        'data': data
+    }), 200
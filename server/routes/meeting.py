@@ -1,23 +1,25 @@
 """
 会议路由
 """
-from flask import Blueprint, request, jsonify, Response, send_file
+from flask import Blueprint, request, jsonify, Response, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.meeting_service import MeetingService
 from services.meeting_transcript_service import MeetingTranscriptService
 from services.meeting_summary_service import MeetingSummaryService
 from services.meeting_document_service import MeetingDocumentService
+from services.bulk_export_service import BulkExportService, EXPORT_PARTS
 from services.tytingwu_service import TyingWuService
+from utils.fast_json import sse_data
 import logging
-import json
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 meeting_bp = Blueprint('meeting', __name__)
 meeting_service = MeetingService()
 transcript_service = MeetingTranscriptService()
 summary_service = MeetingSummaryService()
 document_service = MeetingDocumentService(meeting_service)
+bulk_export_service = BulkExportService(document_service)
 tytingwu_service = TyingWuService()
 logger = logging.getLogger(__name__)
 
@@ -269,23 +271,23 @@ def generate_summary_stream(meeting_id):
                 poll_count = 0
                 
                 # 发送开始消息
-                yield f"data: {json.dumps({'type': 'start', 'message': '开始查询任务状态...'}, ensure_ascii=False)}\n\n"
+                yield sse_data({'type': 'start', 'message': '开始查询任务状态...'})
                 
                 while poll_count < max_polls:
                     # 查询任务信息
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'正在查询任务状态... (第 {poll_count + 1} 次)'}, ensure_ascii=False)}\n\n"
+                    yield sse_data({'type': 'status', 'message': f'正在查询任务状态... (第 {poll_count + 1} 次)'})
                     
                     task_info = tytingwu_service.get_task_info(task_id)
                     
                     if task_info.get('Code') != '0':
                         error_msg = task_info.get('Message', '查询任务信息失败')
-                        yield f"data: {json.dumps({'type': 'error', 'message': error_msg}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'error', 'message': error_msg})
                         break
                     
                     task_data = task_info.get('Data', {})
                     task_status = task_data.get('TaskStatus', 'UNKNOWN')
                     
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'任务状态: {task_status}'}, ensure_ascii=False)}\n\n"
+                    yield sse_data({'type': 'status', 'message': f'任务状态: {task_status}'})
                     
                     # 如果任务还在进行中，继续轮询
                     if task_status == 'ONGOING':
@@ -295,7 +297,7 @@ def generate_summary_stream(meeting_id):
                     
                     # 如果任务被暂停，尝试继续等待（可能自动恢复）
                     if task_status == 'PAUSED':
-                        yield f"data: {json.dumps({'type': 'status', 'message': '任务已暂停，等待恢复中...'}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'status', 'message': '任务已暂停，等待恢复中...'})
                         # 对于暂停状态，可以等待一段时间看是否恢复
                         # 最多等待20次（20秒）
                         pause_wait_count = 0
@@ -310,7 +312,7 @@ def generate_summary_stream(meeting_id):
                             if task_info.get('Code') == '0':
                                 task_data = task_info.get('Data', {})
                                 task_status = task_data.get('TaskStatus', 'UNKNOWN')
-                                yield f"data: {json.dumps({'type': 'status', 'message': f'任务状态: {task_status} (等待恢复中，已等待 {pause_wait_count} 秒)'}, ensure_ascii=False)}\n\n"
+                                yield sse_data({'type': 'status', 'message': f'任务状态: {task_status} (等待恢复中，已等待 {pause_wait_count} 秒)'})
                                 
                                 # 如果状态恢复为 ONGOING 或 COMPLETED，跳出等待循环
                                 if task_status in ['ONGOING', 'COMPLETED']:
@@ -321,7 +323,7 @@ def generate_summary_stream(meeting_id):
                         
                         # 如果等待后仍然是 PAUSED，提示错误
                         if task_status == 'PAUSED':
-                            yield f"data: {json.dumps({'type': 'error', 'message': '任务出现异常，无法总结'}, ensure_ascii=False)}\n\n"
+                            yield sse_data({'type': 'error', 'message': '任务出现异常，无法总结'})
                             break
                         
                         # 如果状态变为 ONGOING，继续轮询
@@ -331,66 +333,66 @@ def generate_summary_stream(meeting_id):
                     
                     # 任务已完成或失败，开始处理结果
                     if task_status == 'COMPLETED':
-                        yield f"data: {json.dumps({'type': 'status', 'message': '任务已完成，开始下载结果...'}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'status', 'message': '任务已完成，开始下载结果...'})
                         
                         # 处理结果URL
                         result_urls = task_data.get('Result', {})
                         
                         # 下载并处理 Summarization
                         if result_urls.get('Summarization'):
-                            yield f"data: {json.dumps({'type': 'status', 'message': '正在下载摘要结果...'}, ensure_ascii=False)}\n\n"
+                            yield sse_data({'type': 'status', 'message': '正在下载摘要结果...'})
                             try:
                                 downloaded_data = tytingwu_service._download_json_from_url(result_urls['Summarization'])
                                 if isinstance(downloaded_data, dict) and 'Summarization' in downloaded_data:
                                     task_data['Summarization'] = downloaded_data['Summarization']
-                                    yield f"data: {json.dumps({'type': 'status', 'message': '摘要结果下载完成'}, ensure_ascii=False)}\n\n"
+                                    yield sse_data({'type': 'status', 'message': '摘要结果下载完成'})
                             except Exception as e:
-                                yield f"data: {json.dumps({'type': 'warning', 'message': f'下载摘要结果失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+                                yield sse_data({'type': 'warning', 'message': f'下载摘要结果失败: {str(e)}'})
                         
                         # 下载并处理 MeetingAssistance
                         if result_urls.get('MeetingAssistance'):
-                            yield f"data: {json.dumps({'type': 'status', 'message': '正在下载要点提炼结果...'}, ensure_ascii=False)}\n\n"
+                            yield sse_data({'type': 'status', 'message': '正在下载要点提炼结果...'})
                             try:
                                 downloaded_data = tytingwu_service._download_json_from_url(result_urls['MeetingAssistance'])
                                 if isinstance(downloaded_data, dict) and 'MeetingAssistance' in downloaded_data:
                                     task_data['MeetingAssistance'] = downloaded_data['MeetingAssistance']
-                                    yield f"data: {json.dumps({'type': 'status', 'message': '要点提炼结果下载完成'}, ensure_ascii=False)}\n\n"
+                                    yield sse_data({'type': 'status', 'message': '要点提炼结果下载完成'})
                             except Exception as e:
-                                yield f"data: {json.dumps({'type': 'warning', 'message': f'下载要点提炼结果失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+                                yield sse_data({'type': 'warning', 'message': f'下载要点提炼结果失败: {str(e)}'})
                         
                         # 保存 MP3 音频 URL（不需要下载，直接使用 OutputMp3Path）
                         if result_urls.get('OutputMp3Path') or task_data.get('OutputMp3Path'):
                             mp3_url = result_urls.get('OutputMp3Path') or task_data.get('OutputMp3Path')
                             # 将 MP3 URL 保存到 task_data 中，后续会保存到数据库
                             task_data['mp3_url'] = mp3_url
-                            yield f"data: {json.dumps({'type': 'status', 'message': '音频文件URL已获取', 'mp3_url': mp3_url}, ensure_ascii=False)}\n\n"
+                            yield sse_data({'type': 'status', 'message': '音频文件URL已获取', 'mp3_url': mp3_url})
                         
                         # 保存摘要结果到数据库
-                        yield f"data: {json.dumps({'type': 'status', 'message': '正在保存摘要结果...'}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'status', 'message': '正在保存摘要结果...'})
                         # 使用应用上下文包裹数据库操作
                         with app.app_context():
                             meeting_result = summary_service.save_summary_from_task_data(meeting_id, task_data)
                         
-                        yield f"data: {json.dumps({'type': 'complete', 'data': meeting_result, 'message': '摘要生成完成'}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'complete', 'data': meeting_result, 'message': '摘要生成完成'})
                         break
                     
                     elif task_status in ['FAILED', 'INVALID']:
                         error_msg = task_data.get('ErrorMessage', f'任务状态: {task_status}')
-                        yield f"data: {json.dumps({'type': 'error', 'message': error_msg}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'error', 'message': error_msg})
                         break
                     else:
-                        yield f"data: {json.dumps({'type': 'error', 'message': f'未知任务状态: {task_status}'}, ensure_ascii=False)}\n\n"
+                        yield sse_data({'type': 'error', 'message': f'未知任务状态: {task_status}'})
                         break
                 
                 if poll_count >= max_polls:
-                    yield f"data: {json.dumps({'type': 'error', 'message': '查询超时，请稍后重试'}, ensure_ascii=False)}\n\n"
+                    yield sse_data({'type': 'error', 'message': '查询超时，请稍后重试'})
                 
                 # 发送结束标记
                 yield "data: [DONE]\n\n"
                 
             except Exception as e:
                 logger.error(f"生成摘要流时出错: {str(e)}", exc_info=True)
-                yield f"data: {json.dumps({'type': 'error', 'message': f'处理失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+                yield sse_data({'type': 'error', 'message': f'处理失败: {str(e)}'})
                 yield "data: [DONE]\n\n"
         
         return Response(
@@ -455,6 +457,7 @@ def delete_meeting(meeting_id):
     try:
         user_id = get_jwt_identity()
         meeting_service.delete_meeting(meeting_id, user_id=user_id)
+        document_service.remove_summary_exports(meeting_id)
         
         return jsonify({
             'success': True,
@@ -481,30 +484,33 @@ def download_summary(meeting_id):
     try:
         user_id = get_jwt_identity()
         
-        # 验证会议权限
-        meeting = meeting_service.get_meeting(meeting_id, user_id=user_id)
-        if not meeting:
+        # 验证会议权限并获取已渲染的Word文档（总结保存时生成，版本变化时才重新渲染）
+        export = document_service.get_summary_export(meeting_id, user_id=user_id)
+        if not export:
             return jsonify({
                 'success': False,
                 'message': '会议不存在或无权限'
             }), 404
-        
-        # 生成Word文档
-        doc_bytes = document_service.generate_summary_document(meeting_id, user_id=user_id)
+        file_path, version, meeting_name = export
         
         # 生成文件名
-        meeting_name = meeting.get('name', '会议总结')
+        meeting_name = meeting_name or '会议总结'
         # 清理文件名中的特殊字符
         safe_name = ''.join(c for c in meeting_name if c.isalnum() or c in (' ', '-', '_'))[:50]
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{safe_name}_{timestamp}.docx"
         
-        return send_file(
-            doc_bytes,
+        # 版本号作为 ETag，If-None-Match 命中时返回 304
+        response = send_file(
+            file_path,
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            etag=version,
+            conditional=True
         )
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     except ValueError as e:
         logger.error(f"下载会议总结失败: {str(e)}", exc_info=True)
@@ -520,3 +526,110 @@ def download_summary(meeting_id):
             'message': str(e)
         }), 500
 
+
+@meeting_bp.route('/<meeting_id>/summary/mind-map', methods=['GET'])
+@jwt_required()
+def get_mind_map(meeting_id):
+    """
+    获取服务端排版的思维导图
+    
+    查询参数:
+        format: svg 返回 SVG 图片，默认返回排版结果 JSON（节点位置、大小和连线）
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        result = document_service.get_mind_map(meeting_id, user_id=user_id)
+        if not result:
+            return jsonify({
+                'success': False,
+                'message': '会议不存在或无权限'
+            }), 404
+        version, layout_path, svg_path = result
+        
+        if request.args.get('format') == 'svg':
+            response = send_file(svg_path, mimetype='image/svg+xml', etag=f"{version}-svg", conditional=True)
+        else:
+            response = send_file(layout_path, mimetype='application/json', etag=version, conditional=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    
+    except Exception as e:
+        logger.error(f"获取思维导图失败: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@meeting_bp.route('/export', methods=['GET'])
+@jwt_required()
+def bulk_export():
+    """
+    批量导出会议（zip 流式下载）
+    
+    查询参数:
+        date_from / date_to: 创建日期范围（YYYY-MM-DD，包含两端）
+        subject / grade: 学科 / 年级
+        parts: 导出内容，逗号分隔（summary、transcripts、documents，默认全部）
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        try:
+            date_from = request.args.get('date_from')
+            date_from = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+            date_to = request.args.get('date_to')
+            date_to = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1) if date_to else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': '日期格式应为 YYYY-MM-DD'
+            }), 400
+        
+        parts = tuple(p.strip() for p in request.args.get('parts', ','.join(EXPORT_PARTS)).split(',') if p.strip())
+        invalid = [p for p in parts if p not in EXPORT_PARTS]
+        if invalid or not parts:
+            return jsonify({
+                'success': False,
+                'message': f"不支持的导出内容: {', '.join(invalid) or '空'}（可选: {', '.join(EXPORT_PARTS)}）"
+            }), 400
+        
+        meeting_ids = bulk_export_service.find_meetings(
+            user_id,
+            date_from=date_from,
+            date_to=date_to,
+            subject=request.args.get('subject') or None,
+            grade=request.args.get('grade') or None
+        )
+        if not meeting_ids:
+            return jsonify({
+                'success': False,
+                'message': '没有符合条件的会议'
+            }), 404
+        
+        logger.info(f"批量导出会议: 用户={user_id}, 会议数={len(meeting_ids)}, 内容={parts}")
+        filename = f"meetings_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return Response(
+            bulk_export_service.stream_zip(current_app._get_current_object(), meeting_ids, user_id, parts),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',  # 禁用Nginx缓冲
+                'X-Export-Meeting-Count': str(len(meeting_ids)),
+            }
+        )
+    
+    except Exception as e:
+        logger.error(f"批量导出会议失败: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -0,0 +1,75 @@
+"""
+会议全文检索路由
+"""
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.search_service import search_service, SOURCE_TYPES
+import logging
+
+logger = logging.getLogger(__name__)
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    检索当前用户的会议内容（转写记录、备课资料、会议总结）
+
+    查询参数:
+        q: 查询内容（空白分隔的多个词需同时出现）
+        subject: 学科筛选
+        grade: 年级筛选
+        type: 来源筛选（transcript、document、summary）
+        limit: 返回条数（默认 20，最多 100）
+        offset: 偏移量
+
+    返回: { "success": true, "data": { "items": [ { "meeting_id", "meeting_name", "source_type", "title",
+            "snippet": { "text", "highlights" }, "score", ... } ], "has_more": bool } }
+    """
+    try:
+        user_id = get_jwt_identity()
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({
+                'success': False,
+                'message': '请输入检索内容'
+            }), 400
+
+        source_type = request.args.get('type') or None
+        if source_type and source_type not in SOURCE_TYPES:
+            return jsonify({
+                'success': False,
+                'message': f"type 参数无效，可选值: {', '.join(SOURCE_TYPES)}"
+            }), 400
+
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+            offset = max(int(request.args.get('offset', 0)), 0)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'limit 和 offset 必须是整数'
+            }), 400
+
+        result = search_service.search(
+            user_id,
+            query,
+            subject=request.args.get('subject') or None,
+            grade=request.args.get('grade') or None,
+            source_type=source_type,
+            limit=limit,
+            offset=offset
+        )
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+
+    except Exception as e:
+        logger.error(f"会议检索失败: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
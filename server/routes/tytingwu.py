@@ -5,6 +5,7 @@ import logging
 import traceback
 from flask import Blueprint, request, jsonify
 from services.tytingwu_service import TyingWuService
+from config import Config
 
 logger = logging.getLogger(__name__)
 tytingwu_bp = Blueprint('tytingwu', __name__)
@@ -24,8 +25,8 @@ def create_realtime_task():
         logger.info(f'请求参数: {data}')
         
         # 获取参数
-        audio_format = data.get('audio_format', 'pcm')
-        sample_rate = data.get('sample_rate', 16000)
+        audio_format = data.get('audio_format', Config.TYTINGWU_AUDIO_FORMAT)
+        sample_rate = data.get('sample_rate', Config.TYTINGWU_SAMPLE_RATE)
         source_language = data.get('source_language', 'cn')
         language_hints = data.get('language_hints')
         task_key = data.get('task_key')
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+会议归档
+把已完成且超过 N 天未更新的会议的转写文本、资料解析内容和上传文件移入压缩归档文件，并输出归档报告。
+已归档的会议在访问时自动恢复，也可以用 --restore / --restore-all 手动恢复。
+用法: python scripts/archive_meetings.py [--days 180] [--limit <数量>] [--dry-run]
+      python scripts/archive_meetings.py --status
+      python scripts/archive_meetings.py --restore <会议ID> | --restore-all
+"""
+import sys
+import os
+import argparse
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from database import db
+from models import Meeting
+from services.meeting_archive_service import meeting_archive_service
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+def archive(days: int = None, limit: int = None, dry_run: bool = False):
+    def progress(index, total, meeting_id, result, error):
+        if error:
+            print(f"❌ [{index}/{total}] {meeting_id} 归档失败: {error}")
+        elif result is None:
+            print(f"[{index}/{total}] {meeting_id} 跳过（资料仍在解析或已不满足条件）")
+        elif dry_run:
+            size = result['transcript_bytes'] + result['content_bytes'] + result['file_bytes']
+            print(f"[{index}/{total}] {meeting_id} 转写 {format_size(result['transcript_bytes'])}，"
+                  f"解析内容 {format_size(result['content_bytes'])}，文件 {format_size(result['file_bytes'])}，"
+                  f"合计 {format_size(size)}")
+        else:
+            print(f"[{index}/{total}] {meeting_id} {format_size(result['original_bytes'])} -> "
+                  f"{format_size(result['archive_bytes'])}（资料 {result['documents']} 个，文件 {result['files']} 个）")
+
+    with app.app_context():
+        start = time.perf_counter()
+        report = meeting_archive_service.archive_completed(days, limit, dry_run=dry_run, progress=progress)
+        elapsed = time.perf_counter() - start
+
+        print(f"\n归档条件：已完成且 {report['older_than_days']} 天未更新，压缩格式 {report['codec']}")
+        if dry_run:
+            print(f"✅ 演练完成：候选会议 {report['candidates']} 个，可移出数据 {format_size(report['original_bytes'])}")
+            return True
+
+        ratio = report['archive_bytes'] / report['original_bytes'] if report['original_bytes'] else 0
+        print(f"✅ 完成：候选 {report['candidates']} 个，归档 {report['archived']} 个，跳过 {report['skipped']} 个，"
+              f"失败 {report['failed']} 个，耗时 {elapsed:.1f} 秒")
+        print(f"   移出数据 {format_size(report['original_bytes'])}，归档文件 {format_size(report['archive_bytes'])}"
+              f"（压缩比 {ratio:.1%}）")
+        return report['failed'] == 0
+
+
+def status():
+    with app.app_context():
+        result = meeting_archive_service.status()
+        print(f"归档目录: {result['archive_dir']}（新归档使用 {result['codec']}）")
+        print(f"已归档会议: {result['archived_meetings']} 个，归档文件合计 {format_size(result['archive_bytes'])}")
+        for filename in result['missing_files']:
+            print(f"⚠️  归档文件缺失: {filename}")
+        return not result['missing_files']
+
+
+def restore(meeting_id: str = None):
+    with app.app_context():
+        if meeting_id:
+            meeting_ids = [meeting_id]
+        else:
+            meeting_ids = [row.id for row in db.session.query(Meeting.id).filter(Meeting.archived_at.isnot(None)).all()]
+
+        failed = 0
+        for index, current_id in enumerate(meeting_ids, 1):
+            if meeting_archive_service.ensure_restored(current_id):
+                print(f"[{index}/{len(meeting_ids)}] {current_id} 已恢复")
+            else:
+                failed += 1
+                print(f"❌ [{index}/{len(meeting_ids)}] {current_id} 未恢复（未归档或归档文件不可用，详见日志）")
+        print(f"✅ 完成：恢复 {len(meeting_ids) - failed} 个会议，失败 {failed} 个")
+        return failed == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='会议归档')
+    parser.add_argument('--days', type=int, help='归档最后更新早于多少天前的已完成会议（默认 ARCHIVE_AFTER_DAYS）')
+    parser.add_argument('--limit', type=int, help='本次最多归档的会议数')
+    parser.add_argument('--dry-run', action='store_true', help='只列出候选会议和可移出的数据量，不修改')
+    parser.add_argument('--status', action='store_true', help='查看已归档会议数和归档文件大小')
+    parser.add_argument('--restore', metavar='MEETING_ID', help='恢复指定会议')
+    parser.add_argument('--restore-all', action='store_true', help='恢复全部已归档的会议')
+    args = parser.parse_args()
+
+    if args.status:
+        success = status()
+    elif args.restore or args.restore_all:
+        success = restore(args.restore)
+    else:
+        success = archive(args.days, args.limit, args.dry_run)
+    sys.exit(0 if success else 1)
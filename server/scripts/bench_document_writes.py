@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+文档解析写放大基准测试
+对比旧的三次状态更新流程与新的状态机流程，在 5MB 文档上写入数据库的语句数和字节数。
+解析完成后的副作用（资料检索索引重建、全文检索索引）单独统计，不计入两种流程。
+用法: python scripts/bench_document_writes.py [--size-mb 5]
+"""
+import sys
+import os
+import argparse
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
+from database import db
+from models import User, Meeting, Document
+from services.document_service import DocumentService
+from services.document_retrieval import document_retrieval
+from services.search_service import search_service
+
+
+class WriteCounter:
+    """统计 UPDATE/INSERT 语句数和参数字节数"""
+
+    def __init__(self):
+        self.statements = 0
+        self.bytes = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(('UPDATE', 'INSERT')):
+            return
+        self.statements += 1
+        rows = parameters if executemany else [parameters]
+        for row in rows:
+            values = row if isinstance(row, (list, tuple)) else list((row or {}).values())
+            for value in values:
+                if isinstance(value, str):
+                    self.bytes += len(value.encode('utf-8'))
+                elif isinstance(value, bytes):
+                    self.bytes += len(value)
+
+
+def create_app():
+    """创建使用内存 SQLite 的最小应用"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(meeting_id: str) -> int:
+    """创建测试用户、会议和文档，返回文档ID"""
+    if not User.query.get(1):
+        user = User(id=1, username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.add(Meeting(id=meeting_id, name='基准测试', user_id=1, subject='数学', grade='初一年级'))
+    document = Document(
+        meeting_id=meeting_id, filename='bench.docx', original_filename='bench.docx',
+        file_path='/dev/null', file_size=0, file_type='docx', status='uploaded', user_id=1
+    )
+    db.session.add(document)
+    db.session.commit()
+    return document.id
+
+
+def legacy_step(service: DocumentService, document_id: int, status: str, **fields):
+    """
+    旧流程的一步：在新会话中更新文档
+
+    旧流程每一步重新查询文档后写入传入的全部字段。同一会话中 SQLAlchemy 会跳过与已加载值相同的列，
+    这里每一步使用新会话且不加载内容列，使旧流程请求的每次写入都真正发出。
+    """
+    db.session.remove()
+    # 保持引用：会话的标识映射是弱引用，对象被回收后 update_document_status 会重新加载整行
+    document = db.session.get(Document, document_id, options=[load_only(Document.id, Document.status)])
+    service.update_document_status(document_id, status, **fields)
+    return document
+
+
+def legacy_flow(service: DocumentService, document_id: int, meeting_id: str):
+    """旧流程：10% -> 50%（写内容）-> 100%（再次写内容和摘要）"""
+    legacy_step(service, document_id, 'processing', parse_progress=10)
+    parsed_content = service.parse_docx('/dev/null')
+    legacy_step(service, document_id, 'processing', parse_progress=50, parsed_content=parsed_content)
+    Meeting.query.get(meeting_id)
+    summary = service.extract_summary_with_ai(parsed_content)
+    legacy_step(
+        service, document_id, 'completed', parse_progress=100,
+        parsed_content=parsed_content, summary=summary
+    )
+
+
+def run(size_mb: int):
+    line = '备课资料内容，包含教学目标、重难点和课堂活动设计。\n'
+    content = line * (size_mb * 1024 * 1024 // len(line.encode('utf-8')))
+    summary = '【核心主题】分数除法\n【关键信息点】1. 理解算理 2. 掌握算法'
+
+    service = DocumentService()
+    service.parse_docx = lambda file_path: content
+    service.extract_summary_with_ai = lambda *args, **kwargs: summary
+    # 解析完成后的索引副作用不计入流程，最后单独统计
+    service._rebuild_retrieval_index = lambda meeting_id: None
+    service._update_search_index = lambda document_id: None
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        results = {}
+        for name, flow in (('旧流程', legacy_flow), ('状态机', None)):
+            meeting_id = 'bench-meeting'
+            document_id = seed(meeting_id)
+            db.session.expunge_all()
+
+            if flow:
+                results[name] = measure(lambda: flow(service, document_id, meeting_id))
+            else:
+                results[name] = measure(lambda: service.parse_and_extract_document(document_id, meeting_id))
+            assert Document.query.get(document_id).status == 'completed'
+
+        # 副作用：解析完成后重建资料检索索引（内存）、后台写入全文检索索引
+        side_effects = {
+            '资料检索索引': measure(lambda: document_retrieval.build(meeting_id)),
+            '全文检索索引': measure(lambda: search_service.index_document(document_id)),
+        }
+
+    print(f"文档大小: {len(content.encode('utf-8')) / (1024 * 1024):.2f} MB")
+    print(f"{'流程':<8}{'写语句数':>10}{'写入字节':>16}{'耗时(ms)':>12}")
+    for name, (statements, written, elapsed) in results.items():
+        print(f"{name:<8}{statements:>10}{written:>16,}{elapsed * 1000:>12.1f}")
+    legacy_bytes = results['旧流程'][1]
+    new_bytes = results['状态机'][1]
+    if new_bytes:
+        print(f"写放大降低: {legacy_bytes / new_bytes:.2f}x")
+
+    print("\n解析完成后的副作用（两种流程相同，不计入上表）")
+    for name, (statements, written, elapsed) in side_effects.items():
+        print(f"{name:<8}{statements:>10}{written:>16,}{elapsed * 1000:>12.1f}")
+
+
+def measure(action) -> tuple:
+    """执行操作，返回 (写语句数, 写入字节, 耗时秒)"""
+    counter = WriteCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    start = time.perf_counter()
+    try:
+        action()
+    finally:
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', counter)
+    return counter.statements, counter.bytes, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='文档解析写放大基准测试')
+    parser.add_argument('--size-mb', type=int, default=5, help='模拟文档大小（MB）')
+    args = parser.parse_args()
+    run(args.size_mb)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码基准测试
+在典型载荷（会议详情响应、会议列表响应、AI 对话 SSE 数据块、转写记录总结字段）上
+对比标准库 json 与 orjson 的编码、解码耗时
+用法: python scripts/bench_json.py [--meetings 50] [--rounds 200]
+"""
+import sys
+import os
+import argparse
+import json
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import fast_json
+
+SENTENCE = '本节课围绕分数除法的算理展开讨论，建议用线段图帮助学生理解除以一个数等于乘它的倒数。'
+
+
+def build_summary(index: int) -> dict:
+    """会议总结（与 Transcript.summary 中保存的结构一致）"""
+    return {
+        'paragraph_summary': SENTENCE * 10,
+        'conversational_summary': [{'SpeakerName': f'老师{i}', 'Summary': SENTENCE * 2} for i in range(4)],
+        'questions_answering_summary': [{'Question': SENTENCE, 'Answer': SENTENCE * 2} for _ in range(10)],
+        'meeting_assistance': {
+            'keywords': ['分数除法', '倒数', '线段图'],
+            'key_sentences': [{'Text': f'{SENTENCE}（{index}-{i}）'} for i in range(20)],
+            'actions': [{'Text': '准备分层练习'}],
+        },
+        'mind_map_summary': [{'Title': '分数除法', 'Topic': [{'Title': '算理'}, {'Title': '练习设计'}]}],
+    }
+
+
+def build_meeting(index: int, include_transcripts: bool) -> dict:
+    """会议（与 Meeting.to_dict 的输出结构一致）"""
+    teachers = [{
+        'id': i, 'name': f'老师{i}', 'subject': '数学', 'feature_id': None, 'has_voiceprint': False,
+        'user_id': 1, 'created_at': '2024-09-01T10:00:00', 'updated_at': '2024-09-01T10:00:00', 'is_host': i == 0,
+    } for i in range(3)]
+    meeting = {
+        'id': f'00000000-0000-0000-0000-{index:012d}', 'name': f'六年级数学集体备课{index}', 'description': None,
+        'subject': '数学', 'grade': '六年级', 'lesson_type': '新课', 'status': 'completed',
+        'task_id': f'task-{index}', 'stream_url': None, 'user_id': 1,
+        'created_at': '2024-09-01T10:00:00', 'updated_at': '2024-09-01T11:00:00',
+        'summary': None, 'key_points': [], 'teachers': teachers, 'host_teacher': teachers[0],
+    }
+    if include_transcripts:
+        transcript_text = '\n'.join(json.dumps({'name': f'老师{i % 3}', 'time': i, 'type': 'final', 'content': SENTENCE},
+                                               ensure_ascii=False) for i in range(300))
+        meeting['summary'] = build_summary(index)
+        meeting['key_points'] = ['要点一', '要点二']
+        meeting['transcript'] = transcript_text
+        meeting['transcripts'] = [{
+            'id': index, 'meeting_id': meeting['id'], 'text': transcript_text, 'summary': meeting['summary'],
+            'key_points': meeting['key_points'], 'duration': 2700.0,
+            'created_at': '2024-09-01T10:00:00', 'updated_at': '2024-09-01T11:00:00',
+        }]
+    return meeting
+
+
+def timed(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run(meetings: int, rounds: int):
+    detail = {'success': True, 'data': build_meeting(0, include_transcripts=True)}
+    listing = {'success': True, 'data': [build_meeting(i, include_transcripts=False) for i in range(meetings)]}
+    chunks = [{'content': SENTENCE[i % len(SENTENCE):][:8]} for i in range(500)]
+    summary_text = json.dumps(build_summary(0), ensure_ascii=False)
+
+    cases = {
+        '会议详情响应': lambda: fast_json.dumps_bytes(detail, sort_keys=True),
+        f'会议列表响应({meetings})': lambda: fast_json.dumps_bytes(listing, sort_keys=True),
+        'SSE数据块(500)': lambda: [fast_json.sse_data(chunk) for chunk in chunks],
+        '解析总结字段': lambda: fast_json.loads(summary_text),
+    }
+
+    engines = ['stdlib'] + (['orjson'] if fast_json.ORJSON_AVAILABLE else [])
+    if not fast_json.ORJSON_AVAILABLE:
+        print("orjson 未安装，只测试标准库（pip install orjson）")
+    print(f"轮数: {rounds}，会议详情 {len(fast_json.dumps_bytes(detail)):,} 字节，"
+          f"会议列表 {len(fast_json.dumps_bytes(listing)):,} 字节")
+    print(f"{'载荷':<20}" + ''.join(f"{engine + '(ms)':>14}" for engine in engines))
+    results = {}
+    for engine in engines:
+        fast_json.configure(engine)
+        for name, func in cases.items():
+            func()  # 预热
+            results[(name, engine)] = timed(func, rounds)
+    for name in cases:
+        print(f"{name:<20}" + ''.join(f"{results[(name, engine)]:>14.3f}" for engine in engines))
+    fast_json.configure('auto')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='JSON 编解码基准测试')
+    parser.add_argument('--meetings', type=int, default=50, help='会议列表响应中的会议数')
+    parser.add_argument('--rounds', type=int, default=200, help='每个载荷的运行轮数')
+    args = parser.parse_args()
+    run(args.meetings, args.rounds)
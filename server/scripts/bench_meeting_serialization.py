@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+会议序列化基准测试
+对比逐条懒加载关系与预加载（serialization_options）两种方式序列化大量会议的查询数和耗时，
+并测量同一批实例再次序列化时（总结 JSON 已缓存）的耗时
+用法: python scripts/bench_meeting_serialization.py [--meetings 1000] [--teachers 3] [--transcripts 2]
+"""
+import sys
+import os
+import argparse
+import json
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from database import db
+from models import User, Meeting, Teacher, MeetingTeacher, Transcript
+from services.meeting_service import serialization_options
+
+
+class QueryCounter:
+    """统计 SELECT 语句数"""
+
+    def __init__(self):
+        self.selects = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.selects += 1
+
+
+def create_app():
+    """创建使用内存 SQLite 的最小应用"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def build_summary(index: int) -> str:
+    """构造接近真实大小的会议总结 JSON"""
+    sentence = '本节课围绕分数除法的算理展开讨论，建议用线段图帮助学生理解除以一个数等于乘它的倒数。'
+    return json.dumps({
+        'paragraph_summary': sentence * 10,
+        'conversational_summary': [{'SpeakerName': f'老师{i}', 'Summary': sentence * 2} for i in range(4)],
+        'questions_answering_summary': [{'Question': sentence, 'Answer': sentence * 2} for _ in range(10)],
+        'meeting_assistance': {
+            'keywords': ['分数除法', '倒数', '线段图'],
+            'key_sentences': [{'Text': f'{sentence}（{index}-{i}）'} for i in range(20)],
+        },
+        'mind_map_summary': [{'Title': '分数除法', 'Topic': [{'Title': '算理'}, {'Title': '练习设计'}]}],
+    }, ensure_ascii=False)
+
+
+def seed(meetings: int, teachers: int, transcripts: int):
+    """创建测试用户、教师、会议、参会关系和转写记录"""
+    user = User(id=1, username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    teacher_rows = [Teacher(name=f'老师{i}', subject='数学', user_id=1) for i in range(teachers * 4)]
+    db.session.add_all(teacher_rows)
+    db.session.flush()
+
+    for i in range(meetings):
+        meeting_id = f'bench-{i:06d}'
+        db.session.add(Meeting(id=meeting_id, name=f'集体备课{i}', user_id=1, subject='数学', grade='六年级',
+                               status='completed'))
+        for j in range(teachers):
+            teacher = teacher_rows[(i + j) % len(teacher_rows)]
+            db.session.add(MeetingTeacher(meeting_id=meeting_id, teacher_id=teacher.id, is_host=j == 0))
+        for j in range(transcripts):
+            db.session.add(Transcript(meeting_id=meeting_id, text='{"name": "老师0", "content": "开始"}',
+                                      summary=build_summary(i), key_points='["要点一", "要点二"]'))
+    db.session.commit()
+
+
+def serialize(options: list, counter: QueryCounter, repeat: bool = False):
+    """查询全部会议并序列化，返回 (查询数, 首次耗时, 再次序列化耗时)"""
+    db.session.expunge_all()
+    counter.selects = 0
+    start = time.perf_counter()
+    meetings = Meeting.query.options(*options).order_by(Meeting.created_at.desc()).all()
+    [m.to_dict(include_transcripts=True, include_teachers=True) for m in meetings]
+    first = time.perf_counter() - start
+    selects = counter.selects
+
+    second = None
+    if repeat:
+        start = time.perf_counter()
+        [m.to_dict(include_transcripts=True, include_teachers=True) for m in meetings]
+        second = time.perf_counter() - start
+    return selects, first, second
+
+
+def run(meetings: int, teachers: int, transcripts: int):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        seed(meetings, teachers, transcripts)
+
+        print(f"会议数: {meetings}，每个会议教师数: {teachers}，转写记录数: {transcripts}")
+        print(f"{'方式':<10}{'查询数':>10}{'首次序列化(ms)':>18}{'再次序列化(ms)':>18}")
+        for name, options in (('懒加载', []), ('预加载', serialization_options(include_transcripts=True))):
+            selects, first, second = serialize(options, counter, repeat=True)
+            print(f"{name:<10}{selects:>10}{first * 1000:>18.1f}{second * 1000:>18.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='会议序列化基准测试')
+    parser.add_argument('--meetings', type=int, default=1000, help='会议数')
+    parser.add_argument('--teachers', type=int, default=3, help='每个会议的参会教师数')
+    parser.add_argument('--transcripts', type=int, default=2, help='每个会议的转写记录数')
+    args = parser.parse_args()
+    run(args.meetings, args.teachers, args.transcripts)
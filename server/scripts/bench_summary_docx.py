@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+会议总结Word导出基准测试
+对比 python-docx 逐段构建与模板流式写入在大型会议总结上的耗时和文件大小，并核对两者的段落文本一致
+用法: python scripts/bench_summary_docx.py [--items 500] [--rounds 3]
+"""
+import sys
+import os
+import argparse
+import io
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document as DocxDocument
+from services.meeting_document_service import MeetingDocumentService
+
+
+def build_summary(items: int) -> dict:
+    """构造包含大量发言、问答、关键句和待办事项的会议总结"""
+    sentence = '本节课围绕分数除法的算理展开讨论，建议用线段图帮助学生理解除以一个数等于乘它的倒数。'
+    return {
+        'paragraph_summary': sentence * 20,
+        'conversational_summary': [
+            {'SpeakerName': f'老师{i}', 'Summary': sentence * 3} for i in range(items // 5)
+        ],
+        'questions_answering_summary': [
+            {'Question': f'第{i}个问题：{sentence}', 'Answer': sentence * 2} for i in range(items)
+        ],
+        'meeting_assistance': {
+            'keywords': ['分数除法', '倒数', '线段图', '算理', '分层练习'],
+            'key_sentences': [{'Text': f'{sentence}（{i}）'} for i in range(items)],
+            'actions': [{'Text': f'准备第{i}课时的分层练习'} for i in range(items // 2)],
+        },
+        'mind_map_summary': [{'Title': '分数除法'}],
+    }
+
+
+def paragraph_texts(data: bytes) -> list:
+    return [p.text for p in DocxDocument(io.BytesIO(data)).paragraphs]
+
+
+def run(items: int, rounds: int):
+    service = MeetingDocumentService(None)
+    meeting = {
+        'name': '六年级数学分数除法集体备课', 'subject': '数学', 'grade': '六年级', 'lesson_type': '新课',
+        'created_at': '2024-09-01T10:00:00', 'teachers': [{'name': '张老师'}, {'name': '李老师'}],
+    }
+    summary = build_summary(items)
+
+    engines = {
+        'python-docx': lambda f: service._render(meeting, summary).save(f),
+        '模板写入': lambda f: service.template_writer.write(f, meeting, summary),
+    }
+    outputs = {}
+    print(f"关键句/问答条数: {items}，轮数: {rounds}")
+    print(f"{'方式':<12}{'平均耗时(ms)':>14}{'文件大小':>14}")
+    for name, write in engines.items():
+        write(io.BytesIO())  # 预热（模板写入首次使用时生成骨架）
+        elapsed = []
+        for _ in range(rounds):
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            write(buffer)
+            elapsed.append(time.perf_counter() - start)
+        outputs[name] = buffer.getvalue()
+        print(f"{name:<12}{sum(elapsed) / rounds * 1000:>14.1f}{len(outputs[name]):>14,}")
+
+    legacy, fast = (paragraph_texts(data) for data in outputs.values())
+    print(f"段落数: {len(legacy)} / {len(fast)}，文本一致: {legacy == fast}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='会议总结Word导出基准测试')
+    parser.add_argument('--items', type=int, default=500, help='关键句和问答条数')
+    parser.add_argument('--rounds', type=int, default=3, help='每种方式的运行轮数')
+    args = parser.parse_args()
+    run(args.items, args.rounds)
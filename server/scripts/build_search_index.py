@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+重建会议全文检索索引
+为已有会议的转写记录、备课资料和会议总结生成检索片段（增量同步，可重复执行）
+用法: python scripts/build_search_index.py [--meeting-id <会议ID>] [--user-id <用户ID>]
+"""
+import sys
+import os
+import argparse
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from database import db
+from models import Meeting
+from services.search_service import search_service
+
+
+def build(meeting_id: str = None, user_id: int = None):
+    with app.app_context():
+        query = db.session.query(Meeting.id)
+        if meeting_id:
+            query = query.filter(Meeting.id == meeting_id)
+        if user_id:
+            query = query.filter(Meeting.user_id == user_id)
+        meeting_ids = [row.id for row in query.order_by(Meeting.created_at.asc()).all()]
+
+        start = time.perf_counter()
+        total = 0
+        for index, current_id in enumerate(meeting_ids, 1):
+            try:
+                changed = search_service.index_meeting(current_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ [{index}/{len(meeting_ids)}] {current_id} 索引失败: {str(e)}")
+                continue
+            total += changed
+            print(f"[{index}/{len(meeting_ids)}] {current_id} 更新片段: {changed}")
+        print(f"✅ 完成：{len(meeting_ids)} 个会议，更新片段 {total} 个，耗时 {time.perf_counter() - start:.1f} 秒")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='重建会议全文检索索引')
+    parser.add_argument('--meeting-id', help='只索引指定会议')
+    parser.add_argument('--user-id', type=int, help='只索引指定用户的会议')
+    args = parser.parse_args()
+    build(args.meeting_id, args.user_id)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+本地模拟通义听悟实时推流服务
+接收 StartTranscription 和二进制音频帧，按收到的音频时长推送脚本化的
+SentenceBegin / TranscriptionResultChanged / SentenceEnd 事件，或回放录制文件中的消息。
+
+每个音频帧的前 8 字节如果是压测脚本写入的发送时间戳（毫秒），
+由该帧触发的事件会把它放在 payload.time 中，后端原样透传到 transcript_update.timestamp，
+压测脚本据此计算端到端延迟。
+
+依赖: pip install websockets
+用法:
+    python scripts/fake_tingwu_server.py [--port 8765] [--partial-ms 200]
+    python scripts/fake_tingwu_server.py --session recordings/xxx.rtrec
+后端推流地址（start_recognition 的 stream_url）: ws://127.0.0.1:8765/<任意路径>
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import websockets
+except ImportError:
+    print("需要安装 websockets: pip install websockets")
+    sys.exit(1)
+
+DEFAULT_SCRIPT = [
+    '今天我们来讨论分数除法这一单元的教学设计',
+    '重点是让学生理解除以一个数等于乘这个数的倒数',
+    '难点在于算理的直观解释，可以借助线段图',
+    '课堂活动安排小组合作探究，最后做分层练习',
+]
+
+# 时间戳合法范围（毫秒），用于判断音频帧是否带有压测时间戳
+_STAMP_MIN = 1_500_000_000_000
+_STAMP_MAX = 4_000_000_000_000
+
+
+def read_stamp(frame: bytes):
+    """读取音频帧前 8 字节的发送时间戳（没有时返回 None）"""
+    if len(frame) < 8:
+        return None
+    stamp = struct.unpack('<q', frame[:8])[0]
+    return stamp if _STAMP_MIN <= stamp <= _STAMP_MAX else None
+
+
+def make_event(name: str, task_id: str, **payload) -> str:
+    return json.dumps({
+        'header': {'name': name, 'namespace': 'SpeechTranscriber', 'task_id': task_id, 'status': 20000000},
+        'payload': payload,
+    }, ensure_ascii=False)
+
+
+class ScriptedSession:
+    """按收到的音频时长推进脚本：每 partial_ms 推送一次中间结果，每句结束推送 SentenceEnd"""
+
+    def __init__(self, script, bytes_per_ms: float, partial_ms: int, chars_per_partial: int):
+        self.script = script
+        self.bytes_per_partial = max(1, int(bytes_per_ms * partial_ms))
+        self.chars_per_partial = chars_per_partial
+        self.received = 0
+        self.next_at = self.bytes_per_partial
+        self.sentence = 0
+        self.chars = 0
+
+    def on_audio(self, size: int, stamp, task_id: str):
+        """返回本帧触发的事件列表"""
+        self.received += size
+        events = []
+        while self.received >= self.next_at:
+            self.next_at += self.bytes_per_partial
+            text = self.script[self.sentence % len(self.script)]
+            now = stamp or int(time.time() * 1000)
+            if self.chars == 0:
+                events.append(make_event('SentenceBegin', task_id, index=self.sentence + 1, time=now))
+            self.chars = min(len(text), self.chars + self.chars_per_partial)
+            if self.chars < len(text):
+                events.append(make_event('TranscriptionResultChanged', task_id, index=self.sentence + 1,
+                                         time=now, result=text[:self.chars]))
+            else:
+                events.append(make_event('SentenceEnd', task_id, index=self.sentence + 1,
+                                         time=now, result=text))
+                self.sentence += 1
+                self.chars = 0
+        return events
+
+
+async def replay_session(websocket, messages, task_id: str, stamps: list):
+    """按录制的相对时间回放通义听悟消息（payload.time 替换为最近一帧的时间戳）"""
+    started = time.monotonic()
+    for offset_ms, message in messages:
+        delay = offset_ms / 1000.0 - (time.monotonic() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = message.setdefault('payload', {})
+        if stamps[0] is not None:
+            payload['time'] = stamps[0]
+        message.setdefault('header', {})['task_id'] = task_id
+        await websocket.send(json.dumps(message, ensure_ascii=False))
+
+
+def make_handler(args, recorded_messages, stats):
+    async def handler(websocket, *_):
+        task_id = f"fake-{id(websocket):x}"
+        stats['connections'] += 1
+        session = ScriptedSession(DEFAULT_SCRIPT, args.sample_rate * 2 / 1000.0, args.partial_ms, args.chars)
+        stamps = [None]
+        replay = None
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    command = json.loads(message).get('header', {}).get('name')
+                    if command == 'StartTranscription':
+                        await websocket.send(make_event('TranscriptionStarted', task_id))
+                        if recorded_messages:
+                            replay = asyncio.ensure_future(
+                                replay_session(websocket, [(o, dict(m)) for o, m in recorded_messages], task_id, stamps)
+                            )
+                    elif command == 'StopTranscription':
+                        await websocket.send(make_event('TranscriptionCompleted', task_id))
+                        break
+                    continue
+
+                stats['frames'] += 1
+                stats['bytes'] += len(message)
+                stamps[0] = read_stamp(message)
+                if recorded_messages:
+                    continue
+                for event in session.on_audio(len(message), stamps[0], task_id):
+                    await websocket.send(event)
+                    stats['events'] += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if replay is not None:
+                replay.cancel()
+            stats['connections'] -= 1
+    return handler
+
+
+async def report(stats, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(f"[{time.strftime('%H:%M:%S')}] 连接: {stats['connections']}  音频帧: {stats['frames']}  "
+              f"音频字节: {stats['bytes']:,}  推送事件: {stats['events']}", flush=True)
+
+
+async def main(args):
+    recorded_messages = []
+    if args.session:
+        from services.session_recorder import read_session, RECORD_MESSAGE
+        recorded_messages = [(offset, payload) for kind, offset, payload in read_session(args.session)
+                             if kind == RECORD_MESSAGE]
+        print(f"回放录制文件: {args.session}，消息数: {len(recorded_messages)}")
+
+    stats = {'connections': 0, 'frames': 0, 'bytes': 0, 'events': 0}
+    async with websockets.serve(make_handler(args, recorded_messages, stats), args.host, args.port, max_size=None):
+        print(f"模拟通义听悟服务已启动: ws://{args.host}:{args.port}/")
+        await report(stats, args.report_interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地模拟通义听悟实时推流服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='音频采样率（用于换算音频时长）')
+    parser.add_argument('--partial-ms', type=int, default=200, help='每收到多少毫秒音频推送一次中间结果')
+    parser.add_argument('--chars', type=int, default=3, help='每次中间结果新增的字数')
+    parser.add_argument('--session', help='回放录制文件（REALTIME_RECORD_DIR 下的 .rtrec）中的通义听悟消息')
+    parser.add_argument('--report-interval', type=float, default=5.0, help='统计输出间隔（秒）')
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
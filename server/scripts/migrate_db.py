@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+执行数据库迁移
+在数据库锁内创建缺失的表并执行待应用的迁移；--dry-run 只列出待执行的 DDL 和锁影响估计，不修改数据库。
+关闭启动时迁移（AUTO_MIGRATE=false）后，在发布新版本前执行本脚本。
+用法: python scripts/migrate_db.py [--dry-run]
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from config import Config
+from database import db, configure_db
+from utils.migration_manager import run_migrations, plan_migrations, format_plan
+
+
+def create_app():
+    """只配置数据库，不触发启动时迁移"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    configure_db(app)
+    return app
+
+
+def main(dry_run: bool = False) -> bool:
+    app = create_app()
+    if dry_run:
+        print(format_plan(plan_migrations(app)))
+        return True
+
+    def create_tables():
+        db.create_all()
+
+    success = run_migrations(app, prepare=create_tables)
+    print("✅ 数据库迁移完成" if success else "❌ 数据库迁移失败，详见日志")
+    return success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='执行数据库迁移')
+    parser.add_argument('--dry-run', action='store_true', help='只报告待执行的 DDL 和锁影响估计，不修改数据库')
+    args = parser.parse_args()
+    sys.exit(0 if main(args.dry_run) else 1)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+实时转写链路压测
+模拟 N 个并发会议：每个会议一个推流客户端（按实时速率发送 audio_data）和若干观察者，
+后端连接 scripts/fake_tingwu_server.py 模拟的通义听悟服务，统计
+audio_data -> 通义听悟 -> transcript_update 的端到端延迟分位数，以及后端进程的 CPU/内存。
+
+音频帧前 8 字节写入发送时间戳（毫秒），模拟服务把它放回事件的 payload.time，
+后端透传到 transcript_update.timestamp，因此延迟 = 收到时间 - timestamp。
+压测时请关闭 AUDIO_VAD_ENABLED，避免时间戳所在的帧被静默检测过滤。
+
+依赖: python-socketio（requirements.txt 已包含）、psutil（可选，统计后端 CPU/内存）
+用法:
+    python scripts/fake_tingwu_server.py &
+    python scripts/realtime_load_test.py --meetings 20 --observers 5 --duration 60 --server-pid <后端PID>
+    python scripts/realtime_load_test.py --session recordings/xxx.rtrec   # 使用录制的音频
+"""
+import sys
+import os
+import argparse
+import base64
+import math
+import struct
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+class LatencyStats:
+    """线程安全的延迟和计数统计"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.updates = 0
+        self.finals = 0
+        self.frames_sent = 0
+        self.errors = []
+
+    def record_update(self, payload: dict):
+        now = int(time.time() * 1000)
+        timestamp = payload.get('timestamp') or 0
+        with self.lock:
+            self.updates += 1
+            if payload.get('is_final'):
+                self.finals += 1
+            if 0 < now - timestamp < 600_000:
+                self.latencies.append(now - timestamp)
+
+    def record_frame(self):
+        with self.lock:
+            self.frames_sent += 1
+
+    def record_error(self, message: str):
+        with self.lock:
+            self.errors.append(message)
+
+
+class ResourceSampler(threading.Thread):
+    """每秒采样一次后端进程的 CPU 和内存"""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.cpu = []
+        self.rss = []
+        self.running = True
+
+    def run(self):
+        self.process.cpu_percent(None)
+        while self.running:
+            time.sleep(1.0)
+            try:
+                self.cpu.append(self.process.cpu_percent(None))
+                self.rss.append(self.process.memory_info().rss)
+            except psutil.Error:
+                break
+
+
+def synthetic_frames(sample_rate: int, chunk_ms: int):
+    """生成调幅正弦波音频帧（模拟有停顿的说话，便于同时验证静默检测）"""
+    samples = sample_rate * chunk_ms // 1000
+    index = 0
+    while True:
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * index * chunk_ms / 4000.0)
+        frame = bytearray()
+        for n in range(samples):
+            t = (index * samples + n) / sample_rate
+            frame += struct.pack('<h', int(8000 * envelope * math.sin(2 * math.pi * 220 * t)))
+        yield bytes(frame)
+        index += 1
+
+
+def recorded_frames(path: str):
+    """循环读取录制文件中的上行音频帧"""
+    from services.session_recorder import read_session, RECORD_AUDIO
+    frames = [payload for kind, _, payload in read_session(path) if kind == RECORD_AUDIO]
+    if not frames:
+        raise SystemExit(f"录制文件中没有音频帧: {path}")
+    while True:
+        yield from frames
+
+
+def stamp(frame: bytes) -> bytes:
+    """把当前时间戳（毫秒）写入音频帧前 8 字节"""
+    return struct.pack('<q', int(time.time() * 1000)) + frame[8:]
+
+
+def connect_client(args, meeting_id: str, stats: LatencyStats) -> socketio.Client:
+    """连接后端并加入会议房间"""
+    client = socketio.Client(reconnection=False)
+    joined = threading.Event()
+    client.on('joined', lambda data: joined.set())
+    client.on('transcript_update', stats.record_update)
+    client.on('error', lambda data: stats.record_error(str(data.get('message'))))
+    client.connect(args.url, transports=['websocket'])
+    client.emit('join_meeting', {'meeting_id': meeting_id})
+    if not joined.wait(10):
+        raise RuntimeError(f"加入会议房间超时: {meeting_id}")
+    return client
+
+
+def run_meeting(args, index: int, stats: LatencyStats, start_barrier: threading.Barrier):
+    """单个会议：推流客户端 + 观察者"""
+    # Demo 模式：会议ID包含 mock 时不需要数据库中存在会议；推流地址不能包含 mock
+    meeting_id = f"mock_load_{index}"
+    stream_url = f"{args.tingwu_url.rstrip('/')}/load-{index}"
+    clients = []
+    try:
+        publisher = connect_client(args, meeting_id, stats)
+        clients.append(publisher)
+        for _ in range(args.observers):
+            clients.append(connect_client(args, meeting_id, stats))
+
+        started = threading.Event()
+        publisher.on('recognition_started', lambda data: started.set())
+        publisher.emit('start_recognition', {'meeting_id': meeting_id, 'stream_url': stream_url})
+        if not started.wait(15):
+            raise RuntimeError(f"启动识别超时: {meeting_id}")
+    except Exception as e:
+        stats.record_error(str(e))
+        start_barrier.abort()
+        for client in clients:
+            client.disconnect()
+        return
+
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+
+    frames = recorded_frames(args.session) if args.session else synthetic_frames(args.sample_rate, args.chunk_ms)
+    deadline = time.monotonic() + args.duration
+    next_send = time.monotonic()
+    while time.monotonic() < deadline:
+        frame = stamp(next(frames))
+        publisher.emit('audio_data', {
+            'meeting_id': meeting_id,
+            'audio_data': base64.b64encode(frame).decode('ascii'),
+            'format': 'pcm',
+        })
+        stats.record_frame()
+        next_send += args.chunk_ms / 1000.0
+        time.sleep(max(0.0, next_send - time.monotonic()))
+
+    publisher.emit('stop_recognition', {'meeting_id': meeting_id})
+    time.sleep(1.0)  # 等待最后的结果
+    for client in clients:
+        client.disconnect()
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(p / 100.0 * len(ordered))) - 1)]
+
+
+def run(args):
+    stats = LatencyStats()
+    sampler = None
+    if args.server_pid:
+        if PSUTIL_AVAILABLE:
+            sampler = ResourceSampler(args.server_pid)
+            sampler.start()
+        else:
+            print("未安装 psutil，跳过后端 CPU/内存统计（pip install psutil）")
+
+    barrier = threading.Barrier(args.meetings)
+    threads = [threading.Thread(target=run_meeting, args=(args, i, stats, barrier), daemon=True)
+               for i in range(args.meetings)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+        time.sleep(args.ramp / max(1, args.meetings))
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if sampler:
+        sampler.running = False
+
+    latencies = stats.latencies
+    print(f"会议数: {args.meetings}  每会议客户端: {1 + args.observers}  时长: {elapsed:.1f}s")
+    print(f"发送音频帧: {stats.frames_sent}  收到 transcript_update: {stats.updates}（最终结果 {stats.finals}）")
+    print(f"端到端延迟(ms)  p50: {percentile(latencies, 50):.0f}  p90: {percentile(latencies, 90):.0f}  "
+          f"p99: {percentile(latencies, 99):.0f}  max: {max(latencies) if latencies else 0:.0f}  样本: {len(latencies)}")
+    if sampler and sampler.cpu:
+        print(f"后端 CPU(%)  平均: {sum(sampler.cpu) / len(sampler.cpu):.1f}  峰值: {max(sampler.cpu):.1f}")
+        print(f"后端内存(MB)  峰值: {max(sampler.rss) / (1024 * 1024):.1f}")
+    if stats.errors:
+        print(f"错误 {len(stats.errors)} 个，例如: {stats.errors[0]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='实时转写链路压测')
+    parser.add_argument('--url', default='http://127.0.0.1:5001', help='后端 Socket.IO 地址')
+    parser.add_argument('--tingwu-url', default='ws://127.0.0.1:8765', help='模拟通义听悟服务地址')
+    parser.add_argument('--meetings', type=int, default=10, help='并发会议数')
+    parser.add_argument('--observers', type=int, default=3, help='每个会议的观察者客户端数')
+    parser.add_argument('--duration', type=float, default=30, help='每个会议的推流时长（秒）')
+    parser.add_argument('--chunk-ms', type=int, default=100, help='音频帧时长（毫秒）')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='合成音频采样率')
+    parser.add_argument('--ramp', type=float, default=5.0, help='所有会议建立连接的总时长（秒）')
+    parser.add_argument('--session', help='使用录制文件（.rtrec）中的音频帧')
+    parser.add_argument('--server-pid', type=int, help='后端进程PID（统计 CPU/内存，需要 psutil）')
+    run(parser.parse_args())
@@ -0,0 +1,303 @@
+"""
+实时音频接入
+
+浏览器默认上传 16kHz 的 16 位 PCM（与默认的通义听悟任务格式一致，直接透传）；
+也可以上传压缩音频（Opus / WebM / Ogg），在服务端按会议做流式处理后再发给通义听悟：
+- 上传格式与通义听悟任务的音频格式一致（如都是 opus）时直接透传；
+- 通义听悟任务为 pcm 时，压缩音频用 PyAV 流式解码并重采样到任务采样率；
+- 上传 PCM 的采样率与任务不同时，用 NumPy 线性插值流式重采样；
+- 开启 AUDIO_VAD_ENABLED 时，送往通义听悟的 PCM 先经过语音活动检测门限，
+  静默段只发送保活帧（见 services/voice_activity.py）。
+
+PyAV 和 NumPy 都是可选依赖：未安装时只支持与任务格式一致的透传。
+无法转换的数据块直接丢弃，每个会议每种原因只记录一次警告（不按数据块刷日志）。
+"""
+import io
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from config import Config
+from services import voice_activity
+from services.voice_activity import VoiceActivityGate
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入NumPy（PCM重采样）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 尝试导入PyAV（压缩音频解码）
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+# 容器格式 -> FFmpeg 解复用器
+CONTAINER_FORMATS = {
+    'webm': 'matroska',
+    'ogg': 'ogg',
+}
+
+# 裸 Opus 包（如 WebCodecs AudioEncoder 输出）的采样率
+OPUS_SAMPLE_RATE = 48000
+
+
+class LinearResampler:
+    """16 位单声道 PCM 的流式线性插值重采样（跨数据块保持相位连续）"""
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self._step = source_rate / target_rate
+        self._position = 0.0  # 下一个输出样本在（上一块末尾样本 + 本块）中的位置
+        self._tail = None
+
+    def process(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+        if self._tail is not None:
+            samples = np.concatenate((self._tail, samples))
+        if samples.size < 2:
+            self._tail = samples
+            return b''
+
+        last_index = samples.size - 1
+        positions = np.arange(self._position, last_index, self._step)
+        output = np.interp(positions, np.arange(samples.size), samples)
+        next_position = (positions[-1] + self._step) if positions.size else self._position
+        self._position = next_position - last_index
+        self._tail = samples[-1:]
+        return np.clip(np.rint(output), -32768, 32767).astype('<i2').tobytes()
+
+
+class _StreamReader(io.RawIOBase):
+    """由数据块喂入的阻塞式只读流（供 PyAV 解复用）"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def feed(self, data: bytes):
+        with self._condition:
+            self._buffer.extend(data)
+            self._condition.notify()
+
+    def finish(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def readable(self):
+        return True
+
+    def readinto(self, target) -> int:
+        with self._condition:
+            while not self._buffer and not self._closed:
+                self._condition.wait()
+            size = min(len(target), len(self._buffer))
+            target[:size] = self._buffer[:size]
+            del self._buffer[:size]
+            return size
+
+
+class _ContainerDecoder:
+    """容器格式（WebM / Ogg）的流式解码线程：解复用 -> 解码 -> 重采样为 16 位单声道 PCM"""
+
+    def __init__(self, container_format: str, sample_rate: int, sink: Callable[[bytes], None]):
+        self.container_format = container_format
+        self.sample_rate = sample_rate
+        self.sink = sink
+        self.reader = _StreamReader()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='audio-ingest')
+        self.thread.start()
+
+    def feed(self, data: bytes):
+        self.reader.feed(data)
+
+    def close(self):
+        self.reader.finish()
+
+    def _run(self):
+        try:
+            container = av.open(self.reader, mode='r', format=CONTAINER_FORMATS[self.container_format])
+            resampler = av.AudioResampler(format='s16', layout='mono', rate=self.sample_rate)
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    self.sink(resampled.to_ndarray().tobytes())
+        except Exception as e:
+            logger.error(f"[音频接入] 流式解码失败 ({self.container_format}): {str(e)}")
+
+
+class AudioIngest:
+    """单个会议的音频接入管道"""
+
+    def __init__(self, meeting_id: str, upstream_format: str, sample_rate: int, sink: Callable[[bytes], None]):
+        """
+        Args:
+            meeting_id: 会议ID
+            upstream_format: 通义听悟任务的音频格式（pcm、opus 等）
+            sample_rate: 通义听悟任务的采样率
+            sink: 处理后的音频输出（通常是 TyingWuWebSocketClient.send_audio）
+        """
+        self.meeting_id = meeting_id
+        self.upstream_format = upstream_format
+        self.sample_rate = sample_rate
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._resampler: Optional[LinearResampler] = None
+        self._container: Optional[_ContainerDecoder] = None
+        self._opus_decoder = None
+        self._opus_resampler = None
+        self._warned = set()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._gate: Optional[VoiceActivityGate] = None
+        if Config.AUDIO_VAD_ENABLED and upstream_format == 'pcm':
+            if voice_activity.NUMPY_AVAILABLE:
+                self._gate = VoiceActivityGate(sample_rate, self._deliver)
+            else:
+                self._warn_once('vad', "numpy 未安装，语音活动检测未启用")
+
+    def _deliver(self, data: bytes):
+        self.bytes_out += len(data)
+        self.sink(data)
+
+    def _emit(self, data: bytes):
+        if not data:
+            return
+        if self._gate is not None:
+            self._gate.process(data)
+        else:
+            self._deliver(data)
+
+    def _warn_once(self, key: str, message: str):
+        if key not in self._warned:
+            self._warned.add(key)
+            logger.warning(f"[音频接入] {message}，会议ID: {self.meeting_id}")
+
+    def feed(self, data: bytes, audio_format: str = 'pcm', source_rate: Optional[int] = None):
+        """
+        接收一个音频数据块
+
+        Args:
+            data: 音频数据
+            audio_format: 上传格式（pcm、opus、webm、ogg）
+            source_rate: 上传 PCM 的采样率（默认与任务一致）
+        """
+        audio_format = (audio_format or 'pcm').lower()
+        self.bytes_in += len(data)
+
+        with self._lock:
+            # 与通义听悟任务格式一致：直接透传
+            if audio_format == self.upstream_format and (audio_format != 'pcm' or not source_rate
+                                                         or source_rate == self.sample_rate):
+                self._emit(data)
+                return
+
+            if self.upstream_format != 'pcm':
+                self._warn_once(f'upstream:{audio_format}',
+                                f"通义听悟任务格式为 {self.upstream_format}，不支持上传 {audio_format} 音频，已丢弃")
+                return
+
+            if audio_format == 'pcm':
+                self._feed_pcm(data, source_rate)
+            elif audio_format in CONTAINER_FORMATS:
+                self._feed_container(data, audio_format)
+            elif audio_format == 'opus':
+                self._feed_opus_packet(data)
+            else:
+                self._warn_once(f'format:{audio_format}', f"不支持的音频格式 {audio_format}，已丢弃")
+
+    def _feed_pcm(self, data: bytes, source_rate: int):
+        if not NUMPY_AVAILABLE:
+            self._warn_once('numpy', f"numpy 未安装，无法将 {source_rate}Hz PCM 重采样到 {self.sample_rate}Hz，原样发送")
+            self._emit(data)
+            return
+        if self._resampler is None or self._resampler.source_rate != source_rate:
+            self._resampler = LinearResampler(source_rate, self.sample_rate)
+        self._emit(self._resampler.process(data))
+
+    def _feed_container(self, data: bytes, audio_format: str):
+        if not PYAV_AVAILABLE:
+            self._warn_once('pyav', "PyAV 未安装，无法解码压缩音频，已丢弃（请运行: pip install av）")
+            return
+        if self._container is None:
+            self._container = _ContainerDecoder(audio_format, self.sample_rate, self._emit)
+        self._container.feed(data)
+
+    def _feed_opus_packet(self, data: bytes):
+        if not PYAV_AVAILABLE:
+            self._warn_once('pyav', "PyAV 未安装，无法解码 Opus 音频，已丢弃（请运行: pip install av）")
+            return
+        if self._opus_decoder is None:
+            self._opus_decoder = av.CodecContext.create('opus', 'r')
+            self._opus_decoder.sample_rate = OPUS_SAMPLE_RATE
+            self._opus_resampler = av.AudioResampler(format='s16', layout='mono', rate=self.sample_rate)
+        for frame in self._opus_decoder.decode(av.Packet(data)):
+            for resampled in self._opus_resampler.resample(frame):
+                self._emit(resampled.to_ndarray().tobytes())
+
+    def close(self):
+        """关闭管道（结束流式解码线程）"""
+        with self._lock:
+            if self._container is not None:
+                self._container.close()
+                self._container = None
+
+    def stats(self) -> Dict:
+        data = {
+            'upstream_format': self.upstream_format,
+            'sample_rate': self.sample_rate,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+        }
+        if self._gate is not None:
+            data['vad'] = self._gate.stats()
+        return data
+
+
+class AudioIngestManager:
+    """按会议管理音频接入管道"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines: Dict[str, AudioIngest] = {}
+
+    def open(self, meeting_id: str, sink: Callable[[bytes], None], upstream_format: Optional[str] = None,
+             sample_rate: Optional[int] = None) -> AudioIngest:
+        """为会议创建（或替换）音频接入管道"""
+        pipeline = AudioIngest(
+            meeting_id,
+            (upstream_format or Config.TYTINGWU_AUDIO_FORMAT).lower(),
+            sample_rate or Config.TYTINGWU_SAMPLE_RATE,
+            sink
+        )
+        with self._lock:
+            old = self._pipelines.pop(meeting_id, None)
+            self._pipelines[meeting_id] = pipeline
+        if old is not None:
+            old.close()
+        return pipeline
+
+    def get(self, meeting_id: str) -> Optional[AudioIngest]:
+        with self._lock:
+            return self._pipelines.get(meeting_id)
+
+    def close(self, meeting_id: str):
+        with self._lock:
+            pipeline = self._pipelines.pop(meeting_id, None)
+        if pipeline is not None:
+            pipeline.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {meeting_id: p.stats() for meeting_id, p in self._pipelines.items()}
+
+
+# 全局音频接入管理器
+audio_ingest_manager = AudioIngestManager()
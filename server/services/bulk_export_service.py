@@ -0,0 +1,258 @@
+"""
+会议批量导出
+
+按筛选条件（时间范围、学科、年级）把多个会议的总结Word文档和思维导图、转写记录（JSONL）
+和备课资料摘要（JSONL）打包成 zip，边生成边以流式响应发送给客户端：
+- 条目由有界线程池并发生成（总结文档渲染是 CPU 密集的），同时在途的会议数有上限；
+- zip 直接写入不可回退的输出流（条目使用数据描述符），已完成的数据块立即发送；
+- 总结文档复用按版本缓存的导出文件，分块从磁盘拷贝进 zip。
+因此无论导出多少会议，内存占用只与并发会议数有关。
+"""
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from config import Config
+from database import db
+from models.document import Document
+from models.meeting import Meeting
+from models.transcript import Transcript
+from services.meeting_archive_service import meeting_archive_service
+
+logger = logging.getLogger(__name__)
+
+# 可导出的内容
+EXPORT_PARTS = ('summary', 'transcripts', 'documents')
+
+# 从磁盘拷贝文件时的块大小
+_COPY_CHUNK = 256 * 1024
+
+
+def safe_filename(name: str, limit: int = 50) -> str:
+    """清理文件名中的特殊字符"""
+    return ''.join(c for c in (name or '') if c.isalnum() or c in (' ', '-', '_'))[:limit].strip() or '会议'
+
+
+class _ChunkSink:
+    """zip 的输出目标：只支持顺序写入，写入的数据由生成器取走发送"""
+
+    def __init__(self):
+        self._chunks = deque()
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        while self._chunks:
+            yield self._chunks.popleft()
+
+
+class BulkExportService:
+    """会议批量导出服务"""
+
+    def __init__(self, document_service, max_workers: Optional[int] = None):
+        """
+        Args:
+            document_service: MeetingDocumentService 实例（获取总结Word文档的导出文件）
+            max_workers: 并发生成条目的线程数
+        """
+        self.document_service = document_service
+        self.max_workers = max_workers or Config.BULK_EXPORT_WORKERS
+
+    def find_meetings(self, user_id: int, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      subject: Optional[str] = None, grade: Optional[str] = None) -> List[str]:
+        """按筛选条件查询会议ID（按创建时间升序）"""
+        query = db.session.query(Meeting.id).filter(Meeting.user_id == user_id)
+        if date_from:
+            query = query.filter(Meeting.created_at >= date_from)
+        if date_to:
+            query = query.filter(Meeting.created_at < date_to)
+        if subject:
+            query = query.filter(Meeting.subject == subject)
+        if grade:
+            query = query.filter(Meeting.grade == grade)
+        return [row.id for row in query.order_by(Meeting.created_at.asc()).all()]
+
+    def _build_entries(self, app, meeting_id: str, user_id: int, parts: tuple) -> Dict:
+        """在工作线程中生成单个会议的导出条目（失败时返回带 error 的结果，不中断整个导出）"""
+        with app.app_context():
+            try:
+                return self._collect_entries(meeting_id, user_id, parts)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"[批量导出] 生成会议条目失败，会议ID: {meeting_id}, 错误: {str(e)}", exc_info=True)
+                return self._failed_result(meeting_id, e)
+
+    @staticmethod
+    def _failed_result(meeting_id: str, error: Exception) -> Dict:
+        return {'meeting_id': meeting_id, 'error': str(error), 'entries': [], 'files': []}
+
+    def _collect_entries(self, meeting_id: str, user_id: int, parts: tuple) -> Dict:
+        """生成单个会议的导出条目（调用方提供应用上下文）"""
+        meeting = Meeting.query.filter_by(id=meeting_id, user_id=user_id).first()
+        if not meeting:
+            return {'meeting_id': meeting_id, 'entries': [], 'files': []}
+
+        created = meeting.created_at.strftime('%Y%m%d') if meeting.created_at else 'unknown'
+        folder = f"{created}_{safe_filename(meeting.name)}_{meeting_id[:8]}"
+        result = {
+            'meeting_id': meeting_id,
+            'folder': folder,
+            'name': meeting.name,
+            'subject': meeting.subject,
+            'grade': meeting.grade,
+            'created_at': meeting.created_at.isoformat() if meeting.created_at else None,
+            'entries': [],  # (条目名, 字节)
+            'files': [],    # (条目名, 磁盘路径)
+        }
+
+        if 'summary' in parts:
+            try:
+                export = self.document_service.get_summary_export(meeting_id, user_id=user_id)
+                if export:
+                    result['files'].append((f"{folder}/会议总结.docx", export[0]))
+            except ValueError:
+                pass  # 没有会议总结
+            except Exception as e:
+                logger.warning(f"[批量导出] 生成会议总结文档失败，会议ID: {meeting_id}, 错误: {str(e)}")
+            try:
+                mind_map = self.document_service.get_mind_map(meeting_id, user_id=user_id)
+                if mind_map:
+                    result['files'].append((f"{folder}/思维导图.svg", mind_map[2]))
+            except ValueError:
+                pass  # 没有思维导图
+            except Exception as e:
+                logger.warning(f"[批量导出] 生成思维导图失败，会议ID: {meeting_id}, 错误: {str(e)}")
+
+        if 'transcripts' in parts:
+            rows = Transcript.query.filter_by(meeting_id=meeting_id).order_by(Transcript.created_at.asc()).all()
+            # 已归档的会议直接从归档文件读取转写文本，导出不恢复到数据库
+            try:
+                archived_texts = meeting_archive_service.read_transcripts(meeting)
+            except Exception as e:
+                archived_texts = {}
+                logger.warning(f"[批量导出] 读取归档文件失败，转写文本为空，会议ID: {meeting_id}, 错误: {str(e)}")
+            if rows:
+                lines = [json.dumps({
+                    'id': t.id,
+                    'text': archived_texts.get(t.id, t.text),
+                    'duration': t.duration,
+                    'created_at': t.created_at.isoformat() if t.created_at else None,
+                }, ensure_ascii=False) for t in rows]
+                result['entries'].append((f"{folder}/转写记录.jsonl", ('\n'.join(lines) + '\n').encode('utf-8')))
+
+        if 'documents' in parts:
+            rows = db.session.query(
+                Document.original_filename, Document.file_type, Document.status, Document.summary
+            ).filter(Document.meeting_id == meeting_id).order_by(Document.id.asc()).all()
+            if rows:
+                lines = [json.dumps({
+                    'filename': row.original_filename,
+                    'file_type': row.file_type,
+                    'status': row.status,
+                    'summary': row.summary,
+                }, ensure_ascii=False) for row in rows]
+                result['entries'].append((f"{folder}/备课资料摘要.jsonl", ('\n'.join(lines) + '\n').encode('utf-8')))
+
+        return result
+
+    @staticmethod
+    def _copy_file(archive: zipfile.ZipFile, name: str, path: str, sink: _ChunkSink) -> Iterator[bytes]:
+        """
+        分块把磁盘文件写入 zip，写入过程中产生的数据立即交给调用方
+
+        先打开源文件再开始 zip 条目，文件不存在或不可读时不会留下写了一半的条目。
+        """
+        with open(path, 'rb') as source:
+            os.fstat(source.fileno())
+            with archive.open(name, 'w', force_zip64=True) as target:
+                while True:
+                    chunk = source.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    yield from sink.drain()
+
+    def stream_zip(self, app, meeting_ids: List[str], user_id: int, parts: tuple = EXPORT_PARTS) -> Iterator[bytes]:
+        """
+        生成 zip 数据流
+
+        Args:
+            app: Flask 应用（工作线程中创建应用上下文）
+            meeting_ids: 会议ID列表
+            user_id: 用户ID（权限检查）
+            parts: 导出内容（summary、transcripts、documents）
+        """
+        sink = _ChunkSink()
+        archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED)
+        manifest = []
+        window = self.max_workers * 2  # 同时在途的会议数上限
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bulk-export') as pool:
+            pending = deque()
+            remaining = iter(meeting_ids)
+            try:
+                for meeting_id in remaining:
+                    pending.append((meeting_id, pool.submit(self._build_entries, app, meeting_id, user_id, parts)))
+                    if len(pending) < window:
+                        continue
+                    yield from self._write_result(archive, self._result(*pending.popleft()), sink, manifest)
+                while pending:
+                    yield from self._write_result(archive, self._result(*pending.popleft()), sink, manifest)
+            finally:
+                # 客户端中途断开时取消尚未开始的任务
+                for _, future in pending:
+                    future.cancel()
+
+        archive.writestr('manifest.json', json.dumps({
+            'exported_at': datetime.now().isoformat(),
+            'meetings': manifest,
+        }, ensure_ascii=False, indent=2))
+        archive.close()
+        yield from sink.drain()
+
+    def _result(self, meeting_id: str, future) -> Dict:
+        """取工作线程的结果；响应已经开始发送，异常只记录到清单，不中断 zip 流"""
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"[批量导出] 生成会议条目失败，会议ID: {meeting_id}, 错误: {str(e)}")
+            return self._failed_result(meeting_id, e)
+
+    def _write_result(self, archive: zipfile.ZipFile, result: Dict, sink: _ChunkSink,
+                      manifest: List[Dict]) -> Iterator[bytes]:
+        """把单个会议的条目写入 zip（失败的会议只在清单中记录错误）"""
+        if result.get('error'):
+            manifest.append({'meeting_id': result['meeting_id'], 'error': result['error'], 'files': []})
+            return
+        if not result.get('folder'):
+            return
+        names = []
+        for name, path in result['files']:
+            try:
+                yield from self._copy_file(archive, name, path, sink)
+                names.append(name)
+            except OSError as e:
+                logger.warning(f"[批量导出] 读取导出文件失败: {path}, 错误: {str(e)}")
+        for name, data in result['entries']:
+            archive.writestr(name, data)
+            names.append(name)
+            yield from sink.drain()
+        manifest.append({
+            'meeting_id': result['meeting_id'],
+            'name': result['name'],
+            'subject': result['subject'],
+            'grade': result['grade'],
+            'created_at': result['created_at'],
+            'files': names,
+        })
@@ -0,0 +1,307 @@
+"""
+AI对话上下文构建器
+
+按 token 预算组装提示词：
+- 最近的若干轮对话原样保留；
+- 更早的对话增量折叠进按会议和用户缓存的滚动摘要（只处理新增的轮次）；
+- 备课资料通过检索索引取出与当前问题最相关的片段（没有问题时按摘要相关度放入）。
+这样无论会议持续多久，发给模型的提示词大小都有上界。
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import Config
+from services.prompt_context_cache import (
+    prompt_context_cache, PROMPT_INSTRUCTION, DocumentDigest, MeetingContext
+)
+from services.document_retrieval import document_retrieval, Passage
+
+logger = logging.getLogger(__name__)
+
+_CJK_RE = re.compile(r'[㐀-鿿豈-﫿]')
+_SENTENCE_END_RE = re.compile(r'[。！？!?；;\n]')
+
+# 检索片段使用说明
+PASSAGES_NOTE = "说明：以上是备课资料中与当前问题最相关的片段，请结合这些内容提供专业的备课建议。"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+
+    中文按每字约 1 个 token，其余字符按每 4 个字符约 1 个 token 估算，
+    只用于预算控制，不追求与模型分词器完全一致。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """将文本截断到大约 max_tokens 个 token"""
+    if max_tokens <= 0:
+        return ''
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 二分查找满足预算的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + '…'
+
+
+def _format_turn(message: Dict) -> str:
+    """将单条消息格式化为对话记录行"""
+    role = '用户' if message.get('role') == 'user' else 'AI助手'
+    return f"{role}: {message.get('content', '')}"
+
+
+def _condense_turn(message: Dict, max_chars: int = 60) -> str:
+    """将较早的一轮对话压缩为一行要点（取首句）"""
+    content = (message.get('content') or '').strip()
+    match = _SENTENCE_END_RE.search(content)
+    head = content[:match.start()] if match and match.start() > 0 else content
+    if len(head) > max_chars:
+        head = head[:max_chars] + '…'
+    role = '用户' if message.get('role') == 'user' else 'AI'
+    return f"- {role}: {head}"
+
+
+def _bigrams(text: str) -> set:
+    """字符二元组（用于中文文本的粗略相关度计算）"""
+    text = re.sub(r'\s+', '', text or '')
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass
+class HistoryDigest:
+    """某个用户在某个会议中的滚动对话摘要"""
+    folded_count: int = 0  # 已折叠进摘要的消息数量
+    fingerprint: str = ''  # 已折叠消息的累积指纹，用于确认客户端发送的历史前缀未变化
+    lines: List[str] = field(default_factory=list)
+
+
+class ChatContextBuilder:
+    """按 token 预算组装AI对话提示词"""
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        recent_turns: Optional[int] = None,
+        digest_tokens: Optional[int] = None,
+        max_meetings: int = 512
+    ):
+        self.token_budget = token_budget or Config.AI_CHAT_TOKEN_BUDGET
+        self.recent_turns = recent_turns or Config.AI_CHAT_RECENT_TURNS
+        self.digest_tokens = digest_tokens or Config.AI_CHAT_DIGEST_TOKENS
+        self.max_meetings = max_meetings
+        self._lock = threading.Lock()
+        self._digests: "OrderedDict[tuple, HistoryDigest]" = OrderedDict()  # (会议ID, 用户ID) -> 滚动摘要
+
+    def build(self, meeting_id: Optional[str], messages: List[Dict],
+              context: Optional[MeetingContext] = None, user_id=None) -> str:
+        """
+        构建提示词
+
+        Args:
+            meeting_id: 会议ID（可为空）
+            messages: OpenAI 风格的消息数组（按时间顺序）
+            context: 会议静态上下文（调用方已获取时传入，避免重复查询）
+            user_id: 用户ID（同一会议中不同用户的对话分别折叠）
+
+        Returns:
+            提示词
+        """
+        messages = [m for m in messages if isinstance(m, dict) and (m.get('content') or '').strip()]
+        if context is None and meeting_id:
+            context = prompt_context_cache.get(meeting_id)
+
+        if not messages and not (context and context.exists):
+            return "请为我总结一下会议内容。"
+
+        question = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+
+        # 固定部分：教学范围限定 + 指导性提示
+        fixed_tokens = estimate_tokens(PROMPT_INSTRUCTION)
+        scope = context.scope if context else ''
+        fixed_tokens += estimate_tokens(scope)
+        available = max(self.token_budget - fixed_tokens, 0)
+
+        # 1. 最近的对话原样保留（最多占可用预算的一半，最后一轮必须保留）
+        recent, older = self._split_recent(messages, available // 2)
+        recent_text = '\n\n'.join(recent)
+        remaining = available - estimate_tokens(recent_text)
+
+        # 2. 备课资料：有问题时检索相关片段，否则按相关度放入文档摘要
+        document_budget = remaining - min(self.digest_tokens, remaining // 3)
+        documents: List[DocumentDigest] = []
+        passages: List[Passage] = []
+        if context and context.documents and question:
+            passages = self._select_passages(meeting_id, context.version, question, document_budget)
+        if not passages:
+            documents = self._select_documents(context.documents if context else [], question, document_budget)
+        remaining -= sum(estimate_tokens(d.text) for d in documents)
+        remaining -= sum(estimate_tokens(p.render()) for p in passages)
+
+        # 3. 更早的对话折叠进滚动摘要
+        digest_text = ''
+        if older:
+            digest_text = self._fold_history((meeting_id or '', user_id), older, min(self.digest_tokens, max(remaining, 0)))
+
+        prompt_parts = []
+        if scope:
+            prompt_parts.append(scope)
+        prompt_parts.extend(MeetingContext.render_documents(documents))
+        if passages:
+            prompt_parts.append("【相关备课资料片段】\n" + "\n\n".join(p.render() for p in passages))
+            prompt_parts.append(PASSAGES_NOTE)
+        if digest_text:
+            prompt_parts.append("【较早讨论要点】\n" + digest_text)
+        if recent_text:
+            prompt_parts.append("【会议讨论记录】\n" + recent_text)
+
+        prompt = "\n\n".join(prompt_parts) + "\n\n" + PROMPT_INSTRUCTION
+        logger.info(
+            f"[AI上下文] meeting_id: {meeting_id}, 预算: {self.token_budget}, 估算token: {estimate_tokens(prompt)}, "
+            f"最近轮次: {len(recent)}, 折叠轮次: {len(older)}, 文档: {len(documents)}/{len(context.documents) if context else 0}, "
+            f"检索片段: {len(passages)}"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[AI上下文] 完整提示词内容:\n{prompt}")
+        return prompt
+
+    def _split_recent(self, messages: List[Dict], budget: int):
+        """
+        从后往前选取最近的对话，返回 (原样保留的对话行, 需要折叠的较早消息)
+        """
+        recent: List[str] = []
+        used = 0
+        index = len(messages)
+        while index > 0 and len(recent) < self.recent_turns:
+            line = _format_turn(messages[index - 1])
+            tokens = estimate_tokens(line)
+            if recent and used + tokens > budget:
+                break
+            if not recent and tokens > budget:
+                # 最后一轮太长时截断保留
+                line = truncate_to_tokens(line, budget)
+                tokens = estimate_tokens(line)
+            recent.insert(0, line)
+            used += tokens
+            index -= 1
+        return recent, messages[:index]
+
+    def _select_passages(self, meeting_id: str, version, question: str, budget: int) -> List[Passage]:
+        """检索与问题相关的备课资料片段，按相关度在预算内放入"""
+        if budget <= 0:
+            return []
+        try:
+            candidates = document_retrieval.search(meeting_id, question, version=version)
+        except Exception as e:
+            logger.warning(f"[AI上下文] 资料检索失败，回退到文档摘要: {str(e)}")
+            return []
+
+        selected = []
+        used = 0
+        for passage in candidates:
+            tokens = estimate_tokens(passage.render())
+            if used + tokens > budget:
+                continue
+            selected.append(passage)
+            used += tokens
+        return selected
+
+    def _select_documents(self, documents: List[DocumentDigest], question: str, budget: int) -> List[DocumentDigest]:
+        """按与问题的相关度选择备课资料，保持原有顺序输出"""
+        if not documents or budget <= 0:
+            return []
+
+        query_grams = _bigrams(question)
+
+        def score(doc: DocumentDigest) -> float:
+            if not query_grams:
+                return 0.0
+            return len(query_grams & _bigrams(doc.text)) / len(query_grams)
+
+        ranked = sorted(enumerate(documents), key=lambda item: (-score(item[1]), item[0]))
+        selected = []
+        used = 0
+        for index, doc in ranked:
+            tokens = estimate_tokens(doc.text)
+            if used + tokens > budget:
+                continue
+            selected.append((index, doc))
+            used += tokens
+        return [doc for _, doc in sorted(selected, key=lambda item: item[0])]
+
+    def _fold_history(self, key: tuple, older: List[Dict], budget: int) -> str:
+        """
+        将较早的消息增量折叠进 (会议ID, 用户ID) 的滚动摘要
+
+        客户端每轮都会发送完整历史；只要已折叠的前缀没有变化，就只处理新增的消息。
+        每轮都对客户端发送的已折叠前缀重新计算指纹（任何一条被修改或替换都会重建摘要）。
+        """
+        if budget <= 0:
+            return ''
+
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is None or not self._prefix_matches(digest, older):
+                digest = HistoryDigest()
+            else:
+                digest = HistoryDigest(digest.folded_count, digest.fingerprint, list(digest.lines))
+
+        new_messages = older[digest.folded_count:]
+        for message in new_messages:
+            digest.lines.append(_condense_turn(message))
+        digest.fingerprint = self._fingerprint(digest.fingerprint, new_messages)
+        digest.folded_count = len(older)
+
+        # 摘要超出预算时丢弃最早的要点
+        while digest.lines and estimate_tokens('\n'.join(digest.lines)) > self.digest_tokens:
+            digest.lines.pop(0)
+
+        with self._lock:
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            while len(self._digests) > self.max_meetings:
+                self._digests.popitem(last=False)
+
+        lines = list(digest.lines)
+        while lines and estimate_tokens('\n'.join(lines)) > budget:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+    def _prefix_matches(self, digest: HistoryDigest, older: List[Dict]) -> bool:
+        """客户端发送的历史是否仍以已折叠的消息开头（逐条重新计算前缀的累积指纹）"""
+        if digest.folded_count > len(older):
+            return False
+        return self._fingerprint('', older[:digest.folded_count]) == digest.fingerprint
+
+    @staticmethod
+    def _fingerprint(seed: str, messages: List[Dict]) -> str:
+        """计算消息序列的累积指纹"""
+        value = seed
+        for message in messages:
+            value = hashlib.sha1(f"{value}|{message.get('role')}|{message.get('content')}".encode('utf-8')).hexdigest()
+        return value
+
+    def forget(self, meeting_id: str):
+        """清除会议中所有用户的滚动摘要"""
+        with self._lock:
+            for key in [key for key in self._digests if key[0] == meeting_id]:
+                del self._digests[key]
+
+
+# 全局对话上下文构建器
+chat_context_builder = ChatContextBuilder()
@@ -0,0 +1,221 @@
+"""
+AI对话回答缓存
+
+备课会议中老师经常反复问几乎相同的问题（如「本节课重难点是什么」）。
+这里按 (缓存命名空间, 规范化问题) 缓存完整回答，命中时直接通过 SSE 回放，不再调用大模型。
+
+- 命名空间是会议上下文指纹（cache_namespace）：资料变化后自然失效，
+  备课同一节课、资料相同的不同会议、不同轮次之间共享回答；
+- 指代前文的问题（「这个」「上面」「刚才」等）的回答依赖对话历史，命名空间另外包含用户ID和最近几轮对话，
+  只在同一段对话中复用；
+- 配置了本地向量模型时，规范化问题不完全相同但语义相似度超过阈值也视为命中；
+- 条目有 TTL，超出容量时按 LRU 淘汰。
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r'[\s\W_]+', re.UNICODE)
+# 句末语气词（不影响问题含义）
+_TRAILING_PARTICLES_RE = re.compile(r'[吗呢吧啊呀哦嘛]+$')
+
+# 指代前文的用词（问题含义依赖对话历史）
+_BACK_REFERENCE_RE = re.compile(
+    r'这个|那个|这些|那些|这样|上面|上述|以上|前面|之前|刚才|刚刚|上一|你说|我说|继续|接着|展开|再详细'
+)
+
+# 指代前文的问题参与命名空间计算的最近对话条数（不含当前问题）
+RECENT_TURNS = 6
+
+
+def refers_to_history(question: str) -> bool:
+    """问题是否指代前文（如「把上面的方案再展开一下」）"""
+    return bool(_BACK_REFERENCE_RE.search(question or ''))
+
+
+def cache_namespace(context_fingerprint: str, question: str, user_id, history: List[dict]) -> str:
+    """
+    计算回答缓存的命名空间
+
+    一般问题只按会议上下文指纹区分，跨轮次、跨会议共享；指代前文的问题另外按用户和最近几轮对话区分。
+
+    Args:
+        context_fingerprint: 会议上下文指纹（MeetingContext.fingerprint）
+        question: 当前问题
+        user_id: 当前用户ID
+        history: 当前问题之前的对话消息（OpenAI 风格）
+    """
+    if not refers_to_history(question):
+        return context_fingerprint
+    digest = hashlib.sha1(f"{context_fingerprint}\x00{user_id}".encode('utf-8'))
+    for message in history[-RECENT_TURNS:]:
+        if isinstance(message, dict):
+            digest.update(f"\x00{message.get('role', '')}\x01{message.get('content') or ''}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    """
+    规范化问题：全角转半角、英文小写、去掉空白和标点、去掉句末语气词
+    """
+    text = unicodedata.normalize('NFKC', question or '').lower()
+    text = _PUNCTUATION_RE.sub('', text)
+    return _TRAILING_PARTICLES_RE.sub('', text)
+
+
+@dataclass
+class CachedAnswer:
+    """缓存的回答"""
+    answer: str
+    created_at: float
+    vector: Any = None  # 问题向量（启用向量模型时）
+    hits: int = 0
+
+
+class ChatResponseCache:
+    """AI对话回答缓存（TTL + LRU，可选向量相似度匹配）"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity_threshold: Optional[float] = None
+    ):
+        self.max_entries = max_entries or Config.AI_CHAT_CACHE_MAX_ENTRIES
+        self.ttl = ttl or Config.AI_CHAT_CACHE_TTL
+        self.similarity_threshold = similarity_threshold or Config.AI_CHAT_CACHE_SIMILARITY
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        # 上下文指纹 -> 该上下文下的问题（用于向量相似度扫描）
+        self._namespaces: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _embedder():
+        """复用资料检索的本地向量模型（未配置时为 None）"""
+        from services.document_retrieval import document_retrieval
+        return document_retrieval.get_embedder()
+
+    def _encode(self, question: str):
+        embedder = self._embedder()
+        if embedder is None:
+            return None
+        try:
+            return embedder.encode([question], normalize_embeddings=True)[0]
+        except Exception as e:
+            logger.warning(f"[AI回答缓存] 计算问题向量失败: {str(e)}")
+            return None
+
+    def _remove(self, key: Tuple[str, str]):
+        """删除条目（调用方持有锁）"""
+        self._entries.pop(key, None)
+        questions = self._namespaces.get(key[0])
+        if questions is not None:
+            questions.discard(key[1])
+            if not questions:
+                del self._namespaces[key[0]]
+
+    def get(self, namespace: str, question: str) -> Optional[str]:
+        """
+        查找缓存的回答
+
+        Args:
+            namespace: 缓存命名空间（cache_namespace）
+            question: 用户问题
+
+        Returns:
+            缓存的回答，未命中返回 None
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        now = time.monotonic()
+        key = (namespace, normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry.created_at <= self.ttl:
+                    entry.hits += 1
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry.answer
+                self._remove(key)
+            candidates = [
+                (q, self._entries[(namespace, q)]) for q in self._namespaces.get(namespace, ())
+            ]
+
+        # 精确匹配未命中：在同一上下文下按问题向量的相似度查找
+        if candidates:
+            vector = self._encode(normalized)
+            if vector is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for candidate, entry in candidates:
+                    if entry.vector is None or now - entry.created_at > self.ttl:
+                        continue
+                    score = float(entry.vector @ vector)
+                    if score >= best_score:
+                        best_key, best_score = (namespace, candidate), score
+                if best_key is not None:
+                    with self._lock:
+                        entry = self._entries.get(best_key)
+                        if entry is not None:
+                            entry.hits += 1
+                            self.hits += 1
+                            self.semantic_hits += 1
+                            self._entries.move_to_end(best_key)
+                            logger.info(f"[AI回答缓存] 语义命中 - 相似度: {best_score:.3f}")
+                            return entry.answer
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, namespace: str, question: str, answer: str):
+        """
+        缓存完整回答（只缓存正常结束的流式回答）
+
+        Args:
+            namespace: 缓存命名空间（cache_namespace）
+            question: 用户问题
+            answer: 完整回答
+        """
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+
+        entry = CachedAnswer(answer=answer, created_at=time.monotonic(), vector=self._encode(normalized))
+        key = (namespace, normalized)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._namespaces.setdefault(namespace, set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+            }
+
+
+# 全局AI对话回答缓存
+chat_response_cache = ChatResponseCache()
@@ -0,0 +1,136 @@
+"""
+文档处理状态机与进度通道
+
+文档解析的中间进度只写入内存进度通道（并通过 SocketIO 推送到会议房间），
+不再反复写数据库；解析内容和摘要在最终状态时一次性落库。
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 文档状态
+STATUS_UPLOADED = 'uploaded'
+STATUS_PROCESSING = 'processing'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+# 处理阶段 -> 进度（只用于进度通道，不落库）
+STAGE_PROGRESS = {
+    'queued': 0,
+    'parsing': 10,
+    'extracting': 50,
+    'persisting': 90,
+    'completed': 100,
+    'failed': 0,
+}
+
+# 合法的状态流转：uploaded -> processing -> completed / failed
+ALLOWED_TRANSITIONS = {
+    STATUS_UPLOADED: {STATUS_PROCESSING, STATUS_FAILED},
+    STATUS_PROCESSING: {STATUS_PROCESSING, STATUS_COMPLETED, STATUS_FAILED},
+    STATUS_COMPLETED: {STATUS_PROCESSING},  # 允许重新解析
+    STATUS_FAILED: set(),
+}
+
+
+class InvalidTransitionError(ValueError):
+    """非法的文档状态流转"""
+    pass
+
+
+def check_transition(current: Optional[str], target: str):
+    """
+    校验文档状态流转是否合法
+
+    Args:
+        current: 当前状态
+        target: 目标状态
+
+    Raises:
+        InvalidTransitionError: 状态流转非法
+    """
+    allowed = ALLOWED_TRANSITIONS.get(current or STATUS_UPLOADED, set())
+    if target not in allowed:
+        raise InvalidTransitionError(f"文档状态不允许从 {current} 变更为 {target}")
+
+
+class DocumentProgressChannel:
+    """文档解析进度通道（进程内存 + SocketIO 推送）"""
+
+    # 终态进度保留时间（秒），之后由数据库状态兜底
+    FINISHED_TTL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._progress: Dict[int, Dict] = {}  # {document_id: 进度信息}
+
+    def publish(self, document_id: int, meeting_id: Optional[str], stage: str,
+                status: str = STATUS_PROCESSING, message: Optional[str] = None) -> Dict:
+        """
+        发布文档处理进度
+
+        Args:
+            document_id: 文档ID
+            meeting_id: 会议ID（用于推送到对应房间）
+            stage: 处理阶段，见 STAGE_PROGRESS
+            status: 文档状态
+            message: 附加信息（如错误信息）
+
+        Returns:
+            进度信息
+        """
+        event = {
+            'document_id': document_id,
+            'meeting_id': meeting_id,
+            'status': status,
+            'stage': stage,
+            'parse_progress': STAGE_PROGRESS.get(stage, 0),
+            'message': message,
+            'updated_at': time.time(),
+        }
+        with self._lock:
+            self._progress[document_id] = event
+            self._evict_expired()
+
+        self._emit(event)
+        return event
+
+    def get(self, document_id: int) -> Optional[Dict]:
+        """获取文档的最新进度（不存在时返回 None）"""
+        with self._lock:
+            return self._progress.get(document_id)
+
+    def discard(self, document_id: int):
+        """移除文档进度（如文档被删除）"""
+        with self._lock:
+            self._progress.pop(document_id, None)
+
+    def _evict_expired(self):
+        """清理已结束且过期的进度记录（调用方需持有锁）"""
+        now = time.time()
+        expired = [
+            doc_id for doc_id, event in self._progress.items()
+            if event['status'] in (STATUS_COMPLETED, STATUS_FAILED)
+            and now - event['updated_at'] > self.FINISHED_TTL
+        ]
+        for doc_id in expired:
+            del self._progress[doc_id]
+
+    def _emit(self, event: Dict):
+        """通过 SocketIO 推送进度到会议房间（SocketIO 未初始化时跳过）"""
+        if not event.get('meeting_id'):
+            return
+        try:
+            from services import websocket_service
+            sio = websocket_service.socketio
+            if sio is not None:
+                sio.emit('document_progress', event, room=event['meeting_id'])
+        except Exception as e:
+            logger.debug(f"推送文档进度失败: {str(e)}")
+
+
+# 全局进度通道
+progress_channel = DocumentProgressChannel()
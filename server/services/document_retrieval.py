@@ -0,0 +1,254 @@
+"""
+备课资料检索服务
+
+在文档解析完成时，为会议的备课资料（摘要 + 解析内容）切分片段并建立 BM25 索引，
+可选地叠加本地向量模型做混合检索。AI对话时用最新的用户问题检索，
+只把 top-k 相关片段放进提示词。
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from database import db
+from utils.text_tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入本地向量模型（可选）
+try:
+    from sentence_transformers import SentenceTransformer
+    EMBEDDING_AVAILABLE = True
+except ImportError:
+    EMBEDDING_AVAILABLE = False
+
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n+')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[。！？；!?;])')
+
+
+@dataclass
+class Passage:
+    """检索片段"""
+    document_id: int
+    filename: str
+    source: str  # summary（AI提取的核心信息点）或 content（解析内容）
+    text: str
+
+    def render(self) -> str:
+        """渲染为提示词片段"""
+        label = '核心信息点' if self.source == 'summary' else '原文片段'
+        return f"《{self.filename}》{label}：{self.text}"
+
+
+def chunk_text(text: str, max_chars: int = 300) -> List[str]:
+    """
+    按段落和句子将文本切分为不超过 max_chars 的片段
+
+    Args:
+        text: 文本
+        max_chars: 单个片段的最大字符数
+    """
+    chunks: List[str] = []
+    buffer = ''
+    for paragraph in _PARAGRAPH_SPLIT_RE.split(text or ''):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if len(paragraph) <= max_chars else [s for s in _SENTENCE_SPLIT_RE.split(paragraph) if s]
+        for piece in pieces:
+            # 超长句子直接硬切
+            while len(piece) > max_chars:
+                if buffer:
+                    chunks.append(buffer)
+                    buffer = ''
+                chunks.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if len(buffer) + len(piece) + 1 > max_chars and buffer:
+                chunks.append(buffer)
+                buffer = ''
+            buffer = f"{buffer}\n{piece}" if buffer else piece
+    if buffer:
+        chunks.append(buffer)
+    return chunks
+
+
+class BM25Index:
+    """BM25 倒排索引"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.lengths) / self.size) if self.size else 0.0
+        # 倒排表：{词项: [(片段序号, 词频)]}
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for index, doc in enumerate(documents):
+            for term, freq in Counter(doc).items():
+                self.postings.setdefault(term, []).append((index, freq))
+        self.idf = {
+            term: math.log(1 + (self.size - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def scores(self, query_terms: List[str]) -> Dict[int, float]:
+        """计算查询与各片段的 BM25 得分（只返回命中的片段）"""
+        scores: Dict[int, float] = {}
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for index, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1))
+                scores[index] = scores.get(index, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+
+class MeetingRetrievalIndex:
+    """单个会议的检索索引"""
+
+    def __init__(self, meeting_id: str, version: Optional[Tuple], passages: List[Passage], embedder=None):
+        self.meeting_id = meeting_id
+        self.version = version
+        self.passages = passages
+        self.bm25 = BM25Index([tokenize(p.text) for p in passages])
+        self.embedder = embedder
+        self.embeddings = None
+        if embedder is not None and passages:
+            try:
+                self.embeddings = embedder.encode([p.text for p in passages], normalize_embeddings=True)
+            except Exception as e:
+                logger.warning(f"[资料检索] 计算片段向量失败，仅使用BM25: {str(e)}")
+
+    def search(self, query: str, top_k: int) -> List[Passage]:
+        """
+        检索与查询最相关的片段
+
+        BM25 得分归一化后与向量余弦相似度加权（未启用向量模型时只用 BM25）。
+        """
+        if not self.passages or not query:
+            return []
+
+        bm25_scores = self.bm25.scores(tokenize(query))
+        max_bm25 = max(bm25_scores.values()) if bm25_scores else 0.0
+        combined = {index: score / max_bm25 for index, score in bm25_scores.items()} if max_bm25 else {}
+
+        if self.embeddings is not None:
+            try:
+                query_vector = self.embedder.encode([query], normalize_embeddings=True)[0]
+                similarities = self.embeddings @ query_vector
+                weight = Config.AI_CHAT_EMBEDDING_WEIGHT
+                for index, similarity in enumerate(similarities):
+                    combined[index] = combined.get(index, 0.0) * (1 - weight) + float(similarity) * weight
+            except Exception as e:
+                logger.warning(f"[资料检索] 向量检索失败，仅使用BM25: {str(e)}")
+
+        ranked = sorted((item for item in combined.items() if item[1] > 0), key=lambda item: -item[1])
+        return [self.passages[index] for index, _ in ranked[:top_k]]
+
+
+class DocumentRetrievalService:
+    """按会议维护备课资料检索索引"""
+
+    def __init__(self, max_meetings: int = 128):
+        self.max_meetings = max_meetings
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, MeetingRetrievalIndex]" = OrderedDict()
+        self._embedder = None
+        self._embedder_loaded = False
+
+    def get_embedder(self):
+        """按需加载本地向量模型（未配置或未安装时返回 None）"""
+        if self._embedder_loaded:
+            return self._embedder
+        self._embedder_loaded = True
+        model_name = Config.AI_CHAT_EMBEDDING_MODEL
+        if not model_name:
+            return None
+        if not EMBEDDING_AVAILABLE:
+            logger.warning("已配置 AI_CHAT_EMBEDDING_MODEL 但 sentence-transformers 未安装，仅使用BM25检索")
+            return None
+        try:
+            self._embedder = SentenceTransformer(model_name)
+            logger.info(f"[资料检索] 已加载本地向量模型: {model_name}")
+        except Exception as e:
+            logger.warning(f"[资料检索] 加载向量模型失败，仅使用BM25: {str(e)}")
+        return self._embedder
+
+    def build(self, meeting_id: str) -> MeetingRetrievalIndex:
+        """
+        为会议重建检索索引（文档解析完成时调用）
+
+        Args:
+            meeting_id: 会议ID
+        """
+        from models.document import Document
+        from services.prompt_context_cache import get_context_version
+
+        version = get_context_version(meeting_id)
+        rows = db.session.query(
+            Document.id, Document.original_filename, Document.summary, Document.parsed_content
+        ).filter(
+            Document.meeting_id == meeting_id,
+            Document.file_type == 'docx',
+            Document.status == 'completed'
+        ).order_by(Document.created_at).all()
+
+        max_chars = Config.AI_CHAT_PASSAGE_CHARS
+        passages: List[Passage] = []
+        for doc_id, filename, summary, parsed_content in rows:
+            for chunk in chunk_text(summary or '', max_chars):
+                passages.append(Passage(doc_id, filename, 'summary', chunk))
+            for chunk in chunk_text(parsed_content or '', max_chars):
+                passages.append(Passage(doc_id, filename, 'content', chunk))
+
+        index = MeetingRetrievalIndex(meeting_id, version, passages, self.get_embedder())
+        with self._lock:
+            self._indexes[meeting_id] = index
+            self._indexes.move_to_end(meeting_id)
+            while len(self._indexes) > self.max_meetings:
+                self._indexes.popitem(last=False)
+
+        logger.info(f"[资料检索] 已建立索引 - meeting_id: {meeting_id}, 文档: {len(rows)}, 片段: {len(passages)}")
+        return index
+
+    def search(self, meeting_id: str, query: str, top_k: Optional[int] = None,
+               version: Optional[Tuple] = None) -> List[Passage]:
+        """
+        检索会议备课资料中与问题相关的片段
+
+        索引不存在或版本戳过期（如其他进程完成了解析）时自动重建。
+
+        Args:
+            meeting_id: 会议ID
+            query: 查询文本（通常是最新的用户问题）
+            top_k: 返回片段数量
+            version: 当前的上下文版本戳（调用方已计算时传入，避免重复查询）
+        """
+        if version is None:
+            from services.prompt_context_cache import get_context_version
+            version = get_context_version(meeting_id)
+
+        with self._lock:
+            index = self._indexes.get(meeting_id)
+            if index is not None:
+                self._indexes.move_to_end(meeting_id)
+
+        if index is None or index.version != version:
+            index = self.build(meeting_id)
+
+        return index.search(query, top_k or Config.AI_CHAT_RETRIEVAL_TOP_K)
+
+    def invalidate(self, meeting_id: str):
+        """删除会议的检索索引"""
+        with self._lock:
+            self._indexes.pop(meeting_id, None)
+
+
+# 全局资料检索服务
+document_retrieval = DocumentRetrievalService()
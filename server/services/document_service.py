@@ -8,6 +8,14 @@ from werkzeug.utils import secure_filename
 import logging
 from database import db
 from models.document import Document
+from services.document_progress import (
+    progress_channel, STAGE_PROGRESS, STATUS_PROCESSING, STATUS_COMPLETED, STATUS_FAILED,
+    check_transition
+)
+from services.prompt_context_cache import prompt_context_cache
+from services.document_retrieval import document_retrieval
+from services.search_service import search_service
+from services.llm_gateway import llm_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +43,9 @@ except Exception as e:
 # 允许的文档格式（备课资料仅支持 docx）
 ALLOWED_EXTENSIONS = {'docx'}
 
+# 状态流转时「未传入」的字段（区别于显式传入 None 清空字段）
+_UNSET = object()
+
 # 文档文件存储目录
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads', 'documents')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -286,8 +297,13 @@ class DocumentService:
                 logger.warning(f"删除文件失败: {e}")
         
         # 删除数据库记录
+        meeting_id = document.meeting_id
+        search_service.remove_document(document_id)
         db.session.delete(document)
         db.session.commit()
+        progress_channel.discard(document_id)
+        prompt_context_cache.invalidate(meeting_id)
+        document_retrieval.invalidate(meeting_id)
         
         logger.info(f"文档已删除: {document_id}")
         
@@ -325,19 +341,7 @@ class DocumentService:
             if parse_progress is not None:
                 document.parse_progress = parse_progress
             if parsed_content is not None:
-                # 安全措施：如果内容过长，截断并记录警告
-                # LONGTEXT 最大支持约 4GB，但为了安全，我们限制为 100MB（约 100,000,000 字符）
-                MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
-                original_length = len(parsed_content)
-                if original_length > MAX_CONTENT_LENGTH:
-                    logger.warning(f"文档 {document_id} 的解析内容过长 ({original_length} 字符)，将被截断到 {MAX_CONTENT_LENGTH} 字符")
-                    parsed_content = parsed_content[:MAX_CONTENT_LENGTH]
-                    # 如果内容被截断，在错误信息中记录
-                    truncate_msg = f"注意：文档内容过长，已截断（原始长度: {original_length} 字符，截断后: {len(parsed_content)} 字符）"
-                    if error_message:
-                        error_message = f"{error_message}; {truncate_msg}"
-                    else:
-                        error_message = truncate_msg
+                parsed_content, error_message = self._truncate_content(document_id, parsed_content, error_message)
                 document.parsed_content = parsed_content
             if summary is not None:
                 document.summary = summary
@@ -349,18 +353,64 @@ class DocumentService:
         except Exception as e:
             logger.error(f"更新文档状态失败 - document_id: {document_id}, 错误: {str(e)}", exc_info=True)
             db.session.rollback()
-            # 如果更新失败，尝试至少更新状态为 failed
-            try:
-                document = Document.query.get(document_id)
-                if document:
-                    document.status = 'failed'
-                    document.error_message = f"更新文档状态时发生错误: {str(e)}"
-                    db.session.commit()
-            except Exception as e2:
-                logger.error(f"无法更新文档状态为失败 - document_id: {document_id}, 错误: {str(e2)}", exc_info=True)
-                db.session.rollback()
             raise
     
+    def _truncate_content(self, document_id: int, parsed_content: str, error_message: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        截断过长的解析内容
+        
+        LONGTEXT 最大支持约 4GB，但为了安全，我们限制为 100MB（约 100,000,000 字符）
+        
+        Returns:
+            (截断后的内容, 合并了截断说明的错误信息) 元组
+        """
+        MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
+        original_length = len(parsed_content)
+        if original_length <= MAX_CONTENT_LENGTH:
+            return parsed_content, error_message
+        
+        logger.warning(f"文档 {document_id} 的解析内容过长 ({original_length} 字符)，将被截断到 {MAX_CONTENT_LENGTH} 字符")
+        parsed_content = parsed_content[:MAX_CONTENT_LENGTH]
+        # 如果内容被截断，在错误信息中记录
+        truncate_msg = f"注意：文档内容过长，已截断（原始长度: {original_length} 字符，截断后: {len(parsed_content)} 字符）"
+        if error_message:
+            error_message = f"{error_message}; {truncate_msg}"
+        else:
+            error_message = truncate_msg
+        return parsed_content, error_message
+    
+    def get_document_progress(self, document_id: int, user_id: int) -> Optional[dict]:
+        """
+        获取文档解析进度
+        
+        优先读取进度通道中的实时进度，不存在时（如其他进程处理或已过期）回退到数据库状态。
+        
+        Args:
+            document_id: 文档ID
+            user_id: 用户ID（用于权限检查）
+        
+        Returns:
+            进度信息，文档不存在时返回 None
+        """
+        document = Document.query.with_entities(
+            Document.id, Document.meeting_id, Document.status, Document.parse_progress, Document.error_message
+        ).filter_by(id=document_id, user_id=user_id).first()
+        if not document:
+            return None
+        
+        progress = progress_channel.get(document_id)
+        if progress:
+            return progress
+        
+        return {
+            'document_id': document.id,
+            'meeting_id': document.meeting_id,
+            'status': document.status,
+            'stage': document.status,
+            'parse_progress': document.parse_progress,
+            'message': document.error_message,
+        }
+    
     def parse_docx(self, file_path: str) -> str:
         """
         解析docx文件，提取文本内容
@@ -400,7 +450,8 @@ class DocumentService:
             logger.error(f"解析docx文件失败: {file_path}, 错误: {str(e)}")
             raise ValueError(f"解析docx文件失败: {str(e)}")
     
-    def extract_summary_with_ai(self, content: str, subject: Optional[str] = None, grade: Optional[str] = None) -> str:
+    def extract_summary_with_ai(self, content: str, subject: Optional[str] = None, grade: Optional[str] = None,
+                                user_id: Optional[int] = None) -> str:
         """
         使用AI提取备课资料的摘要和关键点
         
@@ -408,6 +459,7 @@ class DocumentService:
             content: 文档内容
             subject: 学科（可选，用于上下文）
             grade: 年级（可选，用于上下文）
+            user_id: 用户ID（可选，用于大模型网关的公平调度）
         
         Returns:
             AI提取的摘要和关键点
@@ -470,8 +522,11 @@ class DocumentService:
 
 请确保提取的信息都是文档中明确存在的，不要自行补充或推理。"""
             
-            # 调用DashScope API
-            response = Application.call(
+            # 调用DashScope API（经由大模型网关排队，文档摘要优先级最低）
+            response = llm_gateway.call(
+                'summary',
+                Application.call,
+                user_id=user_id,
                 api_key=Config.DASHSCOPE_API_KEY,
                 app_id=Config.DASHSCOPE_APP_ID,
                 prompt=prompt
@@ -497,7 +552,12 @@ class DocumentService:
     
     def parse_and_extract_document(self, document_id: int, meeting_id: str) -> Optional[Document]:
         """
-        解析文档并提取摘要（异步处理）
+        解析文档并提取摘要
+        
+        处理流程是一个状态机：uploaded -> processing -> completed / failed。
+        中间进度只发布到进度通道（内存 + SocketIO），数据库只写两次：
+        进入 processing 时的一次轻量状态更新，以及终态时在同一个事务中
+        一次性写入解析内容、摘要和状态。
         
         Args:
             document_id: 文档ID
@@ -516,29 +576,19 @@ class DocumentService:
             return document
         
         # 如果文档已经是失败状态，不再重新解析
-        if document.status == 'failed':
+        if document.status == STATUS_FAILED:
             logger.info(f"文档 {document_id} 已经是失败状态，跳过解析")
             return document
         
         try:
-            # 更新状态为处理中
-            self.update_document_status(document_id, 'processing', parse_progress=10)
+            # 进入处理中状态（只更新状态列，不写内容）
+            self._transition(document, STATUS_PROCESSING, parse_progress=STAGE_PROGRESS['parsing'])
+            progress_channel.publish(document_id, meeting_id, 'parsing')
             
             # 解析docx文件
             logger.info(f"开始解析docx文件: {document.file_path}")
             parsed_content = self.parse_docx(document.file_path)
-            
-            # 保存解析内容（可能会截断）
-            try:
-                self.update_document_status(document_id, 'processing', parse_progress=50, parsed_content=parsed_content)
-            except Exception as e:
-                # 如果保存解析内容失败，记录错误但继续处理
-                logger.warning(f"保存解析内容时出错（可能内容过长）: {str(e)}")
-                # 尝试只更新进度，不保存内容
-                try:
-                    self.update_document_status(document_id, 'processing', parse_progress=50)
-                except:
-                    pass
+            progress_channel.publish(document_id, meeting_id, 'extracting')
             
             # 获取会议信息（用于AI提取摘要的上下文）
             from models.meeting import Meeting
@@ -548,36 +598,20 @@ class DocumentService:
             
             # 使用AI提取摘要（即使失败也不影响整体流程）
             logger.info(f"开始使用AI提取摘要: {document_id}")
-            summary = self.extract_summary_with_ai(parsed_content, subject, grade)
+            summary = self.extract_summary_with_ai(parsed_content, subject, grade, user_id=document.user_id)
             
-            # 分别存储解析内容和摘要
-            try:
-                self.update_document_status(
-                    document_id,
-                    'completed',
-                    parse_progress=100,
-                    parsed_content=parsed_content,
-                    summary=summary if summary else None
-                )
-            except Exception as e:
-                # 如果最终保存失败，尝试至少保存状态和摘要
-                logger.warning(f"保存最终状态时出错: {str(e)}")
-                try:
-                    self.update_document_status(
-                        document_id,
-                        'completed',
-                        parse_progress=100,
-                        summary=summary if summary else None
-                    )
-                except:
-                    # 如果还是失败，至少标记为失败状态
-                    self.update_document_status(
-                        document_id,
-                        'failed',
-                        parse_progress=0,
-                        error_message=f"保存解析结果时出错: {str(e)}"
-                    )
-                    raise
+            # 在同一个事务中一次性写入内容、摘要和完成状态
+            progress_channel.publish(document_id, meeting_id, 'persisting')
+            parsed_content, notice = self._truncate_content(document_id, parsed_content)
+            self._transition(
+                document,
+                STATUS_COMPLETED,
+                parse_progress=STAGE_PROGRESS['completed'],
+                parsed_content=parsed_content,
+                summary=summary if summary else None,
+                error_message=notice
+            )
+            progress_channel.publish(document_id, meeting_id, 'completed', status=STATUS_COMPLETED)
             
             logger.info(f"文档解析和摘要提取完成: {document_id}")
             return document
@@ -585,27 +619,59 @@ class DocumentService:
         except Exception as e:
             error_msg = f"解析文档失败: {str(e)}"
             logger.error(error_msg, exc_info=True)
-            # 确保状态更新为失败，即使更新失败也要尝试
+            db.session.rollback()
             try:
-                self.update_document_status(
-                    document_id,
-                    'failed',
-                    parse_progress=0,
-                    error_message=error_msg
-                )
+                self._transition(document, STATUS_FAILED, parse_progress=0, error_message=error_msg)
             except Exception as e2:
-                # 如果更新失败状态也失败，记录错误但不再抛出异常
+                db.session.rollback()
                 logger.error(f"无法更新文档状态为失败 - document_id: {document_id}, 错误: {str(e2)}", exc_info=True)
-                # 尝试直接更新数据库
-                try:
-                    document = Document.query.get(document_id)
-                    if document:
-                        document.status = 'failed'
-                        document.parse_progress = 0
-                        document.error_message = error_msg
-                        db.session.commit()
-                except:
-                    db.session.rollback()
+            progress_channel.publish(document_id, meeting_id, 'failed', status=STATUS_FAILED, message=error_msg)
             
             return document
-
+    
+    def _transition(self, document: Document, status: str, parse_progress=_UNSET, parsed_content=_UNSET,
+                    summary=_UNSET, error_message=_UNSET) -> Document:
+        """
+        执行一次文档状态流转，并在单个事务中提交所有字段
+        
+        Args:
+            document: 文档对象
+            status: 目标状态
+            parse_progress、parsed_content、summary、error_message: 需要同时写入的字段，
+                未传入的字段保持不变，显式传入 None 时清空该字段
+        
+        Returns:
+            Document对象
+        """
+        check_transition(document.status, status)
+        document.status = status
+        fields = {
+            'parse_progress': parse_progress,
+            'parsed_content': parsed_content,
+            'summary': summary,
+            'error_message': error_message,
+        }
+        for name, value in fields.items():
+            if value is not _UNSET:
+                setattr(document, name, value)
+        db.session.commit()
+        if status == STATUS_COMPLETED:
+            prompt_context_cache.invalidate(document.meeting_id)
+            self._rebuild_retrieval_index(document.meeting_id)
+            self._update_search_index(document.id)
+        return document
+    
+    def _rebuild_retrieval_index(self, meeting_id: str):
+        """文档解析完成后重建会议的资料检索索引（失败不影响解析结果）"""
+        try:
+            document_retrieval.build(meeting_id)
+        except Exception as e:
+            logger.warning(f"重建资料检索索引失败 - meeting_id: {meeting_id}, 错误: {str(e)}")
+    
+    def _update_search_index(self, document_id: int):
+        """文档解析完成后安排后台更新全文检索索引（失败不影响解析结果）"""
+        try:
+            search_service.schedule_document(document_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"更新全文检索索引失败 - document_id: {document_id}, 错误: {str(e)}")
@@ -0,0 +1,396 @@
+"""
+大模型调用网关
+
+所有 DashScope 调用（AI对话、关键词提取、网络资料打标签、文档摘要提取）都经过这里：
+- 全局并发上限，超出时按用途优先级排队（AI对话 > 关键词提取/打标签 > 文档摘要）；
+- 同一优先级内按用户公平调度，避免某个用户的批量上传占满队列；
+- 排队超时和调用超时；
+- 遇到限流（429 / Throttling）时指数退避 + 随机抖动重试；
+- 统计排队耗时和模型耗时。
+"""
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 调用用途 -> 优先级（数值越小越优先）
+PURPOSE_PRIORITY = {
+    'chat': 0,  # 交互式AI对话
+    'keywords': 1,  # 网络资料关键词提取
+    'tagging': 1,  # 网络资料打标签
+    'summary': 2,  # 文档摘要提取
+}
+
+# 流式读取线程结束标记
+_STREAM_END = object()
+
+
+class LLMGatewayError(Exception):
+    """网关错误基类"""
+    pass
+
+
+class LLMQueueTimeout(LLMGatewayError):
+    """排队超时"""
+    pass
+
+
+class LLMCallTimeout(LLMGatewayError):
+    """模型调用超时"""
+    pass
+
+
+def is_throttled(response_or_error) -> bool:
+    """判断响应或异常是否为限流"""
+    if isinstance(response_or_error, Exception):
+        message = str(response_or_error)
+        return '429' in message or 'Throttling' in message
+    status_code = getattr(response_or_error, 'status_code', None)
+    code = str(getattr(response_or_error, 'code', '') or '')
+    return status_code == 429 or code.startswith('Throttling')
+
+
+class _PurposeStats:
+    """单个用途的统计信息"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.model_time_total = 0.0
+        self.model_time_max = 0.0
+
+    def to_dict(self) -> Dict:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'throttled_retries': self.throttled,
+            'queue_time_avg_ms': round(self.queue_time_total / calls * 1000, 1),
+            'queue_time_max_ms': round(self.queue_time_max * 1000, 1),
+            'model_time_avg_ms': round(self.model_time_total / calls * 1000, 1),
+            'model_time_max_ms': round(self.model_time_max * 1000, 1),
+        }
+
+
+class _StreamReader:
+    """
+    在后台线程中迭代模型的流式输出，把数据块放入队列
+
+    取消时关闭上游迭代器（生成器的 finally 会关闭 HTTP 响应）。读取线程正阻塞在上游读取中时，
+    Python 不允许从其他线程关闭正在执行的生成器，此时由读取线程在这次读取返回后自行关闭；
+    因此超时后读取线程最多残留到上游返回下一个数据块或断开连接为止，但不再占用网关名额。
+    """
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: Dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.chunks = queue.Queue()
+        self._stop = threading.Event()
+        self._iterator = None
+
+    def start(self):
+        threading.Thread(target=self._run, name='llm-gateway-stream', daemon=True).start()
+
+    def _run(self):
+        try:
+            self._iterator = iter(self.fn(*self.args, **self.kwargs))
+            for chunk in self._iterator:
+                if self._stop.is_set():
+                    break
+                self.chunks.put((chunk, None))
+        except Exception as e:
+            self.chunks.put((_STREAM_END, e))
+            return
+        finally:
+            self._close()
+        self.chunks.put((_STREAM_END, None))
+
+    def cancel(self):
+        """停止读取并尽量立即关闭上游迭代器"""
+        self._stop.set()
+        self._close()
+
+    def _close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is None:
+            return
+        try:
+            close()
+        except ValueError:
+            # 生成器正在读取线程中执行，由读取线程在读取返回后关闭
+            pass
+        except Exception as e:
+            logger.debug(f"[LLM网关] 关闭流式输出失败: {str(e)}")
+
+
+class LLMGateway:
+    """带优先级队列和用户公平调度的并发受限大模型网关"""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        call_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ):
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        self.queue_timeout = queue_timeout or Config.LLM_QUEUE_TIMEOUT
+        self.call_timeout = call_timeout or Config.LLM_CALL_TIMEOUT
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._queue = []  # 堆：(优先级, 公平调度标签, 序号)
+        self._sequence = itertools.count()
+        # 同一优先级内的公平调度：每个用户的虚拟时间标签
+        self._virtual_time: Dict[int, int] = {}
+        self._user_tags: Dict[tuple, int] = {}
+        self._stats: Dict[str, _PurposeStats] = {}
+        # 调用线程池：调用超时后调用方立即返回，线程完成后才释放并发名额
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency * 2, thread_name_prefix='llm-gateway')
+
+    def _stats_for(self, purpose: str) -> _PurposeStats:
+        stats = self._stats.get(purpose)
+        if stats is None:
+            stats = self._stats[purpose] = _PurposeStats()
+        return stats
+
+    @contextmanager
+    def slot(self, purpose: str, user_id: Any = None, timeout: Optional[float] = None) -> Iterator[float]:
+        """
+        获取一个调用名额（上下文管理器），返回排队耗时（秒）
+
+        Args:
+            purpose: 调用用途，见 PURPOSE_PRIORITY
+            user_id: 用户ID（用于公平调度）
+            timeout: 排队超时（秒）
+
+        Raises:
+            LLMQueueTimeout: 排队超时
+        """
+        queue_time = self._acquire(purpose, user_id, timeout or self.queue_timeout)
+        try:
+            yield queue_time
+        finally:
+            self._release()
+
+    def _acquire(self, purpose: str, user_id: Any, timeout: float) -> float:
+        priority = PURPOSE_PRIORITY.get(purpose, max(PURPOSE_PRIORITY.values()))
+        start = time.monotonic()
+        with self._condition:
+            # 开始时间公平排队：用户的标签取「当前虚拟时间」和「该用户上一个标签」中较大者再加一
+            virtual_time = self._virtual_time.get(priority, 0)
+            user_key = (priority, user_id)
+            tag = max(virtual_time, self._user_tags.get(user_key, 0)) + 1
+            self._user_tags[user_key] = tag
+            ticket = (priority, tag, next(self._sequence))
+            heapq.heappush(self._queue, ticket)
+
+            deadline = start + timeout
+            while not (self._queue[0] == ticket and self._in_flight < self.max_concurrency):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                    self._stats_for(purpose).timeouts += 1
+                    raise LLMQueueTimeout(f"大模型调用排队超时（{timeout:.0f}秒），请稍后重试")
+                self._condition.wait(remaining)
+
+            heapq.heappop(self._queue)
+            self._virtual_time[priority] = tag
+            self._in_flight += 1
+            self._prune_user_tags()
+            self._condition.notify_all()
+
+            queue_time = time.monotonic() - start
+            stats = self._stats_for(purpose)
+            stats.queue_time_total += queue_time
+            stats.queue_time_max = max(stats.queue_time_max, queue_time)
+        return queue_time
+
+    def _prune_user_tags(self, max_users: int = 1024):
+        """清理已落后于虚拟时间的用户标签（这些用户的下一个请求会从当前虚拟时间开始）"""
+        if len(self._user_tags) <= max_users:
+            return
+        self._user_tags = {
+            key: tag for key, tag in self._user_tags.items()
+            if tag > self._virtual_time.get(key[0], 0)
+        }
+
+    def _release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _record_model_time(self, purpose: str, elapsed: float, error: bool = False, timeout: bool = False):
+        with self._condition:
+            stats = self._stats_for(purpose)
+            stats.calls += 1
+            stats.model_time_total += elapsed
+            stats.model_time_max = max(stats.model_time_max, elapsed)
+            if error:
+                stats.errors += 1
+            if timeout:
+                stats.timeouts += 1
+
+    def _backoff(self, purpose: str, attempt: int):
+        """限流退避：指数增长 + 随机抖动"""
+        with self._condition:
+            self._stats_for(purpose).throttled += 1
+        delay = min(Config.LLM_RETRY_BASE_DELAY * (2 ** attempt), 8.0)
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def call(self, purpose: str, fn: Callable, *args, user_id: Any = None,
+             timeout: Optional[float] = None, **kwargs):
+        """
+        通过网关执行一次非流式调用
+
+        Args:
+            purpose: 调用用途
+            fn: 实际调用函数（如 Application.call / Generation.call）
+            user_id: 用户ID
+            timeout: 调用超时（秒），不含排队时间
+
+        Returns:
+            fn 的返回值
+
+        Raises:
+            LLMQueueTimeout: 排队超时
+            LLMCallTimeout: 调用超时
+        """
+        call_timeout = timeout or self.call_timeout
+        attempt = 0
+        while True:
+            # 拿到名额后提交到线程池；调用超时时名额在线程实际结束后才释放
+            queue_time = self._acquire(purpose, user_id, self.queue_timeout)
+            start = time.monotonic()
+            future = self._executor.submit(fn, *args, **kwargs)
+            future.add_done_callback(lambda _: self._release())
+            try:
+                response = future.result(timeout=call_timeout)
+            except FutureTimeoutError:
+                self._record_model_time(purpose, time.monotonic() - start, error=True, timeout=True)
+                logger.warning(f"[LLM网关] 调用超时 - purpose: {purpose}, timeout: {call_timeout}s")
+                raise LLMCallTimeout(f"大模型调用超时（{call_timeout:.0f}秒）")
+            except Exception as e:
+                self._record_model_time(purpose, time.monotonic() - start, error=True)
+                if is_throttled(e) and attempt < self.max_retries:
+                    self._backoff(purpose, attempt)
+                    attempt += 1
+                    continue
+                raise
+
+            elapsed = time.monotonic() - start
+            throttled = is_throttled(response)
+            self._record_model_time(purpose, elapsed, error=throttled)
+            if throttled and attempt < self.max_retries:
+                logger.warning(f"[LLM网关] 调用被限流，准备重试 - purpose: {purpose}, attempt: {attempt + 1}")
+                self._backoff(purpose, attempt)
+                attempt += 1
+                continue
+
+            logger.debug(f"[LLM网关] purpose: {purpose}, 排队: {queue_time * 1000:.0f}ms, 模型: {elapsed * 1000:.0f}ms")
+            return response
+
+    def _read_chunks(self, purpose: str, fn: Callable, args: tuple, kwargs: Dict, timeout: float) -> Iterator:
+        """
+        在读取线程中迭代流式输出，首个数据块和相邻数据块之间都不能超过 timeout 秒
+
+        超时后调用方立即收到 LLMCallTimeout 并释放名额，同时关闭上游的流式迭代器。
+        """
+        reader = _StreamReader(fn, args, kwargs)
+        reader.start()
+        received = False
+        try:
+            while True:
+                try:
+                    chunk, error = reader.chunks.get(timeout=timeout)
+                except queue.Empty:
+                    stage = '等待下一个数据块' if received else '等待首个数据块'
+                    logger.warning(f"[LLM网关] 流式调用超时 - purpose: {purpose}, {stage}超过 {timeout}s")
+                    raise LLMCallTimeout(f"大模型流式输出超时（{stage}超过{timeout:.0f}秒）")
+                if chunk is _STREAM_END:
+                    if error is not None:
+                        raise error
+                    return
+                received = True
+                yield chunk
+        finally:
+            reader.cancel()
+
+    def stream(self, purpose: str, fn: Callable, *args, user_id: Any = None,
+               timeout: Optional[float] = None, **kwargs) -> Iterator:
+        """
+        通过网关执行一次流式调用，返回数据块迭代器
+
+        整个流式输出期间占用一个名额；只有在收到第一个数据块之前遇到限流才会重试。
+        首个数据块和相邻数据块之间的等待都受 timeout（默认 LLM_CALL_TIMEOUT）限制，
+        超时抛出 LLMCallTimeout 并释放名额。
+
+        Raises:
+            LLMQueueTimeout: 排队超时
+            LLMCallTimeout: 等待数据块超时
+        """
+        call_timeout = timeout or self.call_timeout
+        attempt = 0
+        while True:
+            with self.slot(purpose, user_id):
+                start = time.monotonic()
+                received = False
+                error = False
+                timed_out = False
+                chunks = self._read_chunks(purpose, fn, args, kwargs, call_timeout)
+                try:
+                    for chunk in chunks:
+                        if not received and is_throttled(chunk) and attempt < self.max_retries:
+                            break
+                        received = True
+                        yield chunk
+                    else:
+                        return
+                except LLMCallTimeout:
+                    error = timed_out = True
+                    raise
+                except Exception as e:
+                    error = True
+                    if received or not is_throttled(e) or attempt >= self.max_retries:
+                        raise
+                finally:
+                    chunks.close()
+                    self._record_model_time(purpose, time.monotonic() - start,
+                                            error=error or not received, timeout=timed_out)
+            # 首个数据块之前被限流：退避后重试
+            logger.warning(f"[LLM网关] 流式调用被限流，准备重试 - purpose: {purpose}, attempt: {attempt + 1}")
+            self._backoff(purpose, attempt)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        """网关统计信息"""
+        with self._condition:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self._in_flight,
+                'queued': len(self._queue),
+                'purposes': {purpose: stats.to_dict() for purpose, stats in self._stats.items()},
+            }
+
+
+# 全局大模型网关
+llm_gateway = LLMGateway()
@@ -0,0 +1,126 @@
+"""
+网络资料本地打标签
+
+标签集合是固定的一小组业务词汇（教学策略、课程标准、案例分享……），
+用关键词规则在标题和摘要上打分即可完成分类；规则都未命中时，
+如果配置了本地向量模型，再用标签描述的向量做最近质心匹配。
+结果按 URL 缓存，同一条资料不会重复计算。
+"""
+import logging
+from typing import Dict, List, Optional
+
+from config import Config
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 未能分类时的默认标签
+DEFAULT_TAG = '网络资料'
+
+# 标签 -> 规则关键词（标题命中计 2 分，摘要命中计 1 分）
+TAG_RULES: Dict[str, tuple] = {
+    '教学策略': ('教学策略', '教学方法', '教学技巧', '策略', '方法', '技巧', '如何教', '怎样教', '引导', '启发', '分层', '差异化'),
+    '课程标准': ('课程标准', '课标', '新课标', '核心素养', '学业质量', '课程方案', '教学要求', '义务教育'),
+    '案例分享': ('案例', '实录', '课例', '示范课', '公开课', '优质课', '经验', '分享', '反思', '心得'),
+    '学科知识': ('知识点', '概念', '定义', '定理', '公式', '原理', '知识梳理', '知识讲解', '易错', '考点'),
+    '教学资源': ('课件', 'ppt', '素材', '视频', '微课', '资源', '下载', '图片', '动画', '习题', '试卷', '练习'),
+    '教学设计': ('教学设计', '教案', '学案', '导学案', '教学目标', '教学过程', '设计思路', '单元设计', '大单元'),
+    '课堂活动': ('课堂活动', '游戏', '小组合作', '互动', '情境', '探究', '实验', '活动设计', '导入', '课堂提问'),
+    '评价方法': ('评价', '测评', '评估', '量规', '形成性', '过程性', '表现性', '作业设计', '反馈'),
+    '教材解读': ('教材', '教材分析', '教材解读', '课文', '单元解读', '编排', '人教版', '部编版', '北师大版', '苏教版'),
+    '备课参考': ('备课', '说课', '集体备课', '备课参考', '教学参考', '参考资料', '教参'),
+}
+
+# 标签候选（与前端标签颜色一致）
+TAG_CANDIDATES = list(TAG_RULES.keys())
+
+
+class MaterialTagger:
+    """网络资料标签分类器（关键词规则 + 可选向量最近质心，按 URL 缓存）"""
+
+    def __init__(self, max_tags: int = 2, cache_size: int = 4096):
+        self.max_tags = max_tags
+        self.cache = TTLCache(max_entries=cache_size, ttl=Config.RELATED_MATERIALS_SEARCH_TTL)
+        self._centroids = None
+        self._centroids_loaded = False
+
+    def _get_centroids(self):
+        """按需计算各标签描述的向量（未配置向量模型时返回 None）"""
+        if self._centroids_loaded:
+            return self._centroids
+        self._centroids_loaded = True
+        from services.document_retrieval import document_retrieval
+        embedder = document_retrieval.get_embedder()
+        if embedder is None:
+            return None
+        try:
+            descriptions = [f"{tag}：{'、'.join(keywords)}" for tag, keywords in TAG_RULES.items()]
+            self._centroids = (embedder, embedder.encode(descriptions, normalize_embeddings=True))
+        except Exception as e:
+            logger.warning(f"[网络资料标签] 计算标签向量失败，仅使用关键词规则: {str(e)}")
+        return self._centroids
+
+    def _rule_tags(self, title: str, snippet: str) -> List[str]:
+        """关键词规则打分，返回得分最高的标签"""
+        title = (title or '').lower()
+        snippet = (snippet or '').lower()
+        scores = {}
+        for tag, keywords in TAG_RULES.items():
+            score = sum(2 for k in keywords if k in title) + sum(1 for k in keywords if k in snippet)
+            if score:
+                scores[tag] = score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], TAG_CANDIDATES.index(item[0])))
+        return [tag for tag, _ in ranked[:self.max_tags]]
+
+    def _embedding_tag(self, title: str, snippet: str) -> Optional[str]:
+        """向量最近质心匹配"""
+        centroids = self._get_centroids()
+        if centroids is None:
+            return None
+        embedder, vectors = centroids
+        try:
+            vector = embedder.encode([f"{title} {snippet}"], normalize_embeddings=True)[0]
+        except Exception as e:
+            logger.warning(f"[网络资料标签] 计算资料向量失败: {str(e)}")
+            return None
+        similarities = vectors @ vector
+        best = int(similarities.argmax())
+        if float(similarities[best]) < Config.RELATED_MATERIALS_TAG_SIMILARITY:
+            return None
+        return TAG_CANDIDATES[best]
+
+    def classify(self, item: Dict) -> List[str]:
+        """
+        为单条资料分类
+
+        Args:
+            item: {'title', 'url', 'snippet'}
+
+        Returns:
+            标签列表（未能分类时为 [DEFAULT_TAG]）
+        """
+        url = item.get('url') or ''
+        if url:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return list(cached)
+
+        title, snippet = item.get('title', ''), item.get('snippet', '')
+        tags = self._rule_tags(title, snippet)
+        if not tags:
+            tag = self._embedding_tag(title, snippet)
+            tags = [tag] if tag else [DEFAULT_TAG]
+
+        if url:
+            self.cache.put(url, tuple(tags))
+        return tags
+
+    def tag(self, items: List[Dict]) -> List[Dict]:
+        """为资料列表打标签（原地写入 item['tags']）"""
+        for item in items:
+            item['tags'] = self.classify(item)
+        return items
+
+
+# 全局网络资料标签分类器
+material_tagger = MaterialTagger()
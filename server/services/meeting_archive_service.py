@@ -0,0 +1,473 @@
+"""
+会议归档服务
+
+已完成且长期未更新的会议，把体积最大的冷数据移出主库和上传目录：
+- 转写记录的转写文本（transcripts.text）
+- 备课资料的解析内容（documents.parsed_content）
+- 上传的资料文件（uploads/documents/<meeting_id>/）
+
+每个会议打包为一个压缩归档文件（安装了 zstandard 时为 .tar.zst，否则 .tar.gz），数据库中的字段置为空作为占位，
+meetings.archived_at 标记已归档。会议总结、要点、资料摘要和检索片段保留在库中，列表、检索和总结导出不受影响。
+访问会议详情、资料内容、批量导出或 AI 对话时按需恢复（ensure_restored），恢复后删除归档文件。
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from config import Config
+from database import db
+from models.document import Document
+from models.meeting import Meeting
+from models.transcript import Transcript
+from services.document_progress import STATUS_UPLOADED, STATUS_PROCESSING
+from utils.datetime_utils import beijing_now
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+ARCHIVE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads', 'archive')
+
+# 归档文件格式版本（manifest.json 中的 format）
+ARCHIVE_FORMAT = 1
+
+# zstd 压缩级别（归档为后台任务，取偏重压缩率的级别）
+ZSTD_LEVEL = 10
+
+CODEC_SUFFIXES = {'zstd': '.tar.zst', 'gzip': '.tar.gz'}
+
+# 资料仍在解析中的会议暂不归档
+PENDING_DOCUMENT_STATUSES = (STATUS_UPLOADED, STATUS_PROCESSING)
+
+
+def resolve_codec(codec: str) -> str:
+    """按配置选择压缩格式（auto：安装了 zstandard 时使用 zstd）"""
+    if codec == 'zstd' and not ZSTD_AVAILABLE:
+        logger.warning("ARCHIVE_CODEC=zstd 但未安装 zstandard，使用 gzip")
+        return 'gzip'
+    if codec in CODEC_SUFFIXES:
+        return codec
+    return 'zstd' if ZSTD_AVAILABLE else 'gzip'
+
+
+def codec_of(filename: str) -> str:
+    """按归档文件名判断压缩格式"""
+    return 'zstd' if filename.endswith(CODEC_SUFFIXES['zstd']) else 'gzip'
+
+
+@contextmanager
+def _compressed_writer(raw, codec: str):
+    if codec == 'zstd':
+        with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False) as writer:
+            yield writer
+    else:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as writer:
+            yield writer
+
+
+@contextmanager
+def _compressed_reader(raw, codec: str):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("归档文件为 zstd 格式，需要安装 zstandard: pip install zstandard")
+        with zstandard.ZstdDecompressor().stream_reader(raw, closefd=False) as reader:
+            yield reader
+    else:
+        with gzip.GzipFile(fileobj=raw, mode='rb') as reader:
+            yield reader
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(beijing_now().timestamp())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def iter_archive(path: str):
+    """按顺序读取归档文件中的条目，产出 (条目名, 字节)"""
+    with open(path, 'rb') as raw, _compressed_reader(raw, codec_of(path)) as reader:
+        with tarfile.open(fileobj=reader, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                yield member.name, tar.extractfile(member).read()
+
+
+class MeetingArchiveService:
+    """会议归档服务类"""
+
+    def __init__(self, archive_dir: Optional[str] = None, codec: Optional[str] = None):
+        self.archive_dir = archive_dir or Config.ARCHIVE_DIR or ARCHIVE_FOLDER
+        self.codec = resolve_codec(codec or Config.ARCHIVE_CODEC)
+
+    def archive_path(self, filename: str) -> str:
+        return os.path.join(self.archive_dir, filename)
+
+    def find_candidates(self, older_than_days: int, limit: Optional[int] = None) -> List[str]:
+        """已完成、未归档、最后更新早于 N 天前的会议ID（最久未更新的在前）"""
+        cutoff = beijing_now() - timedelta(days=older_than_days)
+        query = db.session.query(Meeting.id).filter(
+            Meeting.status == 'completed',
+            Meeting.archived_at.is_(None),
+            Meeting.updated_at < cutoff
+        ).order_by(Meeting.updated_at.asc())
+        if limit:
+            query = query.limit(limit)
+        return [row.id for row in query.all()]
+
+    def estimate(self, meeting_id: str) -> Dict:
+        """估计会议可归档的数据量（演练时使用，不读取大字段内容）"""
+        transcript_bytes = db.session.query(func.coalesce(func.sum(func.length(Transcript.text)), 0)).filter(
+            Transcript.meeting_id == meeting_id
+        ).scalar()
+        rows = db.session.query(
+            Document.file_path, func.coalesce(func.length(Document.parsed_content), 0)
+        ).filter(Document.meeting_id == meeting_id).all()
+        file_bytes = sum(os.path.getsize(path) for path, _ in rows if path and os.path.exists(path))
+        return {
+            'meeting_id': meeting_id,
+            'transcript_bytes': int(transcript_bytes or 0),
+            'content_bytes': sum(int(length or 0) for _, length in rows),
+            'file_bytes': file_bytes,
+            'documents': len(rows),
+        }
+
+    def archive_meeting(self, meeting_id: str) -> Optional[Dict]:
+        """
+        归档单个会议
+
+        在行锁内打包转写文本、解析内容和上传文件，校验归档文件可以完整读出后再把字段置空并删除上传文件。
+        会议不满足条件（未完成、已归档、资料仍在解析）时返回 None。
+
+        Returns:
+            { "meeting_id", "archive_file", "transcripts", "documents", "files", "original_bytes", "archive_bytes" }
+        """
+        meeting = Meeting.query.filter_by(id=meeting_id).with_for_update().populate_existing().first()
+        if not meeting or meeting.archived_at or meeting.status != 'completed':
+            db.session.rollback()
+            return None
+
+        transcripts = Transcript.query.filter_by(meeting_id=meeting_id).order_by(Transcript.id).with_for_update().all()
+        documents = Document.query.filter_by(meeting_id=meeting_id).order_by(Document.id).with_for_update().all()
+        if any(document.status in PENDING_DOCUMENT_STATUSES for document in documents):
+            db.session.rollback()
+            logger.info(f"[会议归档] 资料仍在解析中，暂不归档 - meeting_id: {meeting_id}")
+            return None
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        filename = f"{meeting_id}{CODEC_SUFFIXES[self.codec]}"
+        path = self.archive_path(filename)
+        try:
+            stats = self._write_archive(path, meeting_id, transcripts, documents)
+            self._verify_archive(path, stats['digests'])
+
+            for transcript in transcripts:
+                transcript.text = ''
+            for document in documents:
+                document.parsed_content = None
+            meeting.archived_at = beijing_now()
+            meeting.archive_file = filename
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+        # 数据库已提交，再删除上传文件（删除失败只留下多余文件，不影响恢复）
+        for document in documents:
+            if document.file_path and os.path.exists(document.file_path):
+                try:
+                    os.remove(document.file_path)
+                except OSError as e:
+                    logger.warning(f"[会议归档] 删除上传文件失败: {document.file_path}, 错误: {str(e)}")
+        self._remove_empty_folder(documents)
+        self._invalidate_caches(meeting_id)
+
+        result = {
+            'meeting_id': meeting_id,
+            'archive_file': filename,
+            'transcripts': len(transcripts),
+            'documents': len(documents),
+            'files': stats['files'],
+            'original_bytes': stats['original_bytes'],
+            'archive_bytes': os.path.getsize(path),
+        }
+        logger.info(f"[会议归档] 已归档 - meeting_id: {meeting_id}, 原始: {result['original_bytes']} 字节, "
+                    f"归档文件: {result['archive_bytes']} 字节")
+        return result
+
+    def _write_archive(self, path: str, meeting_id: str, transcripts: List[Transcript],
+                       documents: List[Document]) -> Dict:
+        """写入归档文件（先写临时文件再替换），返回条目摘要和原始大小"""
+        entries = []
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'meeting_id': meeting_id,
+            'archived_at': beijing_now().isoformat(),
+            'transcripts': [],
+            'documents': [],
+        }
+        for transcript in transcripts:
+            if transcript.text:
+                name = f"transcripts/{transcript.id}.txt"
+                entries.append((name, transcript.text.encode('utf-8'), None))
+                manifest['transcripts'].append({'id': transcript.id, 'entry': name})
+        for document in documents:
+            item = {'id': document.id, 'content': None, 'file': None, 'file_path': document.file_path}
+            if document.parsed_content:
+                item['content'] = f"documents/{document.id}.txt"
+                entries.append((item['content'], document.parsed_content.encode('utf-8'), None))
+            if document.file_path and os.path.exists(document.file_path):
+                item['file'] = f"files/{document.id}/{os.path.basename(document.file_path)}"
+                entries.append((item['file'], None, document.file_path))
+            manifest['documents'].append(item)
+
+        digests = {}
+        original_bytes = 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as raw:
+            with _compressed_writer(raw, self.codec) as writer, tarfile.open(fileobj=writer, mode='w|') as tar:
+                _add_bytes(tar, 'manifest.json', json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+                for name, data, file_path in entries:
+                    if data is None:
+                        with open(file_path, 'rb') as f:
+                            data = f.read()
+                    digests[name] = hashlib.sha256(data).hexdigest()
+                    original_bytes += len(data)
+                    _add_bytes(tar, name, data)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return {
+            'digests': digests,
+            'files': sum(1 for _, data, _ in entries if data is None),
+            'original_bytes': original_bytes,
+        }
+
+    @staticmethod
+    def _verify_archive(path: str, digests: Dict[str, str]):
+        """完整读出归档文件并校验每个条目的哈希"""
+        seen = {}
+        for name, data in iter_archive(path):
+            if name in digests:
+                seen[name] = hashlib.sha256(data).hexdigest()
+        if seen != digests:
+            raise RuntimeError(f"归档文件校验失败: {path}")
+
+    def ensure_restored(self, meeting_id: Optional[str]) -> bool:
+        """
+        会议已归档时从归档文件恢复（访问会议内容前调用，未归档时只有一次主键查询）
+
+        Returns:
+            是否执行了恢复
+        """
+        if not meeting_id:
+            return False
+        archived = db.session.query(Meeting.archived_at).filter(Meeting.id == meeting_id).scalar()
+        if archived is None:
+            return False
+        return self.restore(meeting_id)
+
+    def restore(self, meeting_id: str) -> bool:
+        """
+        从归档文件恢复转写文本、解析内容和上传文件
+
+        在会议行锁内执行，多个请求（或多个进程）同时访问时只恢复一次。
+        归档文件缺失或损坏时记录错误并保留占位，不影响会议的其他信息。
+
+        Returns:
+            是否执行了恢复
+        """
+        meeting = Meeting.query.filter_by(id=meeting_id).with_for_update().populate_existing().first()
+        if not meeting or not meeting.archived_at:
+            db.session.rollback()
+            return False
+
+        path = self.archive_path(meeting.archive_file or '')
+        try:
+            transcripts = {t.id: t for t in Transcript.query.filter_by(meeting_id=meeting_id).all()}
+            documents = {d.id: d for d in Document.query.filter_by(meeting_id=meeting_id).all()}
+            targets = {}
+            files = 0
+            for name, data in iter_archive(path):
+                if name == 'manifest.json':
+                    manifest = json.loads(data.decode('utf-8'))
+                    for item in manifest['transcripts']:
+                        targets[item['entry']] = ('transcript', transcripts.get(item['id']))
+                    for item in manifest['documents']:
+                        document = documents.get(item['id'])
+                        if item['content']:
+                            targets[item['content']] = ('content', document)
+                        if item['file']:
+                            targets[item['file']] = ('file', document)
+                    continue
+
+                kind, record = targets.get(name, (None, None))
+                if record is None:
+                    continue  # 归档后已删除的转写记录或资料
+                if kind == 'transcript':
+                    record.text = data.decode('utf-8')
+                elif kind == 'content':
+                    record.parsed_content = data.decode('utf-8')
+                elif kind == 'file':
+                    self._restore_file(record.file_path, data)
+                    files += 1
+
+            meeting.archived_at = None
+            meeting.archive_file = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"[会议归档] 恢复失败 - meeting_id: {meeting_id}, 归档文件: {path}, 错误: {str(e)}")
+            return False
+
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"[会议归档] 删除归档文件失败: {path}, 错误: {str(e)}")
+        self._invalidate_caches(meeting_id)
+        logger.info(f"[会议归档] 已恢复 - meeting_id: {meeting_id}, 文件: {files}")
+        return True
+
+    def read_transcripts(self, meeting: Meeting) -> Dict[int, str]:
+        """只读取归档文件中的转写文本（批量导出等一次性读取，不恢复到数据库）"""
+        if not meeting.archived_at or not meeting.archive_file:
+            return {}
+        texts = {}
+        for name, data in iter_archive(self.archive_path(meeting.archive_file)):
+            if name.startswith('transcripts/'):
+                texts[int(os.path.splitext(os.path.basename(name))[0])] = data.decode('utf-8')
+            elif name.startswith(('documents/', 'files/')):
+                break  # 转写文本排在资料之前
+        return texts
+
+    @staticmethod
+    def _restore_file(file_path: str, data: bytes):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+
+    def remove_archive(self, meeting: Meeting):
+        """删除会议的归档文件（删除会议时调用）"""
+        if not meeting.archive_file:
+            return
+        path = self.archive_path(meeting.archive_file)
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"[会议归档] 删除归档文件失败: {path}, 错误: {str(e)}")
+
+    def archive_completed(self, older_than_days: Optional[int] = None, limit: Optional[int] = None,
+                          dry_run: bool = False, progress=None) -> Dict:
+        """
+        归档已完成且超过 N 天未更新的会议
+
+        Args:
+            older_than_days: 天数（默认 ARCHIVE_AFTER_DAYS）
+            limit: 本次最多处理的会议数
+            dry_run: 只统计候选会议和可归档的数据量，不修改
+            progress: 每处理一个会议调用一次 progress(index, total, meeting_id, result, error)
+
+        Returns:
+            { "candidates", "archived", "skipped", "failed", "original_bytes", "archive_bytes", "meetings": [...] }
+        """
+        days = Config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        meeting_ids = self.find_candidates(days, limit)
+        report = {
+            'older_than_days': days,
+            'codec': self.codec,
+            'candidates': len(meeting_ids),
+            'archived': 0,
+            'skipped': 0,
+            'failed': 0,
+            'original_bytes': 0,
+            'archive_bytes': 0,
+            'meetings': [],
+        }
+        for index, meeting_id in enumerate(meeting_ids, 1):
+            result, error = None, None
+            try:
+                if dry_run:
+                    result = self.estimate(meeting_id)
+                    report['original_bytes'] += (
+                        result['transcript_bytes'] + result['content_bytes'] + result['file_bytes']
+                    )
+                else:
+                    result = self.archive_meeting(meeting_id)
+                    if result:
+                        report['archived'] += 1
+                        report['original_bytes'] += result['original_bytes']
+                        report['archive_bytes'] += result['archive_bytes']
+                    else:
+                        report['skipped'] += 1
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                report['failed'] += 1
+                logger.error(f"[会议归档] 归档失败 - meeting_id: {meeting_id}, 错误: {error}")
+            if result:
+                report['meetings'].append(result)
+            if progress:
+                progress(index, len(meeting_ids), meeting_id, result, error)
+        return report
+
+    def status(self) -> Dict:
+        """归档现状：已归档会议数和归档文件总大小"""
+        archived = db.session.query(Meeting.archive_file).filter(Meeting.archived_at.isnot(None)).all()
+        total = 0
+        missing = []
+        for (filename,) in archived:
+            path = self.archive_path(filename or '')
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+            else:
+                missing.append(filename)
+        return {
+            'archive_dir': self.archive_dir,
+            'codec': self.codec,
+            'archived_meetings': len(archived),
+            'archive_bytes': total,
+            'missing_files': missing,
+        }
+
+    @staticmethod
+    def _remove_empty_folder(documents: List[Document]):
+        folders = {os.path.dirname(document.file_path) for document in documents if document.file_path}
+        for folder in folders:
+            try:
+                if os.path.isdir(folder) and not os.listdir(folder):
+                    os.rmdir(folder)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _invalidate_caches(meeting_id: str):
+        """资料内容变化后清理本进程的对话上下文缓存"""
+        from services.prompt_context_cache import prompt_context_cache
+        from services.chat_context_builder import chat_context_builder
+        from services.document_retrieval import document_retrieval
+        prompt_context_cache.invalidate(meeting_id)
+        chat_context_builder.forget(meeting_id)
+        document_retrieval.invalidate(meeting_id)
+
+
+# 全局服务实例
+meeting_archive_service = MeetingArchiveService()
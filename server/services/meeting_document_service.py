@@ -1,10 +1,25 @@
 """
 会议文档生成服务
+
+会议总结生成后不再变化，Word 文档在保存总结时渲染一次，按（会议ID，总结版本）
+存放在磁盘上；下载时只计算版本号并用 send_file 返回已有文件（支持 ETag/If-None-Match）。
+版本号由总结内容和文档中用到的会议信息（名称、学科、参会人员等）计算，任一变化都会生成新文件。
+思维导图的排版结果（JSON）和 SVG 也按同一版本存放在旁边，供前端和批量导出直接使用。
 """
+import hashlib
 import io
-from typing import Dict, Optional
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+from config import Config
 from database import db
+from models.meeting import Meeting
 from models.transcript import Transcript
+from services.summary_docx_writer import SummaryDocxWriter
+from services.mind_map_renderer import iter_outline, layout_mind_map, render_svg
 from utils.datetime_formatter import format_datetime_to_beijing
 
 # 尝试导入docx库
@@ -16,6 +31,11 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# 会议总结导出文件目录
+EXPORT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads', 'exports', 'summaries')
+
 
 class MeetingDocumentService:
     """会议文档生成服务类"""
@@ -28,6 +48,8 @@ class MeetingDocumentService:
             meeting_service: MeetingService 实例，用于获取会议信息
         """
         self.meeting_service = meeting_service
+        # 模板写入器（默认），骨架使用与 python-docx 构建方式相同的样式
+        self.template_writer = SummaryDocxWriter(self._setup_document_style)
     
     def generate_summary_document(self, meeting_id: str, user_id: Optional[int] = None) -> io.BytesIO:
         """
@@ -56,21 +78,204 @@ class MeetingDocumentService:
         if not transcript_record or not transcript_record.summary_dict:
             raise ValueError("会议总结不存在，请先生成会议总结")
         
-        summary_data = transcript_record.summary_dict
+        # 将文档保存到内存
+        doc_bytes = io.BytesIO()
+        self._save(meeting, transcript_record.summary_dict, doc_bytes)
+        doc_bytes.seek(0)
+        
+        return doc_bytes
+    
+    def get_summary_export(self, meeting_id: str, user_id: Optional[int] = None) -> Optional[Tuple[str, str, str]]:
+        """
+        获取会议总结Word文档的导出文件（当前版本不存在时渲染一次）
+        
+        Args:
+            meeting_id: 会议ID
+            user_id: 用户ID（用于权限检查）
+        
+        Returns:
+            (文件路径, 版本号, 会议名称)；会议不存在或无权限时返回 None
+        """
+        resolved = self._resolve_summary(meeting_id, user_id)
+        if not resolved:
+            return None
+        meeting, header, version, summary_text = resolved
+        
+        path = self._export_path(meeting_id, version)
+        if not os.path.exists(path):
+            self._write_export(path, header, self._parse_summary(summary_text))
+        
+        return path, version, meeting.name
+    
+    def get_mind_map(self, meeting_id: str, user_id: Optional[int] = None) -> Optional[Tuple[str, str, str]]:
+        """
+        获取思维导图的排版结果和 SVG 文件（当前版本不存在时排版一次）
+        
+        Args:
+            meeting_id: 会议ID
+            user_id: 用户ID（用于权限检查）
+        
+        Returns:
+            (版本号, 排版JSON文件路径, SVG文件路径)；会议不存在或无权限时返回 None
+        """
+        resolved = self._resolve_summary(meeting_id, user_id)
+        if not resolved:
+            return None
+        _, _, version, summary_text = resolved
+        
+        layout_path = self._export_path(meeting_id, version, '.mindmap.json')
+        svg_path = self._export_path(meeting_id, version, '.svg')
+        if not os.path.exists(svg_path):
+            layout = layout_mind_map(self._parse_summary(summary_text).get('mind_map_summary'))
+            if not layout:
+                raise ValueError("会议总结中没有思维导图")
+            self._write_atomic(layout_path, json.dumps(layout, ensure_ascii=False).encode('utf-8'))
+            self._write_atomic(svg_path, render_svg(layout).encode('utf-8'))
+            self._prune_versions(os.path.dirname(svg_path), version)
+        
+        return version, layout_path, svg_path
+    
+    def export_summary_document(self, meeting_id: str) -> Optional[str]:
+        """
+        保存会议总结后预先渲染Word文档
+        
+        Returns:
+            版本号（python-docx 未安装或渲染失败时返回 None，下载时会再次尝试）
+        """
+        try:
+            self.get_mind_map(meeting_id)
+        except ValueError:
+            pass  # 没有思维导图
+        except Exception as e:
+            logger.warning(f"预先排版思维导图失败，会议ID: {meeting_id}, 错误: {str(e)}")
+        
+        if not DOCX_AVAILABLE:
+            return None
+        try:
+            result = self.get_summary_export(meeting_id)
+            return result[1] if result else None
+        except Exception as e:
+            logger.warning(f"预先生成会议总结文档失败，会议ID: {meeting_id}, 错误: {str(e)}")
+            return None
+    
+    @staticmethod
+    def remove_summary_exports(meeting_id: str):
+        """删除会议的全部导出文件（删除会议时调用）"""
+        shutil.rmtree(os.path.join(EXPORT_FOLDER, meeting_id), ignore_errors=True)
+    
+    @staticmethod
+    def summary_version(header: Dict, summary_text: str) -> str:
+        """由总结内容和会议信息计算文档版本号（用作 ETag）"""
+        digest = hashlib.sha1(summary_text.encode('utf-8'))
+        digest.update(json.dumps(header, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()[:20]
+    
+    def _resolve_summary(self, meeting_id: str, user_id: Optional[int] = None):
+        """
+        查询会议和最新总结并计算版本号（不加载转写记录，不解析总结 JSON）
+        
+        Returns:
+            (会议, 文档头信息, 版本号, 总结JSON文本)；会议不存在或无权限时返回 None
+        """
+        query = Meeting.query.filter_by(id=meeting_id)
+        if user_id:
+            query = query.filter_by(user_id=user_id)
+        meeting = query.first()
+        if not meeting:
+            return None
+        
+        row = db.session.query(Transcript.summary).filter_by(meeting_id=meeting_id).order_by(
+            Transcript.created_at.desc()
+        ).first()
+        summary_text = row.summary if row else None
+        if not summary_text:
+            raise ValueError("会议总结不存在，请先生成会议总结")
+        
+        header = self._summary_header(meeting)
+        return meeting, header, self.summary_version(header, summary_text), summary_text
+    
+    @staticmethod
+    def _parse_summary(summary_text: str) -> Dict:
+        try:
+            summary_data = json.loads(summary_text)
+        except ValueError:
+            summary_data = None
+        if not summary_data:
+            raise ValueError("会议总结不存在，请先生成会议总结")
+        return summary_data
+    
+    @staticmethod
+    def _summary_header(meeting: Meeting) -> Dict:
+        """文档中用到的会议信息（不加载转写记录）"""
+        teachers = [{'name': mt.teacher.name} for mt in (meeting.meeting_teachers or []) if mt.teacher]
+        return {
+            'name': meeting.name,
+            'subject': meeting.subject,
+            'grade': meeting.grade,
+            'lesson_type': meeting.lesson_type,
+            'created_at': meeting.created_at.isoformat() if meeting.created_at else None,
+            'teachers': teachers,
+        }
+    
+    @staticmethod
+    def _export_path(meeting_id: str, version: str, suffix: str = '.docx') -> str:
+        return os.path.join(EXPORT_FOLDER, meeting_id, f"{version}{suffix}")
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        """原子写入小文件"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _prune_versions(directory: str, version: str):
+        """删除该会议其他版本的导出文件"""
+        for name in os.listdir(directory):
+            if not name.startswith(f"{version}.") and not name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+    
+    def _write_export(self, path: str, header: Dict, summary_data: Dict):
+        """渲染并原子写入导出文件，同时清理该会议的旧版本"""
+        if not DOCX_AVAILABLE:
+            raise ValueError("python-docx 未安装，无法生成Word文档")
+        
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self._save(header, summary_data, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
-        # 创建Word文档
+        self._prune_versions(directory, os.path.basename(path)[:-len('.docx')])
+        logger.info(f"已生成会议总结文档: {path}")
+    
+    def _save(self, meeting: Dict, summary_data: Dict, fileobj):
+        """渲染会议总结Word文档并写入文件对象（SUMMARY_DOCX_ENGINE 选择模板写入或 python-docx 构建）"""
+        if Config.SUMMARY_DOCX_ENGINE == 'template':
+            self.template_writer.write(fileobj, meeting, summary_data)
+        else:
+            self._render(meeting, summary_data).save(fileobj)
+    
+    def _render(self, meeting: Dict, summary_data: Dict) -> 'DocxDocument':
+        """用 python-docx 构建会议总结Word文档"""
         doc = DocxDocument()
         self._setup_document_style(doc)
         self._add_title(doc, meeting.get('name', '会议总结'))
         self._add_basic_info(doc, meeting)
         self._add_summary_sections(doc, summary_data)
-        
-        # 将文档保存到内存
-        doc_bytes = io.BytesIO()
-        doc.save(doc_bytes)
-        doc_bytes.seek(0)
-        
-        return doc_bytes
+        return doc
     
     def _setup_document_style(self, doc: DocxDocument):
         """设置文档默认样式"""
@@ -302,10 +507,15 @@ class MeetingDocumentService:
         
         self._add_section_title(doc, '五、思维导图')
         
-        mindmap_para = doc.add_paragraph('（思维导图结构请参考系统界面）')
-        mindmap_para.paragraph_format.left_indent = Inches(0.3)
-        mindmap_para.runs[0].font.size = Pt(11)
-        mindmap_para.runs[0].font.italic = True
-        mindmap_para.runs[0].font.color.rgb = RGBColor(128, 128, 128)
+        # 导图大纲：按层级缩进
+        for depth, title in iter_outline(mind_map):
+            node_para = doc.add_paragraph()
+            node_para.paragraph_format.left_indent = Inches(0.3 + 0.3 * depth)
+            node_para.paragraph_format.space_after = Pt(3)
+            node_run = node_para.add_run(title if depth == 0 else f"• {title}")
+            node_run.font.size = Pt(12 if depth == 0 else 11)
+            node_run.font.bold = depth == 0
+            if depth <= 1:
+                node_run.font.color.rgb = RGBColor(0, 51, 102)
         doc.add_paragraph()  # 空行
 
@@ -5,14 +5,33 @@
 import uuid
 import logging
 from typing import Dict, Optional, List
+from sqlalchemy.orm import joinedload, selectinload
 from database import db
 from models.meeting import Meeting
 from models.meeting_teacher import MeetingTeacher
 from services.tytingwu_service import TyingWuService
+from services.prompt_context_cache import prompt_context_cache
+from services.chat_context_builder import chat_context_builder
+from services.document_retrieval import document_retrieval
+from services.search_service import search_service
+from services.meeting_archive_service import meeting_archive_service
 
 logger = logging.getLogger(__name__)
 
 
+def serialization_options(include_transcripts: bool = False) -> list:
+    """
+    Meeting.to_dict 所需关系的预加载选项
+    
+    参会教师（及教师记录）和转写记录按批次 IN 查询一次性加载，
+    序列化列表时不再对每个会议、每个教师单独查询。
+    """
+    options = [selectinload(Meeting.meeting_teachers).joinedload(MeetingTeacher.teacher)]
+    if include_transcripts:
+        options.append(selectinload(Meeting.transcripts))
+    return options
+
+
 class MeetingService:
     """会议服务类 - 核心CRUD操作"""
     
@@ -105,7 +124,7 @@ class MeetingService:
         Returns:
             会议信息
         """
-        query = Meeting.query.filter_by(id=meeting_id)
+        query = Meeting.query.options(*serialization_options(include_transcripts=True)).filter_by(id=meeting_id)
         if user_id:
             query = query.filter_by(user_id=user_id)
         
@@ -118,6 +137,10 @@ class MeetingService:
             meeting.status = 'running'
             db.session.commit()
         
+        # 已归档的会议先从归档文件恢复转写文本和资料
+        if meeting.archived_at:
+            meeting_archive_service.restore(meeting.id)
+        
         return meeting.to_dict(include_transcripts=True, include_teachers=True)
     
     def list_meetings(self, user_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict]:
@@ -131,13 +154,14 @@ class MeetingService:
         Returns:
             会议列表
         """
-        query = Meeting.query
+        query = Meeting.query.options(*serialization_options())
         if user_id:
             query = query.filter_by(user_id=user_id)
         if status:
             query = query.filter_by(status=status)
+        query = query.order_by(Meeting.created_at.desc())
         
-        meetings = query.order_by(Meeting.created_at.desc()).all()
+        meetings = query.all()
         
         # 自动修复状态：如果会议有任务信息但状态是pending，自动更新为running
         updated = False
@@ -148,6 +172,8 @@ class MeetingService:
         
         if updated:
             db.session.commit()
+            # 提交后实例已过期，重新查询以保留预加载
+            meetings = query.all()
         
         # 包含教师信息以便前端显示科目和数量
         return [m.to_dict(include_teachers=True) for m in meetings]
@@ -315,6 +341,10 @@ class MeetingService:
         except Exception as e:
             logger.warning(f"停止任务失败: {str(e)}")
         
+        # 删除检索条目和归档文件
+        search_service.remove_meeting(meeting_id)
+        meeting_archive_service.remove_archive(meeting)
+        
         # 删除关联的会议-教师关联记录
         meeting_teachers = MeetingTeacher.query.filter_by(meeting_id=meeting_id).all()
         for mt in meeting_teachers:
@@ -337,5 +367,8 @@ class MeetingService:
         # 删除会议（级联删除 transcripts）
         db.session.delete(meeting)
         db.session.commit()
+        prompt_context_cache.invalidate(meeting_id)
+        chat_context_builder.forget(meeting_id)
+        document_retrieval.invalidate(meeting_id)
         
         logger.info(f"会议已删除: {meeting_id}")
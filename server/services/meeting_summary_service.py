@@ -7,6 +7,10 @@ from database import db
 from models.meeting import Meeting
 from models.transcript import Transcript
 from services.tytingwu_service import TyingWuService
+from services.meeting_service import MeetingService
+from services.meeting_document_service import MeetingDocumentService
+from services.search_service import search_service
+from services.meeting_archive_service import meeting_archive_service
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,7 @@ class MeetingSummaryService:
     
     def __init__(self):
         self.tytingwu_service = TyingWuService()
+        self.document_service = MeetingDocumentService(MeetingService())
     
     def generate_summary(self, meeting_id: str, summary_type: str = 'brief') -> Dict:
         """
@@ -100,6 +105,9 @@ class MeetingSummaryService:
         if not meeting:
             raise ValueError(f"会议不存在: {meeting_id}")
         
+        # 会议已归档时先恢复转写文本
+        meeting_archive_service.ensure_restored(meeting_id)
+        
         # 获取最新转写文本
         transcript_record = Transcript.query.filter_by(meeting_id=meeting_id).order_by(
             Transcript.created_at.desc()
@@ -176,4 +184,16 @@ class MeetingSummaryService:
         # 更新转写记录的摘要
         transcript_record.summary_dict = summary_result
         db.session.commit()
+        
+        # 总结生成后不再变化，预先渲染Word文档，下载时直接返回文件
+        self.document_service.export_summary_document(meeting_id)
+        self._index_summary(meeting_id)
+    
+    def _index_summary(self, meeting_id: str):
+        """更新会议总结的检索索引（失败不影响总结结果）"""
+        try:
+            search_service.index_summary(meeting_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"更新会议总结检索索引失败 - meeting_id: {meeting_id}, 错误: {str(e)}")
 
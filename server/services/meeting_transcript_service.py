@@ -6,11 +6,23 @@ from typing import Dict
 from database import db
 from models.meeting import Meeting
 from models.transcript import Transcript
+from services.search_service import search_service
+from services.meeting_archive_service import meeting_archive_service
 
 
 class MeetingTranscriptService:
     """会议转写服务类"""
     
+    @staticmethod
+    def _ensure_writable(meeting: Meeting):
+        """
+        已归档的会议先恢复转写文本再写入
+
+        写在归档占位上的内容会在之后恢复时被归档中的文本覆盖，无法恢复时拒绝写入。
+        """
+        if meeting.archived_at and not meeting_archive_service.restore(meeting.id):
+            raise ValueError(f"会议已归档且无法从归档文件恢复，暂不能写入转写记录: {meeting.id}")
+    
     def update_transcript(self, meeting_id: str, transcript: str) -> Dict:
         """
         更新转写文本（旧接口，保持兼容）
@@ -25,6 +37,7 @@ class MeetingTranscriptService:
         meeting = Meeting.query.filter_by(id=meeting_id).first()
         if not meeting:
             raise ValueError(f"会议不存在: {meeting_id}")
+        self._ensure_writable(meeting)
         
         # 创建或更新转写记录
         transcript_record = Transcript.query.filter_by(meeting_id=meeting_id).order_by(
@@ -41,6 +54,7 @@ class MeetingTranscriptService:
             db.session.add(transcript_record)
         
         db.session.commit()
+        search_service.schedule_transcripts(meeting_id)
         
         return meeting.to_dict(include_transcripts=True, include_teachers=True)
     
@@ -64,6 +78,7 @@ class MeetingTranscriptService:
         for field in required_fields:
             if field not in message:
                 raise ValueError(f"消息缺少必需字段: {field}")
+        self._ensure_writable(meeting)
         
         # 获取或创建转写记录
         transcript_record = Transcript.query.filter_by(meeting_id=meeting_id).order_by(
@@ -87,6 +102,7 @@ class MeetingTranscriptService:
             transcript_record.text = message_json
         
         db.session.commit()
+        search_service.schedule_transcripts(meeting_id)
         
         return meeting.to_dict(include_transcripts=True, include_teachers=True)
 
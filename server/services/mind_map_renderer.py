@@ -0,0 +1,204 @@
+"""
+思维导图服务端渲染
+
+把通义听悟返回的 MindMapSummary（{Title, Topic: [...]} 树）排版为从左到右展开的导图：
+- layout_mind_map: 计算每个节点的位置和大小（按层对齐列，子树纵向堆叠、父节点居中）；
+- render_svg: 根据排版结果生成 SVG；
+- iter_outline: 按深度优先顺序输出（层级, 标题），用于 Word 文档中的大纲。
+排版结果按会议总结版本缓存在磁盘上（见 MeetingDocumentService.get_mind_map），
+前端直接加载预先计算的 SVG，Word 导出中也包含完整的导图大纲。
+"""
+import re
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# 节点数上限（防止异常数据导致排版过大）
+MAX_NODES = 500
+
+FONT_FAMILY = "'Microsoft YaHei', 'PingFang SC', 'Noto Sans CJK SC', sans-serif"
+
+# 各层节点样式：(填充色, 边框色, 文字颜色)
+DEPTH_STYLES = [
+    ('#1e3a8a', '#1e3a8a', '#ffffff'),
+    ('#dbeafe', '#3b82f6', '#1e3a8a'),
+    ('#ecfdf5', '#10b981', '#065f46'),
+    ('#fef3c7', '#f59e0b', '#78350f'),
+]
+DEFAULT_STYLE = ('#f9fafb', '#9ca3af', '#374151')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _clean_title(node: Dict) -> str:
+    title = node.get('Title') if isinstance(node, dict) else None
+    return _WHITESPACE.sub(' ', str(title or '')).strip() or '未命名节点'
+
+
+def _children(node: Dict) -> List[Dict]:
+    topics = node.get('Topic') if isinstance(node, dict) else None
+    return [child for child in (topics or []) if isinstance(child, dict)]
+
+
+def _char_width(char: str, font_size: float) -> float:
+    """估算字符宽度：全角字符为一个字号，半角约为 0.6 个字号"""
+    return font_size if unicodedata.east_asian_width(char) in ('W', 'F') else font_size * 0.6
+
+
+def _wrap(text: str, font_size: float, max_width: float) -> List[str]:
+    """按估算宽度折行"""
+    lines, line, width = [], '', 0.0
+    for char in text:
+        char_width = _char_width(char, font_size)
+        if line and width + char_width > max_width:
+            lines.append(line)
+            line, width = '', 0.0
+        line += char
+        width += char_width
+    if line:
+        lines.append(line)
+    return lines or ['']
+
+
+def iter_outline(mind_map: List[Dict]) -> Iterator[Tuple[int, str]]:
+    """深度优先输出导图大纲：(层级, 标题)"""
+    count = 0
+    stack = [(0, node) for node in reversed(mind_map or []) if isinstance(node, dict)]
+    while stack and count < MAX_NODES:
+        depth, node = stack.pop()
+        count += 1
+        yield depth, _clean_title(node)
+        stack.extend((depth + 1, child) for child in reversed(_children(node)))
+
+
+def layout_mind_map(
+    mind_map: List[Dict],
+    font_size: float = 14,
+    max_text_width: float = 260,
+    h_gap: float = 56,
+    v_gap: float = 12,
+    padding_x: float = 12,
+    padding_y: float = 8,
+    margin: float = 24
+) -> Optional[Dict]:
+    """
+    排版思维导图（只处理第一棵树，与前端一致）
+
+    Returns:
+        {'width', 'height', 'font_size', 'line_height', 'nodes': [...], 'edges': [[父ID, 子ID], ...]}；
+        没有导图数据时返回 None
+    """
+    roots = [node for node in (mind_map or []) if isinstance(node, dict)]
+    if not roots:
+        return None
+
+    line_height = font_size * 1.4
+    nodes: List[Dict] = []
+    edges: List[List[int]] = []
+
+    # 建立节点（深度优先，顺序与大纲一致）
+    stack = [(roots[0], 0, None)]
+    while stack and len(nodes) < MAX_NODES:
+        node, depth, parent = stack.pop()
+        title = _clean_title(node)
+        lines = _wrap(title, font_size, max_text_width)
+        entry = {
+            'id': len(nodes),
+            'title': title,
+            'lines': lines,
+            'depth': depth,
+            'parent': parent,
+            'children': [],
+            'w': round(max(sum(_char_width(c, font_size) for c in line) for line in lines) + 2 * padding_x, 1),
+            'h': round(len(lines) * line_height + 2 * padding_y, 1),
+        }
+        nodes.append(entry)
+        if parent is not None:
+            nodes[parent]['children'].append(entry['id'])
+            edges.append([parent, entry['id']])
+        stack.extend((child, depth + 1, entry['id']) for child in reversed(_children(node)))
+
+    # 每层一列，列宽取该层最宽的节点
+    column_widths: Dict[int, float] = {}
+    for entry in nodes:
+        column_widths[entry['depth']] = max(column_widths.get(entry['depth'], 0), entry['w'])
+    column_x, x = {}, margin
+    for depth in sorted(column_widths):
+        column_x[depth] = x
+        x += column_widths[depth] + h_gap
+
+    # 自底向上计算子树高度（取节点自身高度与子节点堆叠高度的较大值）
+    subtree: Dict[int, float] = {}
+    for entry in reversed(nodes):  # 深度优先建立，子节点的ID总大于父节点
+        stacked = sum(subtree[child] for child in entry['children']) + v_gap * (len(entry['children']) - 1)
+        subtree[entry['id']] = max(entry['h'], stacked)
+
+    # 自顶向下分配纵向区间：节点在自己的区间内居中，子节点在区间内居中堆叠
+    bands = [(0, margin)]
+    while bands:
+        node_id, top = bands.pop()
+        entry = nodes[node_id]
+        entry['y'] = round(top + (subtree[node_id] - entry['h']) / 2, 1)
+        children = entry['children']
+        if children:
+            stacked = sum(subtree[child] for child in children) + v_gap * (len(children) - 1)
+            child_top = top + (subtree[node_id] - stacked) / 2
+            for child in children:
+                bands.append((child, child_top))
+                child_top += subtree[child] + v_gap
+
+    for entry in nodes:
+        entry['x'] = round(column_x[entry['depth']], 1)
+        del entry['children']
+
+    width = max(entry['x'] + entry['w'] for entry in nodes) + margin
+    height = subtree[0] + 2 * margin
+    return {
+        'width': round(width, 1),
+        'height': round(height, 1),
+        'font_size': font_size,
+        'line_height': round(line_height, 1),
+        'padding_x': padding_x,
+        'padding_y': padding_y,
+        'nodes': nodes,
+        'edges': edges,
+    }
+
+
+def render_svg(layout: Dict) -> str:
+    """根据排版结果生成 SVG"""
+    nodes = layout['nodes']
+    font_size = layout['font_size']
+    line_height = layout['line_height']
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout["width"]}" height="{layout["height"]}" '
+        f'viewBox="0 0 {layout["width"]} {layout["height"]}" font-family="{escape(FONT_FAMILY)}" '
+        f'font-size="{font_size}">',
+        '<rect width="100%" height="100%" fill="#ffffff"/>',
+        '<g fill="none" stroke="#94a3b8" stroke-width="1.5">',
+    ]
+    for parent_id, child_id in layout['edges']:
+        parent, child = nodes[parent_id], nodes[child_id]
+        x1, y1 = parent['x'] + parent['w'], parent['y'] + parent['h'] / 2
+        x2, y2 = child['x'], child['y'] + child['h'] / 2
+        mid = (x1 + x2) / 2
+        parts.append(f'<path d="M{x1:.1f},{y1:.1f} C{mid:.1f},{y1:.1f} {mid:.1f},{y2:.1f} {x2:.1f},{y2:.1f}"/>')
+    parts.append('</g>')
+
+    for entry in nodes:
+        fill, stroke, color = DEPTH_STYLES[entry['depth']] if entry['depth'] < len(DEPTH_STYLES) else DEFAULT_STYLE
+        weight = ' font-weight="bold"' if entry['depth'] == 0 else ''
+        parts.append(
+            f'<g><title>{escape(entry["title"])}</title>'
+            f'<rect x="{entry["x"]}" y="{entry["y"]}" width="{entry["w"]}" height="{entry["h"]}" '
+            f'rx="6" fill="{fill}" stroke="{stroke}"/>'
+        )
+        text_y = entry['y'] + layout['padding_y'] + (line_height + font_size) / 2 - font_size * 0.15
+        for index, line in enumerate(entry['lines']):
+            parts.append(
+                f'<text x="{entry["x"] + layout["padding_x"]:.1f}" y="{text_y + index * line_height:.1f}" '
+                f'fill="{color}"{weight}>{escape(line)}</text>'
+            )
+        parts.append('</g>')
+    parts.append('</svg>')
+    return ''.join(parts)
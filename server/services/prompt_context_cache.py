@@ -0,0 +1,250 @@
+"""
+AI对话提示词上下文缓存
+
+提示词中的静态部分（教学范围限定、备课资料核心信息点）只在文档解析完成
+或会议信息变化时才会改变。这里按 (会议ID, 版本戳) 缓存渲染好的会议上下文，
+每轮对话只需要拼接动态的对话记录。
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# AI 角色定位（提示词固定前缀）
+ROLE_PREAMBLE = "你是一个AI助手，一个专门用于辅助备课教学的机器人。你不是老师，你只是一个AI助手，虽然你非常擅长备课教学，但你是一个机器人。"
+
+# 备课资料使用说明
+DOCUMENTS_NOTE = "说明：以上是从备课资料中提取的核心信息点，请充分理解这些信息，并在回答时结合这些核心点提供专业的备课建议。"
+
+# 指导性提示（固定后缀）
+PROMPT_INSTRUCTION = """请根据以上信息，特别是最后用户的问答给出信息。
+
+【重要提示】
+1. **明确身份定位**：你是一个AI助手/机器人，不是老师。你只是擅长备课教学，但你是机器人身份。不要使用任何不存在的举例，比如"你带过的学生"、"你上过的课"、"你的教学经验"等。你只是一个AI助手，基于提供的备课资料和讨论内容来提供建议。
+2. **充分理解备课资料核心信息点**：这些是从备课资料中提取的关键信息，请深入理解并灵活运用
+3. **结合教学范围限定**：在回答时要充分考虑学科、年级、备课类型等限制条件
+4. **结合会议讨论内容**：根据当前的讨论记录，提供针对性的建议和回应
+5. **提供专业建议**：基于备课资料的核心点和讨论内容，提供：
+   - 教学重点和难点的分析
+   - 教学方法和策略的建议
+   - 与备课资料核心点的结合应用
+   - 针对讨论中提出的问题的专业解答
+
+【回答要求】
+- **简洁明了**：直接说重点，避免冗余和啰嗦的表达
+- **字数控制**：回答内容严格控制在 200-400 字之间
+- **专业清晰**：用专业、清晰、有针对性的语言回答，确保建议与备课资料的核心信息点紧密结合
+- **记住身份**：你是一个AI助手/机器人，不要编造任何不存在的个人经历或教学经验"""
+
+# 没有摘要时使用的内容截取长度（兼容旧数据）
+FALLBACK_SUMMARY_LENGTH = 500
+
+
+@dataclass
+class DocumentDigest:
+    """单个备课资料在提示词中的摘要"""
+    document_id: int
+    filename: str
+    text: str  # 渲染后的提示词片段
+
+
+@dataclass
+class MeetingContext:
+    """渲染好的会议静态上下文"""
+    meeting_id: str
+    version: Tuple
+    scope: str = ''  # 【教学范围限定】段落
+    documents: List[DocumentDigest] = field(default_factory=list)
+    _fingerprint: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        上下文内容指纹（教学范围 + 备课资料）
+
+        不同会议只要备课的是同一节课、资料相同，指纹就相同，可用于跨会议共享缓存。
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1(self.scope.encode('utf-8'))
+            for document in self.documents:
+                digest.update(b'\x00' + document.text.encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @property
+    def exists(self) -> bool:
+        """会议是否存在（版本戳为空表示会议不存在）"""
+        return self.version is not None and self.version[0] is not None
+
+    def render(self, documents: Optional[List[DocumentDigest]] = None) -> List[str]:
+        """
+        渲染为提示词段落列表
+
+        Args:
+            documents: 需要放入提示词的备课资料（默认全部）
+        """
+        parts = []
+        if self.scope:
+            parts.append(self.scope)
+        parts.extend(self.render_documents(self.documents if documents is None else documents))
+        return parts
+
+    @staticmethod
+    def render_documents(documents: List[DocumentDigest]) -> List[str]:
+        """渲染备课资料段落（没有资料时返回空列表）"""
+        if not documents:
+            return []
+        return [
+            "【备课资料核心信息点】\n" + "\n\n".join(d.text for d in documents),
+            DOCUMENTS_NOTE,
+        ]
+
+
+def _completed_docx_filter(meeting_id: str):
+    """已解析完成的 docx 文档过滤条件"""
+    from models.document import Document
+    return and_(
+        Document.meeting_id == meeting_id,
+        Document.file_type == 'docx',
+        Document.status == 'completed'
+    )
+
+
+def get_context_version(meeting_id: str) -> Optional[Tuple]:
+    """
+    计算会议上下文的版本戳
+
+    只查询会议更新时间和已完成文档的数量/最后更新时间，不加载文档内容。
+
+    Returns:
+        (会议更新时间, 文档数量, 文档最后更新时间)，会议不存在时返回 None
+    """
+    from models.meeting import Meeting
+    from models.document import Document
+
+    row = db.session.query(
+        Meeting.updated_at,
+        func.count(Document.id),
+        func.max(Document.updated_at)
+    ).outerjoin(
+        Document, _completed_docx_filter(meeting_id)
+    ).filter(
+        Meeting.id == meeting_id
+    ).group_by(Meeting.id, Meeting.updated_at).first()
+
+    if not row:
+        return None
+    return (row[0], row[1], row[2])
+
+
+def render_meeting_context(meeting_id: str, version: Optional[Tuple]) -> MeetingContext:
+    """
+    从数据库渲染会议静态上下文
+
+    Args:
+        meeting_id: 会议ID
+        version: 版本戳（由 get_context_version 计算）
+    """
+    from models.meeting import Meeting
+    from models.document import Document
+
+    context = MeetingContext(meeting_id=meeting_id, version=version)
+    if version is None:
+        return context
+
+    meeting = Meeting.query.get(meeting_id)
+    if not meeting:
+        return context
+
+    # 构建教师角色和教学范围限定
+    role_parts = [ROLE_PREAMBLE]
+    if meeting.subject:
+        role_parts.append(f"学科：{meeting.subject}")
+    if meeting.grade:
+        role_parts.append(f"年级：{meeting.grade}")
+    if meeting.lesson_type:
+        role_parts.append(f"备课类型：{meeting.lesson_type}")
+    if meeting.description:
+        role_parts.append(f"教学主题：{meeting.description}")
+    context.scope = "【教学范围限定】\n" + "\n".join(role_parts)
+
+    # 有摘要的文档只加载摘要；没有摘要时才截取解析内容的开头（兼容旧数据）
+    documents = db.session.query(
+        Document.id,
+        Document.original_filename,
+        Document.summary,
+        func.substr(Document.parsed_content, 1, FALLBACK_SUMMARY_LENGTH + 1)
+    ).filter(_completed_docx_filter(meeting_id)).order_by(Document.created_at).all()
+
+    for doc_id, filename, summary, content_head in documents:
+        # 优先使用单独的 summary 字段（这是从备课资料中提取的核心信息点）
+        if summary:
+            text = f"文档《{filename}》的核心信息点：\n{summary}"
+        elif content_head:
+            summary_text = content_head[:FALLBACK_SUMMARY_LENGTH] + "..." if len(content_head) > FALLBACK_SUMMARY_LENGTH else content_head
+            text = f"文档《{filename}》的内容摘要：\n{summary_text}"
+        else:
+            continue
+        context.documents.append(DocumentDigest(document_id=doc_id, filename=filename, text=text))
+
+    return context
+
+
+class PromptContextCache:
+    """按 (会议ID, 版本戳) 缓存会议静态上下文（LRU）"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, MeetingContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, meeting_id: str) -> MeetingContext:
+        """
+        获取会议上下文，版本戳变化时重新渲染
+
+        Args:
+            meeting_id: 会议ID
+        """
+        version = get_context_version(meeting_id)
+
+        with self._lock:
+            cached = self._entries.get(meeting_id)
+            if cached is not None and cached.version == version:
+                self._entries.move_to_end(meeting_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        context = render_meeting_context(meeting_id, version)
+        logger.info(f"[AI提示词缓存] 重新渲染会议上下文 - meeting_id: {meeting_id}, 文档数量: {len(context.documents)}")
+
+        with self._lock:
+            self._entries[meeting_id] = context
+            self._entries.move_to_end(meeting_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, meeting_id: str):
+        """使会议上下文失效（文档解析完成、删除或会议信息变化时调用）"""
+        with self._lock:
+            self._entries.pop(meeting_id, None)
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# 全局提示词上下文缓存
+prompt_context_cache = PromptContextCache()
@@ -0,0 +1,257 @@
+"""
+多进程实时转写消息总线
+
+多个后端进程部署在 nginx 之后时：
+- 房间广播（transcript_update 等）由 Flask-SocketIO 的 message_queue（Redis）在进程间转发；
+- 通义听悟上游连接只存在于发起 start_recognition 的进程（连接所有者）中，
+  其他进程收到的 audio_data / stop_recognition 通过本总线转发给所有者进程。
+
+总线可插拔：配置 SOCKETIO_MESSAGE_QUEUE=redis://... 时使用 Redis，
+未配置时使用进程内实现（单进程部署和测试）。
+"""
+import abc
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入redis（多进程模式需要）
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# 当前进程的唯一标识
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_OWNER_KEY = 'realtime:owner:{}'
+_WORKER_CHANNEL = 'realtime:worker:{}'
+
+# 只在值仍为本进程时删除所有权（比较和删除在 Redis 中原子执行）
+_RELEASE_OWNER_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class MessageBus(abc.ABC):
+    """消息总线接口"""
+
+    @abc.abstractmethod
+    def publish(self, channel: str, message: Dict):
+        pass
+
+    @abc.abstractmethod
+    def subscribe(self, channel: str, handler: Callable[[Dict], None]):
+        pass
+
+    @abc.abstractmethod
+    def set_owner(self, meeting_id: str, worker_id: str, ttl: int):
+        pass
+
+    @abc.abstractmethod
+    def get_owner(self, meeting_id: str) -> Optional[str]:
+        pass
+
+    @abc.abstractmethod
+    def release_owner(self, meeting_id: str, worker_id: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class InProcessBus(MessageBus):
+    """进程内消息总线（单进程部署和测试用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._owners: Dict[str, tuple] = {}
+
+    def publish(self, channel: str, message: Dict):
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"[实时总线] 处理消息失败 - channel: {channel}, 错误: {str(e)}")
+
+    def subscribe(self, channel: str, handler: Callable[[Dict], None]):
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def set_owner(self, meeting_id: str, worker_id: str, ttl: int):
+        with self._lock:
+            self._owners[meeting_id] = (worker_id, time.monotonic() + ttl)
+
+    def get_owner(self, meeting_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._owners.get(meeting_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._owners[meeting_id]
+                return None
+            return entry[0]
+
+    def release_owner(self, meeting_id: str, worker_id: str):
+        with self._lock:
+            entry = self._owners.get(meeting_id)
+            if entry is not None and entry[0] == worker_id:
+                del self._owners[meeting_id]
+
+
+class RedisBus(MessageBus):
+    """基于 Redis 发布订阅的消息总线"""
+
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._release_owner = self._redis.register_script(_RELEASE_OWNER_SCRIPT)
+        self._thread = None
+
+    def publish(self, channel: str, message: Dict):
+        self._redis.publish(channel, json.dumps(message, ensure_ascii=False))
+
+    def subscribe(self, channel: str, handler: Callable[[Dict], None]):
+        def dispatch(raw):
+            try:
+                handler(json.loads(raw['data']))
+            except Exception as e:
+                logger.error(f"[实时总线] 处理消息失败 - channel: {channel}, 错误: {str(e)}")
+
+        self._pubsub.subscribe(**{channel: dispatch})
+        if self._thread is None:
+            self._thread = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def set_owner(self, meeting_id: str, worker_id: str, ttl: int):
+        self._redis.set(_OWNER_KEY.format(meeting_id), worker_id, ex=ttl)
+
+    def get_owner(self, meeting_id: str) -> Optional[str]:
+        value = self._redis.get(_OWNER_KEY.format(meeting_id))
+        return value.decode('utf-8') if value else None
+
+    def release_owner(self, meeting_id: str, worker_id: str):
+        # 只释放自己持有的所有权（所有权可能已过期并被其他进程接管）
+        self._release_owner(keys=[_OWNER_KEY.format(meeting_id)], args=[worker_id])
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.stop()
+        self._pubsub.close()
+
+
+def create_bus(url: Optional[str]) -> MessageBus:
+    """
+    根据配置创建消息总线
+
+    Args:
+        url: redis://... 使用 Redis；为空或 memory:// 使用进程内实现
+    """
+    if url and url.startswith(('redis://', 'rediss://')):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("已配置 SOCKETIO_MESSAGE_QUEUE 但 redis 未安装，请运行: pip install redis")
+        logger.info(f"[实时总线] 使用 Redis 消息总线，worker: {WORKER_ID}")
+        return RedisBus(url)
+    return InProcessBus()
+
+
+class ConnectionRouter:
+    """
+    通义听悟连接所有权路由
+
+    发起 start_recognition 的进程登记为会议的连接所有者（带 TTL，转发音频时续期）；
+    其他进程把该会议的上游消息发布到所有者进程的专属频道。
+    """
+
+    def __init__(self, bus: MessageBus, worker_id: str = WORKER_ID):
+        self.bus = bus
+        self.worker_id = worker_id
+        self.owner_ttl = Config.REALTIME_OWNER_TTL
+        self._lock = threading.Lock()
+        self._owner_cache: Dict[str, tuple] = {}  # 所有者查询的短期缓存，避免每个音频块都查询 Redis
+        self._renewed_at: Dict[str, float] = {}
+        self.forwarded = 0
+        self.received = 0
+
+    def start(self, handler: Callable[[Dict], None]):
+        """订阅本进程的专属频道"""
+        def on_message(message: Dict):
+            self.received += 1
+            handler(message)
+
+        self.bus.subscribe(_WORKER_CHANNEL.format(self.worker_id), on_message)
+
+    def claim(self, meeting_id: str):
+        """登记本进程为会议的连接所有者"""
+        self.bus.set_owner(meeting_id, self.worker_id, self.owner_ttl)
+        with self._lock:
+            self._owner_cache[meeting_id] = (self.worker_id, time.monotonic())
+            self._renewed_at[meeting_id] = time.monotonic()
+
+    def renew(self, meeting_id: str):
+        """续期所有权（最多每 TTL 的三分之一续期一次）"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._renewed_at.get(meeting_id, 0) < self.owner_ttl / 3:
+                return
+            self._renewed_at[meeting_id] = now
+        self.bus.set_owner(meeting_id, self.worker_id, self.owner_ttl)
+
+    def release(self, meeting_id: str):
+        """释放所有权"""
+        self.bus.release_owner(meeting_id, self.worker_id)
+        with self._lock:
+            self._owner_cache.pop(meeting_id, None)
+            self._renewed_at.pop(meeting_id, None)
+
+    def owner_of(self, meeting_id: str) -> Optional[str]:
+        """查询会议的连接所有者（缓存 1 秒）"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._owner_cache.get(meeting_id)
+            if cached is not None and now - cached[1] < 1.0:
+                return cached[0]
+        owner = self.bus.get_owner(meeting_id)
+        with self._lock:
+            self._owner_cache[meeting_id] = (owner, now)
+        return owner
+
+    def forward(self, meeting_id: str, message: Dict) -> bool:
+        """
+        把上游消息转发给会议的连接所有者进程
+
+        Returns:
+            是否已转发（所有者不存在或就是本进程时返回 False）
+        """
+        owner = self.owner_of(meeting_id)
+        if not owner or owner == self.worker_id:
+            return False
+        self.bus.publish(_WORKER_CHANNEL.format(owner), dict(message, meeting_id=meeting_id))
+        self.forwarded += 1
+        return True
+
+    def stats(self) -> Dict:
+        """路由统计"""
+        with self._lock:
+            owned = [m for m, (owner, _) in self._owner_cache.items() if owner == self.worker_id]
+        return {
+            'worker_id': self.worker_id,
+            'bus': type(self.bus).__name__,
+            'owned_meetings': owned,
+            'forwarded': self.forwarded,
+            'received': self.received,
+        }
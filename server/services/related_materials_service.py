@@ -0,0 +1,444 @@
+"""
+网络资料服务 - 根据对话内容搜索网上资料
+
+流水线：关键词提取（本地 TF-IDF + TextRank，大模型可选回退）-> 搜索（可同时搜索百度和谷歌）
+-> 打标签（本地分类器，大模型可选细化）。
+- 关键词按规范化的对话窗口缓存，同一段讨论重复刷新不再调用大模型；
+- 搜索结果按 (搜索引擎, 查询词) 缓存，带 TTL；
+- 每个搜索引擎的结果一返回就推送，大模型细化的标签完成后再补发。
+"""
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from services.llm_gateway import llm_gateway
+from services.material_tagger import material_tagger, TAG_CANDIDATES, DEFAULT_TAG
+from utils.keyword_extractor import extract_search_keywords
+from utils.ttl_cache import TTLCache
+
+try:
+    from dashscope import Generation
+    DASHSCOPE_AVAILABLE = True
+except ImportError:
+    DASHSCOPE_AVAILABLE = False
+
+try:
+    from serpapi import GoogleSearch, BaiduSearch
+    SERPAPI_AVAILABLE = True
+except ImportError:
+    SERPAPI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 支持的搜索引擎
+SEARCH_ENGINES = ('baidu', 'google')
+
+# 未打标签时的默认标签
+DEFAULT_TAGS = [DEFAULT_TAG]
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _extract_search_keywords(chat_content: str, user_id=None) -> tuple[list[str], str, bool]:
+    """
+    根据对话内容提取搜索关键词。
+
+    默认使用本地关键词提取（TF-IDF + TextRank）；本地提取不足 2 个关键词且允许回退时，
+    或配置为 llm 引擎时，才调用大模型。
+    返回: (用于搜索的关键词列表, 用于展示的关键词, 是否提取成功)
+    大模型调用失败后退回本地结果，或直接截取对话开头时，视为未提取成功（不应缓存）。
+    """
+    local_keywords, local_display = extract_search_keywords(chat_content)
+    use_llm = Config.RELATED_MATERIALS_KEYWORD_ENGINE == 'llm' or (
+        len(local_keywords) < 2 and Config.RELATED_MATERIALS_KEYWORD_LLM_FALLBACK
+    )
+    if not use_llm or not DASHSCOPE_AVAILABLE or not Config.DASHSCOPE_API_KEY:
+        if local_keywords:
+            return local_keywords, local_display, True
+        return [chat_content[:30]], chat_content[:30], False
+
+    result = _extract_search_keywords_with_ai(chat_content, user_id=user_id)
+    if result:
+        return result[0], result[1], True
+    if local_keywords:
+        return local_keywords, local_display, False
+    return [chat_content[:30]], chat_content[:30], False
+
+
+def _extract_search_keywords_with_ai(chat_content: str, user_id=None) -> Optional[Tuple[List[str], str]]:
+    """
+    使用 AI 根据对话内容分析并总结搜索关键词。
+    返回: (用于搜索的关键词列表, 用于展示的 AI 总结关键词)，失败时返回 None
+    """
+
+    prompt = f"""你是一个备课会议助手。请根据以下备课会议对话内容，分析并总结出适合用于网上搜索资料的关键词。
+
+要求：
+1. 理解对话讨论的核心主题（如教学主题、学科概念、教学方法、课程标准等）
+2. 总结为 2-4 个搜索关键词，用顿号「、」连接成一句
+3. 关键词要精炼、便于搜索，例如：「分数教学、教学设计、案例分享」或「初中数学、课程标准、核心素养」
+
+对话内容：
+{chat_content[:1500]}
+
+请直接输出总结后的搜索关键词（一句话，不要其他解释）："""
+
+    try:
+        response = llm_gateway.call(
+            'keywords',
+            Generation.call,
+            user_id=user_id,
+            api_key=Config.DASHSCOPE_API_KEY,
+            model='qwen-turbo',
+            prompt=prompt,
+            max_tokens=80,
+        )
+        if response.status_code == 200:
+            output = response.output or {}
+            text = (output.get('text', '') or '').strip()
+            if not text and isinstance(output, dict):
+                choices = output.get('choices', [])
+                if choices and isinstance(choices[0], dict):
+                    msg = choices[0].get('message', {})
+                    text = (msg.get('content', '') or '').strip()
+            if text:
+                # 解析：AI 可能用顿号、逗号、空格分隔
+                normalized = text.replace('，', '、').replace('；', '、')
+                keywords = [k.strip() for k in normalized.split('、') if k.strip()][:4]
+                if not keywords:
+                    keywords = [text[:30]]
+                display_keyword = text[:60]  # 展示用，限制长度
+                return keywords, display_keyword
+    except Exception as e:
+        logger.warning(f"AI 分析关键词失败: {e}")
+    return None
+
+
+def _search_web(
+    query: str, max_results: int = 6, engine: str = "baidu"
+) -> tuple[list[dict], str | None]:
+    """
+    使用 SerpApi 官方 Python SDK 搜索。
+    engine: "google" | "baidu"
+    返回: (结果列表, 错误信息，成功时为 None)
+    """
+    api_key = (Config.SERPAPI_API_KEY or "").strip()
+    if not api_key:
+        return [], (
+            "请配置 SERPAPI_API_KEY。在 serpapi.com 注册获取，.env 中设置 SERPAPI_API_KEY=你的key"
+        )
+    if not SERPAPI_AVAILABLE:
+        return [], "请安装 SerpApi 依赖: pip install google-search-results"
+
+    use_google = (engine or "baidu").lower() == "google"
+
+    # 为教育备课场景增强搜索词，提高相关性
+    enhanced_query = query
+    if query and "教学" not in query and "教案" not in query and "备课" not in query:
+        enhanced_query = f"{query} 教学 教案"
+
+    if use_google:
+        params = {
+            "engine": "google",
+            "q": enhanced_query,
+            "google_domain": "google.com",
+            "hl": "zh-cn",
+            "gl": "cn",
+            "num": max_results,
+            "api_key": api_key,
+        }
+        SearchClass = GoogleSearch
+    else:
+        params = {
+            "engine": "baidu",
+            "q": enhanced_query,
+            "api_key": api_key,
+        }
+        if max_results:
+            params["rn"] = min(max_results, 50)
+        SearchClass = BaiduSearch
+
+    try:
+        search = SearchClass(params)
+        data = search.get_dict()
+        organic = data.get("organic_results") or data.get("organic") or []
+
+        if not organic and enhanced_query != query:
+            logger.info(f"[网络资料] 增强查询无结果，回退到原始关键词: {query}")
+            params["q"] = query
+            search2 = SearchClass(params)
+            data2 = search2.get_dict()
+            organic = data2.get("organic_results") or data2.get("organic") or []
+
+        if not organic:
+            logger.info(f"[网络资料] SerpApi 返回空结果, engine={engine}, query={enhanced_query}")
+
+        items = []
+        for r in organic[:max_results]:
+            link = r.get("link") or r.get("url", "")
+            if not link:
+                continue
+            items.append({
+                "title": r.get("title", ""),
+                "url": link,
+                "snippet": r.get("snippet", ""),
+            })
+        return items, None
+    except Exception as e:
+        err_str = str(e)
+        logger.warning(f"[网络资料] SerpApi 搜索失败 (engine={engine}): {e}")
+        if "403" in err_str or "Invalid API key" in err_str.lower():
+            return [], (
+                "搜索服务返回 403：API Key 无效或额度已用尽。"
+                "请到 serpapi.com 检查 Key 和用量，更新 .env 中的 SERPAPI_API_KEY"
+            )
+        return [], f"搜索失败: {err_str[:80]}"
+
+
+def _add_tags_with_ai(items: list[dict], chat_context: str, user_id=None) -> list[dict]:
+    """使用 AI 为每条结果打上业务相关标签"""
+    if not items or not DASHSCOPE_AVAILABLE or not Config.DASHSCOPE_API_KEY:
+        for item in items:
+            item.setdefault('tags', ['网络资料'])
+        return items
+
+    prompt = f"""根据备课会议对话背景，为以下每条网上资料打 1-2 个标签。
+标签从以下候选中选择：{', '.join(TAG_CANDIDATES)}
+若都不合适，可自拟一个简短标签（2-4字）。
+
+对话背景摘要：{chat_context[:300]}
+
+资料列表（每行格式：标题 | 摘要）：
+"""
+    for i, item in enumerate(items[:8], 1):
+        prompt += f"\n{i}. {item.get('title', '')} | {item.get('snippet', '')[:80]}"
+
+    prompt += """
+
+请输出 JSON 数组，每项对应一条资料的标签数组，如：["教学策略","案例分享"]
+只输出 JSON，不要其他内容。"""
+
+    try:
+        response = llm_gateway.call(
+            'tagging',
+            Generation.call,
+            user_id=user_id,
+            api_key=Config.DASHSCOPE_API_KEY,
+            model='qwen-turbo',
+            prompt=prompt,
+            max_tokens=200,
+        )
+        if response.status_code == 200:
+            output = response.output or {}
+            text = (output.get('text', '') or '').strip()
+            if not text and isinstance(output, dict):
+                choices = output.get('choices', [])
+                if choices and isinstance(choices[0], dict):
+                    msg = choices[0].get('message', {})
+                    text = (msg.get('content', '') or '').strip()
+            # 尝试解析 JSON
+            text = text.replace('```json', '').replace('```', '').strip()
+            parsed = json.loads(text)
+            if isinstance(parsed, list):
+                for i, item in enumerate(items):
+                    if i < len(parsed) and isinstance(parsed[i], list):
+                        item['tags'] = parsed[i][:2]
+                    else:
+                        item['tags'] = ['网络资料']
+            else:
+                for item in items:
+                    item.setdefault('tags', ['网络资料'])
+        else:
+            for item in items:
+                item.setdefault('tags', ['网络资料'])
+    except Exception as e:
+        logger.warning(f"AI 打标签失败: {e}")
+        for item in items:
+            item.setdefault('tags', ['网络资料'])
+    return items
+
+
+def build_chat_window(messages: List[Dict], max_messages: int = 10) -> str:
+    """合并最近的对话内容为文本窗口"""
+    chat_parts = []
+    for m in messages[-max_messages:]:
+        if not isinstance(m, dict):
+            continue
+        content = (m.get('content') or '').strip()
+        if content:
+            role = m.get('role', 'user')
+            prefix = '用户' if role == 'user' else 'AI'
+            chat_parts.append(f"{prefix}: {content}")
+    return '\n'.join(chat_parts)
+
+
+def _window_key(chat_content: str) -> str:
+    """规范化对话窗口（全角转半角、合并空白）后计算缓存键"""
+    normalized = _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', chat_content)).strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def _build_query(keywords: List[str], chat_content: str) -> str:
+    """由关键词组合搜索词（优先用多关键词组合，提高召回率）"""
+    query = ' '.join(keywords[:2]) if len(keywords) >= 2 else (keywords[0] if keywords else chat_content[:50])
+    return (query or '').strip()
+
+
+def format_item(item: Dict) -> Dict:
+    """格式化返回给前端的资料条目"""
+    return {
+        'title': item.get('title', ''),
+        'url': item.get('url', ''),
+        'snippet': (item.get('snippet', '') or '')[:120],
+        'tags': item.get('tags', DEFAULT_TAGS),
+    }
+
+
+class RelatedMaterialsService:
+    """网络资料搜索流水线"""
+
+    def __init__(self):
+        self.keyword_cache = TTLCache(max_entries=512, ttl=Config.RELATED_MATERIALS_KEYWORD_TTL)
+        self.search_cache = TTLCache(max_entries=512, ttl=Config.RELATED_MATERIALS_SEARCH_TTL)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='related-materials')
+
+    def get_keywords(self, chat_content: str, user_id=None) -> Tuple[List[str], str]:
+        """提取搜索关键词（按规范化的对话窗口缓存，只缓存提取成功的结果）"""
+        key = _window_key(chat_content)
+        cached = self.keyword_cache.get(key)
+        if cached is not None:
+            logger.info(f"[网络资料] 关键词命中缓存: {cached[1]}")
+            return cached
+        keywords, display_keyword, extracted = _extract_search_keywords(chat_content, user_id=user_id)
+        result = (keywords, display_keyword)
+        if extracted:
+            self.keyword_cache.put(key, result)
+        return result
+
+    def search_engine(self, engine: str, query: str, max_results: int = 6) -> Tuple[List[Dict], Optional[str]]:
+        """单个搜索引擎搜索（成功的结果按 (搜索引擎, 查询词) 缓存）"""
+        key = (engine, query, max_results)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            logger.info(f"[网络资料] 搜索结果命中缓存 - engine: {engine}, query: {query}")
+            return [dict(item) for item in cached], None
+        items, error = _search_web(query, max_results=max_results, engine=engine)
+        if not error:
+            self.search_cache.put(key, [dict(item) for item in items])
+        return items, error
+
+    def run(self, messages: List[Dict], engine: str = 'baidu', user_id=None,
+            max_results: int = 6) -> Iterator[Dict]:
+        """
+        执行搜索流水线，逐步产出事件
+
+        事件类型：
+        - keyword: {'type': 'keyword', 'keyword': 展示用关键词}
+        - results: {'type': 'results', 'engine': 搜索引擎, 'data': [条目（本地分类标签）]}
+        - tags: {'type': 'tags', 'data': [{'url', 'tags'}]}（启用大模型细化时）
+        - error: {'type': 'error', 'message': 错误信息}
+
+        Args:
+            messages: OpenAI 风格的消息数组
+            engine: baidu | google | both
+            user_id: 用户ID
+            max_results: 每个搜索引擎的结果数量
+        """
+        chat_content = build_chat_window(messages)
+        if not chat_content.strip():
+            yield {'type': 'keyword', 'keyword': '', 'message': '对话内容为空'}
+            return
+
+        # 1. 关键词
+        keywords, display_keyword = self.get_keywords(chat_content, user_id=user_id)
+        logger.info(f"[网络资料] 总结关键词: {display_keyword}, 用于搜索: {keywords}")
+        yield {'type': 'keyword', 'keyword': display_keyword}
+
+        query = _build_query(keywords, chat_content)
+        if not query:
+            return
+
+        # 2. 各搜索引擎并发搜索，谁先返回先推送；3. 每批结果单独打标签
+        engines = list(SEARCH_ENGINES) if engine == 'both' else [engine]
+        pending = {
+            self._executor.submit(self.search_engine, name, query, max_results): ('search', name)
+            for name in engines
+        }
+        seen_urls = set()
+        errors = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, name = pending.pop(future)
+                if kind == 'search':
+                    items, error = future.result()
+                    if error:
+                        errors.append(error)
+                        continue
+                    # 合并多个搜索引擎时按 URL 去重
+                    items = [it for it in items if it.get('url') not in seen_urls]
+                    seen_urls.update(it.get('url') for it in items)
+                    if not items:
+                        continue
+                    # 本地分类器直接给出标签，随结果一起推送
+                    material_tagger.tag(items)
+                    yield {'type': 'results', 'engine': name, 'data': [format_item(it) for it in items]}
+                    # 可选：本地未能分类的条目再交给大模型细化
+                    uncertain = [it for it in items if it['tags'] == [DEFAULT_TAG]]
+                    if uncertain and Config.RELATED_MATERIALS_TAG_LLM_REFINE:
+                        tag_future = self._executor.submit(_add_tags_with_ai, uncertain, chat_content, user_id)
+                        pending[tag_future] = ('tags', name)
+                else:
+                    try:
+                        tagged = future.result()
+                    except Exception as e:
+                        logger.warning(f"[网络资料] 打标签失败 (engine={name}): {e}")
+                        continue
+                    yield {
+                        'type': 'tags',
+                        'engine': name,
+                        'data': [{'url': it.get('url', ''), 'tags': it.get('tags', DEFAULT_TAGS)} for it in tagged],
+                    }
+
+        # 所有搜索引擎都失败时才报错
+        if errors and len(errors) == len(engines):
+            yield {'type': 'error', 'message': errors[0]}
+
+    def search(self, messages: List[Dict], engine: str = 'baidu', user_id=None) -> Dict:
+        """
+        执行完整流水线并汇总结果（非流式接口使用）
+
+        Returns:
+            {'success', 'keyword', 'data', 'message'?}
+        """
+        keyword = ''
+        items: List[Dict] = []
+        tags_by_url: Dict[str, List[str]] = {}
+        for event in self.run(messages, engine=engine, user_id=user_id):
+            if event['type'] == 'keyword':
+                keyword = event['keyword']
+                if event.get('message'):
+                    return {'success': True, 'keyword': '', 'data': [], 'message': event['message']}
+            elif event['type'] == 'results':
+                items.extend(event['data'])
+            elif event['type'] == 'tags':
+                tags_by_url.update({entry['url']: entry['tags'] for entry in event['data']})
+            elif event['type'] == 'error':
+                return {'success': False, 'message': event['message'], 'keyword': keyword, 'data': []}
+
+        for item in items:
+            item['tags'] = tags_by_url.get(item['url'], item['tags'])
+        return {'success': True, 'keyword': keyword, 'data': items}
+
+    def stats(self) -> Dict:
+        """缓存统计信息"""
+        return {'keywords': self.keyword_cache.stats(), 'search': self.search_cache.stats()}
+
+
+# 全局网络资料服务
+related_materials_service = RelatedMaterialsService()
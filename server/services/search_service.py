@@ -0,0 +1,377 @@
+"""
+会议全文检索服务
+
+把会议的转写记录（按发言合并切片）、备课资料（摘要 + 解析内容）和会议总结切分为片段，
+写入 search_entries 表并增量维护：重新索引时只更新内容哈希变化的片段，
+转写记录追加消息时通常只有最后一个片段变化。
+
+检索时 MySQL 使用 ngram 全文索引（MATCH ... AGAINST，中文无需分词）；
+其他数据库或全文索引不可用时回退到当前用户片段上的 LIKE 匹配，在内存中按词频排序。
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import desc
+from sqlalchemy.exc import DBAPIError
+
+from config import Config
+from database import db
+from models.document import Document
+from models.meeting import Meeting
+from models.search_entry import SearchEntry
+from models.transcript import Transcript
+from services.document_retrieval import chunk_text
+from utils.datetime_utils import beijing_now
+
+logger = logging.getLogger(__name__)
+
+# 检索来源
+SOURCE_TYPES = ('transcript', 'document', 'summary')
+
+# 查询词数量上限
+MAX_TERMS = 8
+
+# LIKE 回退时最多取出参与排序的片段数
+LIKE_CANDIDATES = 500
+
+# 新增片段批量插入时每批的行数
+INSERT_BATCH = 200
+
+# MySQL 错误码：找不到与列匹配的全文索引
+NO_FULLTEXT_INDEX_ERROR = 1191
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def query_terms(query: str) -> List[str]:
+    """把查询按空白拆分为检索词（去重，去掉全文检索的运算符）"""
+    terms = []
+    for word in (query or '').split():
+        word = word.strip('+-<>()~*"@\'')
+        if word and word not in terms:
+            terms.append(word[:50])
+    return terms[:MAX_TERMS]
+
+
+def transcript_lines(text: str) -> List[str]:
+    """转写文本（JSONL，每行一条消息；旧数据为纯文本）-> 「发言人：内容」行"""
+    lines = []
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = line
+        if isinstance(message, dict):
+            content = str(message.get('content') or '').strip()
+            if content:
+                lines.append(f"{message['name']}：{content}" if message.get('name') else content)
+        else:
+            lines.append(line)
+    return lines
+
+
+def summary_lines(summary: Optional[Dict]) -> List[str]:
+    """会议总结 -> 文本行"""
+    if not summary:
+        return []
+    lines = []
+    if summary.get('paragraph_summary') or summary.get('summary'):
+        lines.append(summary.get('paragraph_summary') or summary.get('summary'))
+    for speaker in summary.get('conversational_summary') or []:
+        if speaker.get('Summary'):
+            name = speaker.get('SpeakerName') or speaker.get('SpeakerId') or ''
+            lines.append(f"{name}：{speaker['Summary']}" if name else speaker['Summary'])
+    for qa in summary.get('questions_answering_summary') or []:
+        lines.append(f"问：{qa.get('Question') or ''}\n答：{qa.get('Answer') or ''}")
+    assistance = summary.get('meeting_assistance') or {}
+    if assistance.get('keywords'):
+        lines.append('关键词：' + '、'.join(assistance['keywords']))
+    for item in (assistance.get('key_sentences') or []) + (assistance.get('actions') or []):
+        text = item.get('Text', '') if isinstance(item, dict) else str(item)
+        if text:
+            lines.append(text)
+    return lines
+
+
+def snippet(content: str, terms: List[str], width: int = 120) -> Dict:
+    """
+    截取包含检索词的片段
+
+    Returns:
+        {'text': 片段文本, 'highlights': [[起始, 结束], ...]}（偏移量相对片段文本）
+    """
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    text = content[start:start + width]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(content) else ''
+
+    highlights = []
+    lowered_text = text.lower()
+    for term in terms:
+        term_lower = term.lower()
+        index = lowered_text.find(term_lower)
+        while index >= 0:
+            highlights.append([index + len(prefix), index + len(prefix) + len(term)])
+            index = lowered_text.find(term_lower, index + len(term))
+    return {'text': f"{prefix}{text}{suffix}", 'highlights': sorted(highlights)}
+
+
+class SearchService:
+    """会议全文检索服务"""
+
+    def __init__(self, segment_chars: Optional[int] = None, index_delay: Optional[float] = None):
+        """
+        Args:
+            segment_chars: 片段最大字符数
+            index_delay: 转写记录、备课资料更新后延迟索引的时间（秒，期间的多次更新合并为一次）
+        """
+        self.segment_chars = segment_chars or Config.SEARCH_SEGMENT_CHARS
+        self.index_delay = Config.SEARCH_INDEX_DELAY if index_delay is None else index_delay
+        self._fulltext_failed = False
+        self._timers: Dict[tuple, threading.Timer] = {}  # (索引函数名, 会议ID/文档ID) -> 定时器
+        self._lock = threading.Lock()
+
+    # ---------- 索引维护 ----------
+
+    def _sync(self, meeting: Meeting, source_type: str, source_id, title: Optional[str], texts: List[str]) -> int:
+        """
+        增量同步一个来源的片段（不提交事务）
+
+        Returns:
+            新增、更新和删除的片段数
+        """
+        segments = chunk_text('\n'.join(texts), self.segment_chars)
+        existing = SearchEntry.query.filter_by(source_type=source_type, source_id=str(source_id)).order_by(
+            SearchEntry.seq.asc()
+        ).all()
+
+        changed = 0
+        now = beijing_now()
+        new_rows = []
+        for seq, content in enumerate(segments):
+            digest = _digest(content)
+            if seq < len(existing):
+                entry = existing[seq]
+                if entry.digest == digest and entry.title == title:
+                    continue
+                entry.content, entry.digest, entry.title = content, digest, title
+            else:
+                new_rows.append({
+                    'meeting_id': meeting.id, 'user_id': meeting.user_id, 'source_type': source_type,
+                    'source_id': str(source_id), 'seq': seq, 'title': title, 'content': content,
+                    'digest': digest, 'created_at': now, 'updated_at': now,
+                })
+            changed += 1
+        for entry in existing[len(segments):]:
+            db.session.delete(entry)
+            changed += 1
+        # 新增片段（首次索引的大文档可能有上千个）按批 executemany 插入，MySQL 驱动合并为多行 INSERT
+        for start in range(0, len(new_rows), INSERT_BATCH):
+            db.session.execute(SearchEntry.__table__.insert(), new_rows[start:start + INSERT_BATCH])
+        return changed
+
+    def index_transcripts(self, meeting_id: str) -> int:
+        """索引会议的转写记录（已归档的会议保留原有片段）"""
+        meeting = Meeting.query.get(meeting_id)
+        if not meeting or meeting.archived_at:
+            return 0
+        rows = db.session.query(Transcript.id, Transcript.text).filter_by(meeting_id=meeting_id).all()
+        changed = sum(self._sync(meeting, 'transcript', row.id, None, transcript_lines(row.text)) for row in rows)
+        db.session.commit()
+        return changed
+
+    def index_summary(self, meeting_id: str) -> int:
+        """索引会议总结（最新转写记录上的总结）"""
+        meeting = Meeting.query.get(meeting_id)
+        if not meeting:
+            return 0
+        transcript = Transcript.query.filter_by(meeting_id=meeting_id).order_by(Transcript.created_at.desc()).first()
+        summary = transcript.summary_dict if transcript else None
+        changed = self._sync(meeting, 'summary', meeting_id, '会议总结', summary_lines(summary))
+        db.session.commit()
+        return changed
+
+    def index_document(self, document_id: int) -> int:
+        """索引备课资料（摘要 + 解析内容；已归档的会议保留原有片段）"""
+        document = Document.query.get(document_id)
+        if not document:
+            return 0
+        meeting = Meeting.query.get(document.meeting_id)
+        if not meeting or meeting.archived_at:
+            return 0
+        texts = [text for text in (document.summary, document.parsed_content) if text]
+        changed = self._sync(meeting, 'document', document.id, document.original_filename, texts)
+        db.session.commit()
+        return changed
+
+    def index_meeting(self, meeting_id: str) -> int:
+        """索引会议的全部内容（用于重建索引）"""
+        changed = self.index_transcripts(meeting_id) + self.index_summary(meeting_id)
+        document_ids = [row.id for row in db.session.query(Document.id).filter_by(meeting_id=meeting_id).all()]
+        return changed + sum(self.index_document(document_id) for document_id in document_ids)
+
+    def schedule_transcripts(self, meeting_id: str):
+        """转写记录更新后延迟索引（实时转写期间每条消息都会触发，合并为一次）"""
+        self._schedule(self.index_transcripts, meeting_id)
+
+    def schedule_document(self, document_id: int):
+        """备课资料解析完成后在后台延迟索引（不占用上传/解析请求的时间）"""
+        self._schedule(self.index_document, document_id)
+
+    def _schedule(self, func, target):
+        if self.index_delay <= 0:
+            self._safe(func, target)
+            return
+        app = current_app._get_current_object()
+        key = (func.__name__, target)
+        with self._lock:
+            if key in self._timers:
+                return
+            timer = threading.Timer(self.index_delay, self._run_scheduled, args=(app, func, target))
+            timer.daemon = True
+            self._timers[key] = timer
+        timer.start()
+
+    def _run_scheduled(self, app, func, target):
+        with self._lock:
+            self._timers.pop((func.__name__, target), None)
+        with app.app_context():
+            self._safe(func, target)
+            db.session.remove()
+
+    @staticmethod
+    def _safe(func, *args) -> int:
+        """索引失败不影响业务流程"""
+        try:
+            return func(*args)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"[全文检索] 更新索引失败: {func.__name__}{args}, 错误: {str(e)}")
+            return 0
+
+    @staticmethod
+    def remove_meeting(meeting_id: str):
+        """删除会议的检索条目（不提交事务，随调用方一起提交）"""
+        SearchEntry.query.filter_by(meeting_id=meeting_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def remove_document(document_id: int):
+        """删除备课资料的检索条目（不提交事务，随调用方一起提交）"""
+        SearchEntry.query.filter_by(source_type='document', source_id=str(document_id)).delete(
+            synchronize_session=False
+        )
+
+    # ---------- 检索 ----------
+
+    def _fulltext_enabled(self) -> bool:
+        return not self._fulltext_failed and db.engine.dialect.name == 'mysql'
+
+    def search(self, user_id: int, query: str, subject: Optional[str] = None, grade: Optional[str] = None,
+               source_type: Optional[str] = None, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        检索当前用户的会议内容
+
+        Args:
+            user_id: 用户ID
+            query: 查询（空白分隔的多个词需同时出现）
+            subject: 学科筛选
+            grade: 年级筛选
+            source_type: 来源筛选（transcript、document、summary）
+            limit: 返回条数
+            offset: 偏移量
+
+        Returns:
+            {'items': [...], 'has_more': bool, 'engine': 'fulltext' | 'like'}
+        """
+        terms = query_terms(query)
+        if not terms:
+            return {'items': [], 'has_more': False, 'engine': None}
+
+        base = db.session.query(SearchEntry, Meeting.name, Meeting.subject, Meeting.grade, Meeting.created_at).join(
+            Meeting, Meeting.id == SearchEntry.meeting_id
+        ).filter(SearchEntry.user_id == user_id)
+        if subject:
+            base = base.filter(Meeting.subject == subject)
+        if grade:
+            base = base.filter(Meeting.grade == grade)
+        if source_type:
+            base = base.filter(SearchEntry.source_type == source_type)
+
+        if self._fulltext_enabled():
+            try:
+                rows = self._search_fulltext(base, terms, limit + 1, offset)
+                return self._build_result(rows, terms, limit, 'fulltext')
+            except DBAPIError as e:
+                db.session.rollback()
+                code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+                if code != NO_FULLTEXT_INDEX_ERROR:
+                    raise
+                # 全文索引缺失（如旧表未重建）时回退到 LIKE，不再重试
+                self._fulltext_failed = True
+                logger.warning(f"[全文检索] 全文索引不可用，回退到 LIKE 匹配: {str(e)}")
+
+        rows = self._search_like(base, terms, limit + 1, offset)
+        return self._build_result(rows, terms, limit, 'like')
+
+    @staticmethod
+    def _search_fulltext(base, terms: List[str], limit: int, offset: int) -> List:
+        from sqlalchemy.dialects.mysql import match
+
+        # 布尔模式：每个词作为短语必须出现
+        against = ' '.join('+"{}"'.format(term.replace('"', '')) for term in terms)
+        score = match(SearchEntry.content, against=against).in_boolean_mode()
+        rows = base.add_columns(score.label('score')).filter(score > 0).order_by(
+            desc('score'), SearchEntry.id.desc()
+        ).limit(limit).offset(offset).all()
+        return [(row[:5], float(row.score)) for row in rows]
+
+    @staticmethod
+    def _search_like(base, terms: List[str], limit: int, offset: int) -> List:
+        query = base
+        for term in terms:
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(SearchEntry.content.like(f'%{escaped}%', escape='\\'))
+        candidates = query.order_by(SearchEntry.id.desc()).limit(LIKE_CANDIDATES).all()
+
+        # 词频按片段长度归一化
+        scored = []
+        for row in candidates:
+            content = row[0].content.lower()
+            frequency = sum(content.count(term.lower()) for term in terms)
+            scored.append((row[:5], frequency / (1 + len(content) / 300)))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[offset:offset + limit]
+
+    @staticmethod
+    def _build_result(rows: List, terms: List[str], limit: int, engine: str) -> Dict:
+        items = []
+        for (entry, meeting_name, subject, grade, created_at), score in rows[:limit]:
+            items.append({
+                'meeting_id': entry.meeting_id,
+                'meeting_name': meeting_name,
+                'subject': subject,
+                'grade': grade,
+                'meeting_created_at': created_at.isoformat() if created_at else None,
+                'source_type': entry.source_type,
+                'source_id': entry.source_id,
+                'title': entry.title,
+                'snippet': snippet(entry.content, terms),
+                'score': round(score, 4),
+            })
+        return {'items': items, 'has_more': len(rows) > limit, 'engine': engine}
+
+
+# 全局检索服务
+search_service = SearchService()
@@ -0,0 +1,145 @@
+"""
+实时转写会话录制
+
+配置 REALTIME_RECORD_DIR 后，每次 start_recognition 都会把该会议的
+上行音频帧和通义听悟返回的消息连同相对时间戳写入一个紧凑的二进制文件，
+供 scripts/fake_tingwu_server.py 和 scripts/realtime_load_test.py 回放，
+在没有通义听悟账号和真实麦克风的情况下对实时转写链路做压测。
+
+文件格式（小端）：
+    MAGIC
+    记录: kind(uint8) offset_ms(uint32) length(uint32) payload
+kind:
+    0 元数据（JSON，如 {"meeting_id", "format", "sample_rate"}）
+    1 上行音频帧（原始字节）
+    2 通义听悟消息（JSON）
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RTREC1\n'
+RECORD_META = 0
+RECORD_AUDIO = 1
+RECORD_MESSAGE = 2
+
+_HEADER = struct.Struct('<BII')
+
+
+class SessionRecorder:
+    """单个会话的录制文件"""
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.records = 0
+        self.write(RECORD_META, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def write(self, kind: int, payload: bytes):
+        offset_ms = int((time.monotonic() - self._started) * 1000)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_HEADER.pack(kind, offset_ms, len(payload)))
+            self._file.write(payload)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SessionRecorderManager:
+    """按会议管理录制（未配置 REALTIME_RECORD_DIR 时所有方法都是空操作）"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else Config.REALTIME_RECORD_DIR
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionRecorder] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def start(self, meeting_id: str, **meta):
+        """开始录制会议（已有录制时先结束旧文件）"""
+        if not self.enabled:
+            return
+        self.stop(meeting_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # 会议ID来自客户端，清理后再用作文件名（避免 ../ 或 / 写到录制目录之外）
+            filename = f"{secure_filename(meeting_id) or 'meeting'}-{time.strftime('%Y%m%d-%H%M%S')}.rtrec"
+            recorder = SessionRecorder(os.path.join(self.directory, filename), dict(meta, meeting_id=meeting_id))
+        except OSError as e:
+            logger.error(f"[会话录制] 创建录制文件失败，会议ID: {meeting_id}, 错误: {str(e)}")
+            return
+        with self._lock:
+            self._sessions[meeting_id] = recorder
+        logger.info(f"[会话录制] 开始录制，会议ID: {meeting_id}, 文件: {recorder.path}")
+
+    def _get(self, meeting_id: str) -> Optional[SessionRecorder]:
+        if not self._sessions:
+            return None
+        with self._lock:
+            return self._sessions.get(meeting_id)
+
+    def record_audio(self, meeting_id: str, audio: bytes):
+        recorder = self._get(meeting_id)
+        if recorder is not None:
+            recorder.write(RECORD_AUDIO, audio)
+
+    def record_message(self, meeting_id: str, message: Dict):
+        recorder = self._get(meeting_id)
+        if recorder is not None:
+            recorder.write(RECORD_MESSAGE, json.dumps(message, ensure_ascii=False).encode('utf-8'))
+
+    def stop(self, meeting_id: str):
+        with self._lock:
+            recorder = self._sessions.pop(meeting_id, None)
+        if recorder is not None:
+            recorder.close()
+            logger.info(f"[会话录制] 结束录制，会议ID: {meeting_id}, 记录数: {recorder.records}")
+
+
+def read_session(path: str) -> Iterator[Tuple[int, int, object]]:
+    """
+    读取录制文件
+
+    Yields:
+        (kind, offset_ms, payload)：元数据和消息的 payload 为解析后的字典，音频为字节
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是实时转写录制文件: {path}")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, offset_ms, length = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # 录制中断导致的不完整记录
+            if kind in (RECORD_META, RECORD_MESSAGE):
+                yield kind, offset_ms, json.loads(payload.decode('utf-8'))
+            else:
+                yield kind, offset_ms, payload
+
+
+# 全局会话录制管理器
+session_recorder = SessionRecorderManager()
@@ -0,0 +1,209 @@
+"""
+会议总结 Word 文档的模板写入器
+
+版式与 MeetingDocumentService 中基于 python-docx 的构建方式一致（标题、会议基本信息、
+全文摘要、发言总结、问答回顾、要点提炼、思维导图大纲），但段落直接以 WordprocessingML 流式写入
+预设样式的骨架 docx，不再逐段调用 add_paragraph/add_run 并逐个设置字体，
+几百条关键句和问答的总结也能很快生成。
+
+骨架由 python-docx 的默认模板加上 Normal 样式设置生成一次后缓存在内存中。
+"""
+import io
+import logging
+import threading
+from typing import BinaryIO, Callable, Dict, Optional
+
+from services.mind_map_renderer import iter_outline
+from utils.datetime_formatter import format_datetime_to_beijing
+from utils.docx_stream_writer import DocxStreamWriter, DocxTemplate, inches, points, run
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入docx库（生成骨架）
+try:
+    from docx import Document as DocxDocument
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+# 颜色（与 python-docx 构建方式一致）
+COLOR_TITLE = '000000'
+COLOR_SECTION = '003366'
+COLOR_SPEAKER = '336699'
+COLOR_QUESTION = '990000'
+COLOR_ANSWER = '006633'
+COLOR_KEY_POINT = '663399'
+COLOR_ACTION = 'CC6600'
+
+
+class SummaryDocxWriter:
+    """会议总结 Word 文档模板写入器"""
+
+    def __init__(self, setup_style: Optional[Callable] = None):
+        """
+        Args:
+            setup_style: 骨架的样式设置函数（接收 python-docx 文档对象）
+        """
+        self.setup_style = setup_style
+        self._template: Optional[DocxTemplate] = None
+        self._lock = threading.Lock()
+
+    @property
+    def template(self) -> DocxTemplate:
+        """预设样式的骨架（首次使用时生成）"""
+        if self._template is None:
+            with self._lock:
+                if self._template is None:
+                    if not DOCX_AVAILABLE:
+                        raise ValueError("python-docx 未安装，无法生成Word文档")
+                    doc = DocxDocument()
+                    if self.setup_style:
+                        self.setup_style(doc)
+                    skeleton = io.BytesIO()
+                    doc.save(skeleton)
+                    self._template = DocxTemplate(skeleton.getvalue())
+        return self._template
+
+    def write(self, fileobj: BinaryIO, meeting: Dict, summary_data: Dict) -> int:
+        """
+        写入会议总结文档
+
+        Args:
+            fileobj: 可写的二进制文件对象
+            meeting: 会议信息（name、subject、grade、lesson_type、created_at、teachers）
+            summary_data: 会议总结
+
+        Returns:
+            段落数
+        """
+        with DocxStreamWriter(self.template, fileobj) as writer:
+            self._write_title(writer, meeting.get('name') or '会议总结')
+            self._write_basic_info(writer, meeting)
+            self._write_full_summary(writer, summary_data)
+            self._write_speaker_summary(writer, summary_data)
+            self._write_qa_summary(writer, summary_data)
+            self._write_key_points(writer, summary_data)
+            self._write_mind_map(writer, summary_data)
+        return writer.paragraphs
+
+    @staticmethod
+    def _write_title(writer: DocxStreamWriter, title: str):
+        writer.paragraph(
+            [run(title, size=22, bold=True, color=COLOR_TITLE)],
+            style='Title', align='center', after=points(12)
+        )
+
+    @staticmethod
+    def _write_section_title(writer: DocxStreamWriter, title: str):
+        writer.paragraph([run(title, size=14, bold=True, color=COLOR_SECTION)], before=points(6), after=points(6))
+
+    def _write_basic_info(self, writer: DocxStreamWriter, meeting: Dict):
+        writer.empty()
+        self._write_section_title(writer, '会议基本信息')
+
+        info_items = []
+        if meeting.get('subject'):
+            info_items.append(f"学科：{meeting['subject']}")
+        if meeting.get('grade'):
+            info_items.append(f"年级：{meeting['grade']}")
+        if meeting.get('lesson_type'):
+            info_items.append(f"备课类型：{meeting['lesson_type']}")
+        if meeting.get('created_at'):
+            info_items.append(f"创建时间：{format_datetime_to_beijing(meeting['created_at'])}")
+        if meeting.get('teachers'):
+            teacher_names = [t.get('name', '') for t in meeting['teachers'] if t.get('name')]
+            if teacher_names:
+                info_items.append(f"参会人员：{', '.join(teacher_names)}")
+
+        for item in info_items:
+            writer.paragraph([run(item, size=11)], left=inches(0.3), after=points(3))
+        writer.empty()
+
+    def _write_full_summary(self, writer: DocxStreamWriter, summary_data: Dict):
+        summary_text = summary_data.get('paragraph_summary') or summary_data.get('summary')
+        if not summary_text:
+            return
+        self._write_section_title(writer, '一、全文摘要')
+        writer.paragraph([run(summary_text)], left=inches(0.3), first_line=inches(0.3), line=1.75, after=points(12))
+        writer.empty()
+
+    def _write_speaker_summary(self, writer: DocxStreamWriter, summary_data: Dict):
+        conversational_summary = summary_data.get('conversational_summary', [])
+        if not conversational_summary:
+            return
+        self._write_section_title(writer, '二、发言总结')
+
+        for idx, speaker in enumerate(conversational_summary, 1):
+            speaker_name = speaker.get('SpeakerName') or speaker.get('SpeakerId') or f'发言人{idx}'
+            writer.paragraph(
+                [run(f"{idx}. {speaker_name}", size=12, bold=True, color=COLOR_SPEAKER)],
+                left=inches(0.2), before=points(6)
+            )
+            if speaker.get('Summary'):
+                writer.paragraph([run(speaker['Summary'])], left=inches(0.5), first_line=inches(0.2),
+                                 line=1.6, after=points(6))
+        writer.empty()
+
+    def _write_qa_summary(self, writer: DocxStreamWriter, summary_data: Dict):
+        qa_summary = summary_data.get('questions_answering_summary', [])
+        if not qa_summary:
+            return
+        self._write_section_title(writer, '三、问答回顾')
+
+        for idx, qa in enumerate(qa_summary, 1):
+            writer.paragraph([run(f"{idx}. 问题：", size=12, bold=True, color=COLOR_QUESTION)],
+                             left=inches(0.2), before=points(6))
+            if qa.get('Question'):
+                writer.paragraph([run(qa['Question'])], left=inches(0.5), first_line=inches(0.2), line=1.6)
+            writer.paragraph([run("   回答：", size=12, bold=True, color=COLOR_ANSWER)],
+                             left=inches(0.2), before=points(3))
+            if qa.get('Answer'):
+                writer.paragraph([run(qa['Answer'])], left=inches(0.5), first_line=inches(0.2),
+                                 line=1.6, after=points(6))
+        writer.empty()
+
+    def _write_numbered(self, writer: DocxStreamWriter, items):
+        for idx, item in enumerate(items, 1):
+            text = item.get('Text', '') if isinstance(item, dict) else str(item)
+            if text:
+                writer.paragraph([run(f"{idx}. {text}")], left=inches(0.5), first_line=inches(-0.2),
+                                 line=1.6, after=points(3))
+
+    def _write_key_points(self, writer: DocxStreamWriter, summary_data: Dict):
+        assistance = summary_data.get('meeting_assistance')
+        if not assistance:
+            return
+        self._write_section_title(writer, '四、要点提炼')
+
+        keywords = assistance.get('keywords', [])
+        if keywords:
+            writer.paragraph(
+                [run('关键词：', size=12, bold=True, color=COLOR_KEY_POINT), run('、'.join(keywords), size=11)],
+                left=inches(0.2), before=points(3), after=points(6)
+            )
+
+        key_sentences = assistance.get('key_sentences', [])
+        if key_sentences:
+            writer.paragraph([run('关键句：', size=12, bold=True, color=COLOR_KEY_POINT)],
+                             left=inches(0.2), before=points(6))
+            self._write_numbered(writer, key_sentences)
+
+        actions = assistance.get('actions', [])
+        if actions:
+            writer.paragraph([run('待办事项：', size=12, bold=True, color=COLOR_ACTION)],
+                             left=inches(0.2), before=points(6))
+            self._write_numbered(writer, actions)
+        writer.empty()
+
+    def _write_mind_map(self, writer: DocxStreamWriter, summary_data: Dict):
+        mind_map = summary_data.get('mind_map_summary')
+        if not mind_map:
+            return
+        self._write_section_title(writer, '五、思维导图')
+        for depth, title in iter_outline(mind_map):
+            writer.paragraph(
+                [run(title if depth == 0 else f"• {title}", size=12 if depth == 0 else 11, bold=depth == 0,
+                     color=COLOR_SECTION if depth <= 1 else None)],
+                left=inches(0.3 + 0.3 * depth), after=points(3)
+            )
+        writer.empty()
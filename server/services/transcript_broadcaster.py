@@ -0,0 +1,205 @@
+"""
+实时转写广播
+
+通义听悟每秒会推送多次中间结果（TranscriptionResultChanged），房间内观察者较多时，
+逐条广播会同时压垮客户端和服务端的 emit 路径。这里按会议房间做合并：
+- 中间结果：每个合并帧（默认 100ms）最多推送一次，帧内只推送最新结果；
+- 最终结果（SentenceEnd）：立即推送完整文本，并丢弃尚未推送的中间结果；
+- 中间结果尽量只推送增量（与上次推送文本的公共前缀长度 + 新增部分），
+  每句的第一条和每隔若干条推送一次完整文本（关键帧），方便中途加入的客户端对齐。
+
+transcript_update 事件负载：
+- 完整文本：{meeting_id, sentence, is_final, timestamp, text}
+- 增量：{meeting_id, sentence, is_final: false, timestamp, base, delta}
+  客户端文本 = 当前句文本[:base] + delta
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 发送速率统计窗口（秒）
+RATE_WINDOW = 10.0
+
+
+class _RoomState:
+    """单个会议房间的广播状态"""
+
+    def __init__(self, meeting_id: str):
+        self.meeting_id = meeting_id
+        self.lock = threading.Lock()
+        self.sentence = 0  # 当前句序号
+        self.sent_text = ''  # 当前句最后推送的文本
+        self.partials_since_keyframe = 0
+        self.pending: Optional[tuple] = None  # 尚未推送的中间结果 (文本, 时间戳)
+        self.timer: Optional[threading.Timer] = None
+        self.last_emit_at = 0.0
+        # 统计
+        self.partials_received = 0
+        self.partials_emitted = 0
+        self.finals_emitted = 0
+        self.bytes_text = 0
+        self.emit_times = deque()
+
+    def record_emit(self, now: float, size: int):
+        self.last_emit_at = now
+        self.bytes_text += size
+        self.emit_times.append(now)
+        while self.emit_times and now - self.emit_times[0] > RATE_WINDOW:
+            self.emit_times.popleft()
+
+    def stats(self, now: float) -> Dict:
+        while self.emit_times and now - self.emit_times[0] > RATE_WINDOW:
+            self.emit_times.popleft()
+        return {
+            'sentence': self.sentence,
+            'partials_received': self.partials_received,
+            'partials_emitted': self.partials_emitted,
+            'partials_coalesced': self.partials_received - self.partials_emitted,
+            'finals_emitted': self.finals_emitted,
+            'text_chars_sent': self.bytes_text,
+            'emits_per_second': round(len(self.emit_times) / RATE_WINDOW, 2),
+        }
+
+
+class TranscriptBroadcaster:
+    """按会议房间合并、限速的转写结果广播器"""
+
+    def __init__(self, frame_ms: Optional[int] = None, keyframe_interval: Optional[int] = None):
+        self.frame = (frame_ms if frame_ms is not None else Config.TRANSCRIPT_COALESCE_MS) / 1000.0
+        self.keyframe_interval = keyframe_interval or Config.TRANSCRIPT_KEYFRAME_INTERVAL
+        self._emit: Optional[Callable] = None
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, _RoomState] = {}
+
+    def set_emitter(self, emit: Callable):
+        """
+        设置实际的发送函数
+
+        Args:
+            emit: emit(event, payload, room) 形式的函数
+        """
+        self._emit = emit
+
+    def _room(self, meeting_id: str) -> _RoomState:
+        with self._lock:
+            room = self._rooms.get(meeting_id)
+            if room is None:
+                room = self._rooms[meeting_id] = _RoomState(meeting_id)
+            return room
+
+    def _send(self, room: _RoomState, payload: Dict, size: int):
+        """发送一条 transcript_update（调用方持有房间锁）"""
+        room.record_emit(time.monotonic(), size)
+        if self._emit is None:
+            return
+        try:
+            self._emit('transcript_update', payload, room.meeting_id)
+        except Exception as e:
+            logger.error(f'广播转写结果失败: {str(e)}')
+
+    def _emit_partial(self, room: _RoomState, text: str, timestamp: int):
+        """推送中间结果（调用方持有房间锁）"""
+        payload = {
+            'meeting_id': room.meeting_id,
+            'sentence': room.sentence,
+            'is_final': False,
+            'timestamp': timestamp,
+        }
+        base = len(os.path.commonprefix([room.sent_text, text]))
+        delta = text[base:]
+        keyframe = not room.sent_text or room.partials_since_keyframe >= self.keyframe_interval \
+            or len(delta) >= len(text)
+        if keyframe:
+            payload['text'] = text
+            room.partials_since_keyframe = 0
+            size = len(text)
+        else:
+            payload['base'] = base
+            payload['delta'] = delta
+            room.partials_since_keyframe += 1
+            size = len(delta)
+        room.sent_text = text
+        room.partials_emitted += 1
+        self._send(room, payload, size)
+
+    def publish_partial(self, meeting_id: str, text: str, timestamp: Optional[int] = None):
+        """
+        发布中间结果
+
+        距上次推送超过一个合并帧时立即推送，否则在帧末推送帧内最新的结果。
+        """
+        timestamp = timestamp or int(time.time() * 1000)
+        room = self._room(meeting_id)
+        with room.lock:
+            room.partials_received += 1
+            if text == room.sent_text:
+                return
+            wait = room.last_emit_at + self.frame - time.monotonic()
+            if wait <= 0 and room.timer is None:
+                self._emit_partial(room, text, timestamp)
+                return
+            room.pending = (text, timestamp)
+            if room.timer is None:
+                room.timer = threading.Timer(max(wait, 0.0), self._flush, args=(room,))
+                room.timer.daemon = True
+                room.timer.start()
+
+    def _flush(self, room: _RoomState):
+        """帧末推送最新的中间结果"""
+        with room.lock:
+            room.timer = None
+            pending, room.pending = room.pending, None
+            if pending is not None:
+                self._emit_partial(room, *pending)
+
+    def publish_final(self, meeting_id: str, text: str, timestamp: Optional[int] = None):
+        """发布最终结果（立即推送完整文本，并开始新的一句）"""
+        timestamp = timestamp or int(time.time() * 1000)
+        room = self._room(meeting_id)
+        with room.lock:
+            if room.timer is not None:
+                room.timer.cancel()
+                room.timer = None
+            room.pending = None
+            self._send(room, {
+                'meeting_id': meeting_id,
+                'sentence': room.sentence,
+                'is_final': True,
+                'timestamp': timestamp,
+                'text': text,
+            }, len(text))
+            room.finals_emitted += 1
+            room.sentence += 1
+            room.sent_text = ''
+            room.partials_since_keyframe = 0
+
+    def close(self, meeting_id: str):
+        """会议结束识别时清理房间状态"""
+        with self._lock:
+            room = self._rooms.pop(meeting_id, None)
+        if room is not None:
+            with room.lock:
+                if room.timer is not None:
+                    room.timer.cancel()
+                    room.timer = None
+
+    def stats(self) -> Dict:
+        """各房间的推送统计"""
+        now = time.monotonic()
+        with self._lock:
+            rooms = list(self._rooms.values())
+        return {
+            'frame_ms': int(self.frame * 1000),
+            'rooms': {room.meeting_id: room.stats(now) for room in rooms},
+        }
+
+
+# 全局转写广播器（在 init_socketio 中绑定发送函数）
+transcript_broadcaster = TranscriptBroadcaster()
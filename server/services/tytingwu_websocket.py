@@ -14,16 +14,18 @@ logger = logging.getLogger(__name__)
 class TyingWuWebSocketClient:
     """通义听悟WebSocket客户端"""
     
-    def __init__(self, stream_url: str, on_message: Optional[Callable] = None):
+    def __init__(self, stream_url: str, on_message: Optional[Callable] = None, audio_format: str = 'pcm'):
         """
         初始化WebSocket客户端
         
         Args:
             stream_url: 通义听悟推流URL
             on_message: 消息回调函数
+            audio_format: 推流音频格式（需与创建实时任务时的格式一致）
         """
         self.stream_url = stream_url
         self.on_message = on_message
+        self.audio_format = audio_format
         self.ws = None
         self.connected = False
         self.thread = None
@@ -71,7 +73,7 @@ class TyingWuWebSocketClient:
                     'namespace': 'SpeechTranscriber'
                 },
                 'payload': {
-                    'format': 'pcm'  # 音频格式：pcm、opus、aac、speex、mp3
+                    'format': self.audio_format  # 音频格式：pcm、opus、aac、speex、mp3
                 }
             }
             ws.send(json.dumps(start_message))
@@ -149,7 +151,7 @@ class TyingWuWebSocketClient:
                         'namespace': 'SpeechTranscriber'
                     },
                     'payload': {
-                        'format': 'pcm'
+                        'format': self.audio_format
                     }
                 }
                 self.ws.send(json.dumps(start_message))
@@ -206,7 +208,8 @@ class WebSocketManager:
     def __init__(self):
         self.connections = {}  # {meeting_id: TyingWuWebSocketClient}
     
-    def create_connection(self, meeting_id: str, stream_url: str, on_message: Callable) -> TyingWuWebSocketClient:
+    def create_connection(self, meeting_id: str, stream_url: str, on_message: Callable,
+                          audio_format: str = 'pcm') -> TyingWuWebSocketClient:
         """
         创建WebSocket连接
         
@@ -214,6 +217,7 @@ class WebSocketManager:
             meeting_id: 会议ID
             stream_url: 推流URL
             on_message: 消息回调
+            audio_format: 推流音频格式
         
         Returns:
             WebSocket客户端实例
@@ -226,7 +230,7 @@ class WebSocketManager:
                 logger.warning(f"关闭旧连接失败: {str(e)}")
         
         # 创建新连接
-        client = TyingWuWebSocketClient(stream_url, on_message)
+        client = TyingWuWebSocketClient(stream_url, on_message, audio_format)
         try:
             client.connect()
             # 等待连接建立（最多等待3秒）
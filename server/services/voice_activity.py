@@ -0,0 +1,134 @@
+"""
+语音活动检测（VAD）门限
+
+备课会议中经常有长时间的静默（老师在阅读资料），这些静默帧照样发给通义听悟
+会浪费带宽和转写时长。这里对送往通义听悟的 16 位单声道 PCM 做轻量检测：
+- 按帧（默认 20ms）用 NumPy 向量化计算能量（dBFS）和过零率；
+- 能量高于阈值、且过零率不像高频噪声（或能量明显更高）的帧判定为语音；
+- 语音结束后保持若干帧（hangover），避免截断句尾；
+- 语音开始前保留少量预录帧（pre-roll），避免截断句首；
+- 静默期间每隔一段时间发送一帧全零的保活帧，避免上游连接因无数据而超时。
+"""
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入NumPy（向量化计算帧能量和过零率）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class VoiceActivityGate:
+    """基于能量和过零率的语音活动检测门限（16 位单声道 PCM）"""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        sink: Callable[[bytes], None],
+        frame_ms: Optional[int] = None,
+        energy_db: Optional[float] = None,
+        zcr_max: Optional[float] = None,
+        hangover_ms: Optional[int] = None,
+        preroll_ms: Optional[int] = None,
+        keepalive_ms: Optional[int] = None
+    ):
+        """
+        Args:
+            sample_rate: 采样率
+            sink: 通过门限的音频输出
+            frame_ms: 检测帧长（毫秒）
+            energy_db: 语音能量阈值（dBFS）
+            zcr_max: 语音帧的最大过零率（超过时需要能量高出阈值 10dB 才算语音）
+            hangover_ms: 语音结束后继续发送的时长（毫秒）
+            preroll_ms: 语音开始时补发的静默时长（毫秒）
+            keepalive_ms: 静默期间发送保活帧的间隔（毫秒）
+        """
+        frame_ms = frame_ms or Config.AUDIO_VAD_FRAME_MS
+        self.sample_rate = sample_rate
+        self.sink = sink
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.frame_bytes = self.frame_samples * 2
+        self.energy_db = energy_db if energy_db is not None else Config.AUDIO_VAD_ENERGY_DB
+        self.zcr_max = zcr_max if zcr_max is not None else Config.AUDIO_VAD_ZCR_MAX
+        self.hangover_frames = (hangover_ms if hangover_ms is not None else Config.AUDIO_VAD_HANGOVER_MS) // frame_ms
+        self.keepalive_frames = max(1, (keepalive_ms if keepalive_ms is not None
+                                        else Config.AUDIO_VAD_KEEPALIVE_MS) // frame_ms)
+        preroll_frames = (preroll_ms if preroll_ms is not None else Config.AUDIO_VAD_PREROLL_MS) // frame_ms
+        self._preroll = deque(maxlen=max(0, preroll_frames))
+        self._keepalive_frame = bytes(self.frame_bytes)
+
+        self._lock = threading.Lock()
+        self._remainder = b''
+        self._active = False
+        self._hangover = 0
+        self._silent_frames = 0
+        # 统计
+        self.frames_total = 0
+        self.frames_sent = 0
+        self.keepalives_sent = 0
+
+    def _classify(self, frames: 'np.ndarray') -> 'np.ndarray':
+        """逐帧判定是否为语音（frames: [帧数, 帧长] 的 int16 数组）"""
+        samples = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(samples * samples, axis=1))
+        energy_db = 20.0 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        loud = energy_db >= self.energy_db
+        return loud & ((zcr <= self.zcr_max) | (energy_db >= self.energy_db + 10.0))
+
+    def process(self, pcm: bytes):
+        """检测一个 PCM 数据块，把语音段（及保活帧）发送到输出"""
+        with self._lock:
+            data = self._remainder + pcm
+            usable = len(data) - len(data) % self.frame_bytes
+            self._remainder = data[usable:]
+            if not usable:
+                return
+
+            frames = np.frombuffer(data[:usable], dtype='<i2').reshape(-1, self.frame_samples)
+            speech = self._classify(frames)
+            output = []
+            for index, is_speech in enumerate(speech):
+                frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+                if is_speech:
+                    if not self._active:
+                        output.extend(self._preroll)
+                        self._preroll.clear()
+                        self._active = True
+                    self._hangover = self.hangover_frames
+                    self._silent_frames = 0
+                    output.append(frame)
+                elif self._active and self._hangover > 0:
+                    self._hangover -= 1
+                    output.append(frame)
+                else:
+                    self._active = False
+                    self._preroll.append(frame)
+                    self._silent_frames += 1
+                    if self._silent_frames % self.keepalive_frames == 0:
+                        output.append(self._keepalive_frame)
+                        self.keepalives_sent += 1
+
+            self.frames_total += len(speech)
+            self.frames_sent += len(output)
+        if output:
+            self.sink(b''.join(output))
+
+    def stats(self) -> Dict:
+        total = self.frames_total or 1
+        return {
+            'speaking': self._active,
+            'frames_total': self.frames_total,
+            'frames_sent': self.frames_sent,
+            'keepalives_sent': self.keepalives_sent,
+            'suppressed_ratio': round(1 - self.frames_sent / total, 3) if self.frames_total else 0.0,
+        }
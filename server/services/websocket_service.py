@@ -10,6 +10,11 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from services.meeting_service import MeetingService
 from services.meeting_transcript_service import MeetingTranscriptService
 from services.tytingwu_websocket import WebSocketManager, TyingWuWebSocketClient
+from services.transcript_broadcaster import transcript_broadcaster
+from services.realtime_bus import ConnectionRouter, create_bus
+from services.audio_ingest import audio_ingest_manager
+from services.session_recorder import session_recorder
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +24,8 @@ meeting_service = MeetingService()
 transcript_service = MeetingTranscriptService()
 # 通义听悟WebSocket连接管理器
 ws_manager = WebSocketManager()
+# 通义听悟连接所有权路由（在 init_socketio 中创建）
+connection_router: Optional[ConnectionRouter] = None
 
 
 def init_socketio(app):
@@ -26,11 +33,14 @@ def init_socketio(app):
     global socketio
     # 使用threading模式，避免async_mode问题
     # 参考：https://flask-socketio.readthedocs.io/en/latest/deployment.html
+    # 多进程部署：配置 SOCKETIO_MESSAGE_QUEUE（Redis）后，房间广播经消息队列到达所有进程
+    message_queue = Config.SOCKETIO_MESSAGE_QUEUE or None
     try:
         socketio = SocketIO(
             app,
             cors_allowed_origins="*",
             async_mode='threading',
+            message_queue=message_queue,
             logger=False,  # 禁用SocketIO的默认日志，使用我们的logger
             engineio_logger=False,
             ping_timeout=60,
@@ -43,16 +53,138 @@ def init_socketio(app):
         socketio = SocketIO(
             app,
             cors_allowed_origins="*",
+            message_queue=message_queue,
             logger=False,
             engineio_logger=False
         )
     
+    # 通义听悟连接所有权路由：其他进程收到的音频/停止指令转发到连接所在进程
+    global connection_router
+    connection_router = ConnectionRouter(create_bus(message_queue))
+    connection_router.start(_on_routed_message)
+    
+    # 转写结果统一经由广播器按房间合并后发送
+    transcript_broadcaster.set_emitter(
+        lambda event, payload, room: socketio.emit(event, payload, room=room)
+    )
+    
     # 注册事件处理器
     register_handlers(socketio)
     
     return socketio
 
 
+def _send_upstream(meeting_id: str, tytingwu_client: TyingWuWebSocketClient):
+    """音频接入管道的输出：发送到通义听悟"""
+    def sink(audio_bytes: bytes):
+        try:
+            tytingwu_client.send_audio(audio_bytes)
+        except Exception as e:
+            # 只在非连接错误时记录，避免日志过多
+            error_msg = str(e)
+            if 'WebSocket未连接' not in error_msg and '连接超时' not in error_msg:
+                logger.error(f'发送音频数据到通义听悟失败: {error_msg}')
+    return sink
+
+
+def _relay_audio(meeting_id: str, audio_data, audio_format: str = 'pcm', sample_rate: Optional[int] = None) -> bool:
+    """
+    把音频数据经音频接入管道（格式转换/重采样）发送到本进程持有的通义听悟连接
+    
+    Args:
+        meeting_id: 会议ID
+        audio_data: 音频数据（Base64或字节）
+        audio_format: 上传格式（pcm、opus、webm、ogg）
+        sample_rate: 上传 PCM 的采样率
+    
+    Returns:
+        本进程是否持有该会议的连接
+    """
+    tytingwu_client = ws_manager.get_connection(meeting_id)
+    if not tytingwu_client:
+        return False
+    
+    pipeline = audio_ingest_manager.get(meeting_id)
+    if pipeline is None:
+        pipeline = audio_ingest_manager.open(meeting_id, _send_upstream(meeting_id, tytingwu_client),
+                                             tytingwu_client.audio_format)
+    
+    try:
+        # 解码Base64音频数据
+        if isinstance(audio_data, str):
+            audio_bytes = base64.b64decode(audio_data)
+        else:
+            audio_bytes = audio_data
+        session_recorder.record_audio(meeting_id, audio_bytes)
+        
+        # 转换为通义听悟任务格式后发送（send_audio内部会等待连接建立）
+        pipeline.feed(audio_bytes, audio_format, sample_rate)
+        if connection_router:
+            connection_router.renew(meeting_id)
+        
+        logger.debug(f'已转发音频数据，会议ID: {meeting_id}, 格式: {audio_format}, 数据长度: {len(audio_bytes)}')
+    
+    except Exception as e:
+        logger.error(f'处理音频数据失败，会议ID: {meeting_id}, 错误: {str(e)}')
+    return True
+
+
+def _stop_upstream(meeting_id: str) -> bool:
+    """
+    停止本进程持有的通义听悟连接（发送StopTranscription后关闭）
+    
+    Returns:
+        本进程是否持有该会议的连接
+    """
+    tytingwu_client = ws_manager.get_connection(meeting_id)
+    if not tytingwu_client:
+        return False
+    
+    if tytingwu_client.connected:
+        try:
+            # 发送StopTranscription指令
+            # 根据文档：https://help.aliyun.com/zh/tingwu/js-push-stream
+            stop_message = {
+                'header': {
+                    'name': 'StopTranscription',
+                    'namespace': 'SpeechTranscriber'
+                },
+                'payload': {}
+            }
+            tytingwu_client.send_text(stop_message)
+            logger.info(f'已发送StopTranscription指令，会议ID: {meeting_id}')
+            
+            # 等待一小段时间确保消息发送完成
+            time.sleep(0.1)
+        except Exception as e:
+            logger.warning(f'发送StopTranscription指令失败: {str(e)}')
+    
+    # 关闭通义听悟WebSocket连接
+    audio_ingest_manager.close(meeting_id)
+    session_recorder.stop(meeting_id)
+    ws_manager.close_connection(meeting_id)
+    transcript_broadcaster.close(meeting_id)
+    if connection_router:
+        connection_router.release(meeting_id)
+    return True
+
+
+def _on_routed_message(message: Dict):
+    """处理其他进程转发来的上游消息"""
+    meeting_id = message.get('meeting_id')
+    message_type = message.get('type')
+    if message_type == 'audio':
+        _relay_audio(meeting_id, message.get('audio_data'), message.get('format', 'pcm'), message.get('sample_rate'))
+    elif message_type == 'stop':
+        _stop_upstream(meeting_id)
+    elif message_type == 'close':
+        audio_ingest_manager.close(meeting_id)
+        session_recorder.stop(meeting_id)
+        ws_manager.close_connection(meeting_id)
+        transcript_broadcaster.close(meeting_id)
+        connection_router.release(meeting_id)
+
+
 def register_handlers(sio):
     """注册WebSocket事件处理器"""
     
@@ -122,8 +254,15 @@ def register_handlers(sio):
             if not meeting_id:
                 return
             
-            # 关闭通义听悟连接（如果存在）
-            ws_manager.close_connection(meeting_id)
+            # 关闭通义听悟连接（如果存在；连接在其他进程时转发关闭指令）
+            if ws_manager.get_connection(meeting_id):
+                audio_ingest_manager.close(meeting_id)
+                session_recorder.stop(meeting_id)
+                ws_manager.close_connection(meeting_id)
+                transcript_broadcaster.close(meeting_id)
+                connection_router.release(meeting_id)
+            else:
+                connection_router.forward(meeting_id, {'type': 'close'})
             
             leave_room(meeting_id)
             
@@ -193,6 +332,8 @@ def register_handlers(sio):
                     # - Event: 事件消息
                     
                     logger.debug(f'收到通义听悟消息: {message_data}')
+                    if isinstance(message_data, dict):
+                        session_recorder.record_message(meeting_id, message_data)
                     
                     # 提取转写文本
                     text = None
@@ -275,28 +416,35 @@ def register_handlers(sio):
                             else:
                                 logger.debug(f'Demo模式：跳过数据库更新，meeting_id={meeting_id}')
                         
-                        # 广播给房间内的所有客户端
-                        try:
-                            sio.emit('transcript_update', {
-                                'meeting_id': meeting_id,
-                                'text': text,
-                                'is_final': is_final,
-                                'timestamp': timestamp or int(time.time() * 1000)
-                            }, room=meeting_id)
-                        except Exception as e:
-                            logger.error(f'广播转写结果失败: {str(e)}')
+                        # 广播给房间内的所有客户端（中间结果按帧合并并推送增量，最终结果立即推送）
+                        if is_final:
+                            transcript_broadcaster.publish_final(meeting_id, text, timestamp)
+                        else:
+                            transcript_broadcaster.publish_partial(meeting_id, text, timestamp)
                 
                 except Exception as e:
                     logger.error(f'处理通义听悟消息失败: {str(e)}')
             
+            # 通义听悟任务的音频格式和采样率（与创建实时任务时一致）
+            task_format = (data.get('audio_format') or Config.TYTINGWU_AUDIO_FORMAT).lower()
+            task_sample_rate = int(data.get('sample_rate') or Config.TYTINGWU_SAMPLE_RATE)
+            
             # 创建或获取通义听悟WebSocket连接
             tytingwu_client = ws_manager.get_connection(meeting_id)
             if not tytingwu_client:
+                # 连接在其他进程时先让其关闭，由本进程接管
+                connection_router.forward(meeting_id, {'type': 'close'})
                 tytingwu_client = ws_manager.create_connection(
                     meeting_id,
                     stream_url,
-                    on_tytingwu_message
+                    on_tytingwu_message,
+                    task_format
                 )
+            # 上传音频统一在音频接入管道中转换为任务格式
+            audio_ingest_manager.open(meeting_id, _send_upstream(meeting_id, tytingwu_client),
+                                      tytingwu_client.audio_format, task_sample_rate)
+            session_recorder.start(meeting_id, format=tytingwu_client.audio_format, sample_rate=task_sample_rate)
+            connection_router.claim(meeting_id)
             
             emit('recognition_started', {
                 'meeting_id': meeting_id,
@@ -311,52 +459,37 @@ def register_handlers(sio):
     
     @sio.on('audio_data')
     def handle_audio_data(data):
-        """接收音频数据并转发到通义听悟"""
+        """接收音频数据并转发到通义听悟（连接在其他进程时经消息总线转发）"""
         try:
             meeting_id = data.get('meeting_id')
             audio_data = data.get('audio_data')  # Base64编码的音频数据
-            audio_format = data.get('format', 'pcm')  # pcm, wav等
+            audio_format = data.get('format', 'pcm')  # 上传格式：pcm、opus、webm、ogg
+            sample_rate = data.get('sample_rate')  # 上传 PCM 的采样率（缺省为任务采样率）
             
             if not meeting_id or not audio_data:
                 logger.warning(f'缺少必要参数: meeting_id={meeting_id}, audio_data存在={bool(audio_data)}')
                 return
-            
-            # 检查会议是否存在（Demo场景允许跳过）
-            meeting = meeting_service.get_meeting(meeting_id)
-            if not meeting:
-                # Demo场景：如果已经有WebSocket连接，允许继续发送音频数据
-                tytingwu_client = ws_manager.get_connection(meeting_id)
-                if not tytingwu_client:
-                    # 只有在没有连接且不是mock场景时才警告
-                    if not (meeting_id.startswith('mock_task_') or 'mock' in meeting_id.lower()):
-                        logger.warning(f'会议不存在且无WebSocket连接: {meeting_id}')
+            if sample_rate is not None:
+                try:
+                    sample_rate = int(sample_rate)
+                except (TypeError, ValueError):
+                    sample_rate = 0
+                if sample_rate <= 0:
+                    logger.warning(f'无效的采样率: {data.get("sample_rate")}, 会议ID: {meeting_id}')
                     return
-                # 如果有连接，继续处理（Demo场景）
-            
-            # 获取通义听悟WebSocket连接
-            tytingwu_client = ws_manager.get_connection(meeting_id)
-            if not tytingwu_client:
-                # 不发送错误，避免日志过多，只在调试时记录
-                logger.debug(f'语音识别未启动，会议ID: {meeting_id}')
+
+            # 本进程持有连接时直接发送
+            if _relay_audio(meeting_id, audio_data, audio_format, sample_rate):
                 return
             
-            try:
-                # 解码Base64音频数据
-                if isinstance(audio_data, str):
-                    audio_bytes = base64.b64decode(audio_data)
-                else:
-                    audio_bytes = audio_data
-                
-                # 发送音频数据到通义听悟（send_audio内部会等待连接建立）
-                tytingwu_client.send_audio(audio_bytes)
-                
-                logger.debug(f'已转发音频数据，会议ID: {meeting_id}, 数据长度: {len(audio_bytes)}')
+            # 连接在其他进程：原样转发（保持Base64，不在本进程解码）
+            if connection_router.forward(meeting_id, {
+                'type': 'audio', 'audio_data': audio_data, 'format': audio_format, 'sample_rate': sample_rate
+            }):
+                return
             
-            except Exception as e:
-                # 只在非连接错误时记录，避免日志过多
-                error_msg = str(e)
-                if 'WebSocket未连接' not in error_msg and '连接超时' not in error_msg:
-                    logger.error(f'发送音频数据到通义听悟失败: {error_msg}')
+            # 不发送错误，避免日志过多，只在调试时记录
+            logger.debug(f'语音识别未启动，会议ID: {meeting_id}')
         
         except Exception as e:
             logger.error(f'处理音频数据失败: {str(e)}')
@@ -369,30 +502,9 @@ def register_handlers(sio):
             if not meeting_id:
                 return
             
-            # 获取通义听悟WebSocket连接
-            tytingwu_client = ws_manager.get_connection(meeting_id)
-            if tytingwu_client and tytingwu_client.connected:
-                try:
-                    # 发送StopTranscription指令
-                    # 根据文档：https://help.aliyun.com/zh/tingwu/js-push-stream
-                    stop_message = {
-                        'header': {
-                            'name': 'StopTranscription',
-                            'namespace': 'SpeechTranscriber'
-                        },
-                        'payload': {}
-                    }
-                    tytingwu_client.send_text(stop_message)
-                    logger.info(f'已发送StopTranscription指令，会议ID: {meeting_id}')
-                    
-                    # 等待一小段时间确保消息发送完成
-                    import time
-                    time.sleep(0.1)
-                except Exception as e:
-                    logger.warning(f'发送StopTranscription指令失败: {str(e)}')
-            
-            # 关闭通义听悟WebSocket连接
-            ws_manager.close_connection(meeting_id)
+            # 停止本进程的连接；连接在其他进程时转发停止指令
+            if not _stop_upstream(meeting_id):
+                connection_router.forward(meeting_id, {'type': 'stop'})
             
             emit('recognition_stopped', {
                 'meeting_id': meeting_id,
@@ -0,0 +1,60 @@
+"""
+AI对话滚动摘要测试
+
+较早的对话按 (会议ID, 用户ID) 增量折叠进滚动摘要；客户端发送的历史前缀被修改时必须重建摘要，
+不能返回旧摘要。
+
+用法: python -m pytest tests/test_chat_context_builder.py -q
+"""
+import os
+import sys
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from services.chat_context_builder import ChatContextBuilder
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+def turns(*contents) -> list:
+    """按用户、助手交替生成消息"""
+    return [{'role': ('user', 'assistant')[i % 2], 'content': content} for i, content in enumerate(contents)]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, '需要服务依赖（Flask、SQLAlchemy 等）')
+class FoldHistoryTest(unittest.TestCase):
+    """滚动摘要的增量折叠"""
+
+    def setUp(self):
+        self.builder = ChatContextBuilder(token_budget=8000, recent_turns=2, digest_tokens=2000)
+
+    def fold(self, messages, key=('meeting', 1)) -> str:
+        return self.builder._fold_history(key, messages, 2000)
+
+    def test_appended_messages_are_folded_incrementally(self):
+        self.fold(turns('甲方案好。', '乙。'))
+        digest = self.fold(turns('甲方案好。', '乙。', '丙。'))
+        self.assertEqual(self.builder._digests[('meeting', 1)].folded_count, 3)
+        self.assertIn('甲方案好', digest)
+        self.assertIn('丙', digest)
+
+    def test_edited_early_message_rebuilds_digest(self):
+        self.fold(turns('甲方案好。', '乙。', '丙。'))
+        digest = self.fold(turns('完全不同的问题。', '另一个。', '丙。'))
+        self.assertNotIn('甲方案好', digest)
+        self.assertIn('完全不同的问题', digest)
+
+    def test_digests_are_separate_per_user(self):
+        self.fold(turns('甲方案好。', '乙。'), key=('meeting', 1))
+        digest = self.fold(turns('另一位老师的问题。', '回答。'), key=('meeting', 2))
+        self.assertNotIn('甲方案好', digest)
+        self.builder.forget('meeting')
+        self.assertEqual(len(self.builder._digests), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
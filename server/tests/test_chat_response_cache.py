@@ -0,0 +1,61 @@
+"""
+AI对话回答缓存测试
+
+同一备课上下文下的重复问题跨轮次命中（与之前的对话历史无关）；指代前文的问题只在相同对话历史下命中。
+
+用法: python -m pytest tests/test_chat_response_cache.py -q
+"""
+import os
+import sys
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from services.chat_response_cache import ChatResponseCache, cache_namespace
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+CONTEXT = 'lesson-fingerprint'
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, '需要服务依赖（Flask、SQLAlchemy 等）')
+class ResponseCacheKeyTest(unittest.TestCase):
+    """回答缓存的命名空间"""
+
+    def setUp(self):
+        self.cache = ChatResponseCache(max_entries=16, ttl=60, similarity_threshold=0.99)
+
+    def test_repeated_question_hits_across_turns(self):
+        first_history = [
+            {'role': 'user', 'content': '你好'}, {'role': 'assistant', 'content': '你好，请问有什么可以帮助？'},
+        ]
+        question = '本节课重难点是什么？'
+        self.cache.put(cache_namespace(CONTEXT, question, 1, first_history), question, '重点是分数除法的算理。')
+
+        later_history = first_history + [
+            {'role': 'user', 'content': '课堂活动怎么设计'}, {'role': 'assistant', 'content': '可以分组讨论。'},
+        ]
+        repeated = '本节课重难点是什么呢'
+        namespace = cache_namespace(CONTEXT, repeated, 2, later_history)
+        self.assertEqual(self.cache.get(namespace, repeated), '重点是分数除法的算理。')
+
+    def test_back_reference_depends_on_history(self):
+        question = '把上面的方案再展开一下'
+        history = [{'role': 'user', 'content': '设计一个导入环节'}, {'role': 'assistant', 'content': '用分披萨导入。'}]
+        self.cache.put(cache_namespace(CONTEXT, question, 1, history), question, '披萨导入的详细步骤……')
+
+        other_history = [{'role': 'user', 'content': '设计一个练习'}, {'role': 'assistant', 'content': '分层练习。'}]
+        self.assertIsNone(self.cache.get(cache_namespace(CONTEXT, question, 1, other_history), question))
+        self.assertIsNotNone(self.cache.get(cache_namespace(CONTEXT, question, 1, history), question))
+
+    def test_different_context_misses(self):
+        question = '本节课重难点是什么'
+        self.cache.put(cache_namespace(CONTEXT, question, 1, []), question, '答案')
+        self.assertIsNone(self.cache.get(cache_namespace('other-lesson', question, 1, []), question))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+基于模板的流式 docx 写入
+
+docx 是一个 zip 包，正文在 word/document.xml 中。这里用一个预设样式的骨架 docx
+（样式表、主题、页面设置等）作为模板：复制骨架中除正文外的所有条目，
+再把生成的 WordprocessingML 段落直接流式写入 word/document.xml，
+不经过 python-docx 的对象模型，大文档也只占用很小的内存。
+"""
+import io
+import re
+import zipfile
+from typing import BinaryIO, Iterable, Optional
+from xml.sax.saxutils import escape
+
+DOCUMENT_PART = 'word/document.xml'
+
+# XML 1.0 不允许的控制字符
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# 写缓冲大小（字节）
+_FLUSH_SIZE = 64 * 1024
+
+
+def inches(value: float) -> int:
+    """英寸 -> twips（1/20 磅）"""
+    return int(round(value * 1440))
+
+
+def points(value: float) -> int:
+    """磅 -> twips"""
+    return int(round(value * 20))
+
+
+def _text_xml(text: str) -> str:
+    """文本 -> w:t/w:br/w:tab 序列"""
+    text = _INVALID_XML_CHARS.sub('', text)
+    parts = []
+    for line_index, line in enumerate(text.split('\n')):
+        if line_index:
+            parts.append('<w:br/>')
+        for tab_index, segment in enumerate(line.split('\t')):
+            if tab_index:
+                parts.append('<w:tab/>')
+            if segment:
+                parts.append(f'<w:t xml:space="preserve">{escape(segment)}</w:t>')
+    return ''.join(parts)
+
+
+def run(text: str, size: Optional[float] = None, bold: bool = False, italic: bool = False,
+        color: Optional[str] = None) -> str:
+    """
+    生成一个文本块（w:r）
+
+    Args:
+        text: 文本
+        size: 字号（磅）
+        bold: 加粗
+        italic: 斜体
+        color: 颜色（十六进制，如 '003366'）
+    """
+    props = []
+    if bold:
+        props.append('<w:b/>')
+    if italic:
+        props.append('<w:i/>')
+    if color:
+        props.append(f'<w:color w:val="{color}"/>')
+    if size:
+        props.append(f'<w:sz w:val="{int(size * 2)}"/>')
+    rpr = f'<w:rPr>{"".join(props)}</w:rPr>' if props else ''
+    return f'<w:r>{rpr}{_text_xml(text)}</w:r>'
+
+
+class DocxTemplate:
+    """docx 骨架：正文之外的所有条目，以及正文的开头和页面设置（w:sectPr）"""
+
+    def __init__(self, skeleton: bytes):
+        self.entries = []
+        with zipfile.ZipFile(io.BytesIO(skeleton)) as archive:
+            for info in archive.infolist():
+                data = archive.read(info.filename)
+                if info.filename == DOCUMENT_PART:
+                    document = data.decode('utf-8')
+                else:
+                    self.entries.append((info.filename, data))
+
+        body_start = document.index('<w:body>') + len('<w:body>')
+        body_end = document.rindex('</w:body>')
+        body = document[body_start:body_end]
+        sect_start = body.find('<w:sectPr')
+        self.head = document[:body_start]
+        self.sect_pr = body[sect_start:] if sect_start >= 0 else ''
+        self.tail = document[body_end + len('</w:body>'):]
+
+
+class DocxStreamWriter:
+    """按段落流式写入 docx（用法：with DocxStreamWriter(template, f) as writer: writer.paragraph(...)）"""
+
+    def __init__(self, template: DocxTemplate, fileobj: BinaryIO):
+        self.template = template
+        self.fileobj = fileobj
+        self._archive = None
+        self._stream = None
+        self._buffer = []
+        self._buffered = 0
+        self.paragraphs = 0
+
+    def __enter__(self):
+        self._archive = zipfile.ZipFile(self.fileobj, 'w', zipfile.ZIP_DEFLATED)
+        for name, data in self.template.entries:
+            self._archive.writestr(name, data)
+        self._stream = self._archive.open(DOCUMENT_PART, 'w', force_zip64=True)
+        self._write(self.template.head)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._write(self.template.sect_pr + '</w:body>' + self.template.tail)
+                self._flush()
+        finally:
+            self._stream.close()
+            self._archive.close()
+        return False
+
+    def _write(self, xml: str):
+        self._buffer.append(xml)
+        self._buffered += len(xml)
+        if self._buffered >= _FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._stream.write(''.join(self._buffer).encode('utf-8'))
+            self._buffer = []
+            self._buffered = 0
+
+    def paragraph(
+        self,
+        runs: Iterable[str] = (),
+        style: Optional[str] = None,
+        align: Optional[str] = None,
+        left: Optional[int] = None,
+        first_line: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        line: Optional[float] = None
+    ):
+        """
+        写入一个段落
+
+        Args:
+            runs: run() 生成的文本块
+            style: 段落样式ID（如 'Title'）
+            align: 对齐方式（left、center、right、both）
+            left: 左缩进（twips）
+            first_line: 首行缩进（twips，负数为悬挂缩进）
+            before: 段前间距（twips）
+            after: 段后间距（twips）
+            line: 行距倍数
+        """
+        props = []
+        if style:
+            props.append(f'<w:pStyle w:val="{style}"/>')
+        spacing = []
+        if before is not None:
+            spacing.append(f'w:before="{before}"')
+        if after is not None:
+            spacing.append(f'w:after="{after}"')
+        if line is not None:
+            spacing.append(f'w:line="{int(round(line * 240))}" w:lineRule="auto"')
+        if spacing:
+            props.append(f'<w:spacing {" ".join(spacing)}/>')
+        indent = []
+        if left is not None:
+            indent.append(f'w:left="{left}"')
+        if first_line is not None:
+            indent.append(f'w:firstLine="{first_line}"' if first_line >= 0 else f'w:hanging="{-first_line}"')
+        if indent:
+            props.append(f'<w:ind {" ".join(indent)}/>')
+        if align:
+            props.append(f'<w:jc w:val="{align}"/>')
+        ppr = f'<w:pPr>{"".join(props)}</w:pPr>' if props else ''
+        self._write(f'<w:p>{ppr}{"".join(runs)}</w:p>')
+        self.paragraphs += 1
+
+    def empty(self):
+        """写入一个空段落"""
+        self._write('<w:p/>')
+        self.paragraphs += 1
@@ -0,0 +1,132 @@
+"""
+JSON 编解码
+
+接口响应、SSE 数据块和转写记录中的 JSON 字段统一经过这里：安装了 orjson 时使用 orjson
+（输出与 ensure_ascii=False 的标准库一致：中文不转义、紧凑分隔符），否则回退到标准库 json。
+orjson 不支持的输入（超出 64 位的整数等）也自动回退到标准库。
+
+- dumps / dumps_bytes / loads: 通用编解码；
+- sse_data: 生成 SSE 的 data 行；
+- FastJSONProvider: Flask 的 JSON provider（jsonify、request.get_json）。
+"""
+import json
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入 orjson
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = object
+
+ENGINES = ('auto', 'orjson', 'stdlib')
+
+_use_orjson = ORJSON_AVAILABLE
+
+
+def configure(engine: str = 'auto') -> str:
+    """
+    选择 JSON 引擎
+
+    Args:
+        engine: auto（有 orjson 时使用）、orjson 或 stdlib
+
+    Returns:
+        实际使用的引擎名称
+    """
+    global _use_orjson
+    engine = (engine or 'auto').lower()
+    if engine not in ENGINES:
+        logger.warning(f"未知的 JSON 引擎: {engine}，使用 auto")
+        engine = 'auto'
+    if engine == 'orjson' and not ORJSON_AVAILABLE:
+        logger.warning("orjson 未安装，JSON 编解码使用标准库，请运行: pip install orjson")
+    _use_orjson = ORJSON_AVAILABLE and engine != 'stdlib'
+    return current_engine()
+
+
+def current_engine() -> str:
+    return 'orjson' if _use_orjson else 'stdlib'
+
+
+def _orjson_option(sort_keys: bool = False, passthrough: bool = False) -> int:
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if passthrough:
+        # 日期、dataclass 等交给 default 处理，与标准库路径输出一致
+        option |= orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    return option
+
+
+def dumps_bytes(obj: Any, default: Optional[Callable] = None, sort_keys: bool = False) -> bytes:
+    """编码为 UTF-8 字节（紧凑格式，中文不转义）"""
+    if _use_orjson:
+        try:
+            return orjson.dumps(obj, default=default, option=_orjson_option(sort_keys, default is not None))
+        except TypeError:
+            pass  # orjson 不支持的输入，回退到标准库
+    return json.dumps(obj, default=default, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj: Any, default: Optional[Callable] = None, sort_keys: bool = False) -> str:
+    """编码为字符串（紧凑格式，中文不转义）"""
+    if _use_orjson:
+        try:
+            return orjson.dumps(obj, default=default,
+                                option=_orjson_option(sort_keys, default is not None)).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, default=default, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(data):
+    """解码 JSON 字符串或字节"""
+    if _use_orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson 比标准库严格（如 NaN），解析失败时用标准库再试一次
+            pass
+    return json.loads(data)
+
+
+def sse_data(obj: Any) -> str:
+    """SSE 数据块：data: <JSON>"""
+    return f"data: {dumps(obj)}\n\n"
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider：默认参数下走快速编码，带额外参数（indent 等）时交给 Flask 默认实现"""
+
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, default=self.default, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # 调试模式下保留缩进格式，便于阅读
+            return super().response(obj)
+        return self._app.response_class(
+            dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys) + b"\n",
+            mimetype=self.mimetype
+        )
@@ -0,0 +1,173 @@
+"""
+本地关键词提取
+
+对备课会议对话做 TF-IDF + TextRank 关键词提取，用于网络资料搜索，
+不需要调用大模型。优先使用 jieba 分词（加载教育领域术语词典），
+未安装时按标点和停用词切分出短语作为候选词。
+"""
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from utils.text_tokenizer import JIEBA_AVAILABLE, STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+# 教育领域术语词典：分词时作为整词保留，提取时加权
+EDUCATION_TERMS = frozenset("""
+核心素养 课程标准 新课标 教学设计 教学目标 教学重点 教学难点 重难点 教学策略 教学方法 教学资源 教学评价
+教学反思 教案 学案 导学案 课件 说课 评课 磨课 公开课 示范课 集体备课 大单元教学 单元整体教学 项目式学习
+跨学科学习 情境教学 探究式学习 合作学习 分层教学 差异化教学 翻转课堂 学习任务群 大概念 深度学习
+形成性评价 过程性评价 表现性评价 课堂活动 课堂提问 课堂练习 课后作业 作业设计 板书设计 课堂导入 小组合作
+思维导图 知识点 易错点 学情分析 教材分析 教材解读 学习目标 学业质量 德育 美育 劳动教育
+语文 数学 英语 物理 化学 生物 历史 地理 政治 道德与法治 科学 信息技术 音乐 美术 体育
+小学 初中 高中 一年级 二年级 三年级 四年级 五年级 六年级 七年级 八年级 九年级 高一 高二 高三
+阅读理解 古诗词 文言文 写作 作文 口语交际 识字 拼音 分数 小数 方程 函数 几何 概率 统计
+""".split())
+
+# 教育领域停用词：会议对话中高频但不适合作为搜索词的词
+EDUCATION_STOPWORDS = frozenset("""
+老师 同学 学生 大家 我们 你们 这节课 这堂课 这节 一节课 上课 下课 课上 今天 明天 刚才 刚刚 一下 觉得 感觉
+看看 想想 讨论 问题 内容 东西 时候 地方 方面 部分 情况 时间 办法 意思 可能 应该 需要 比如 例如 其实 就是
+然后 还有 这里 那里 这边 那边 好的 对的 是的 没问题 谢谢 可以 不错 现在 之前 之后 一起 一样 所有 各位
+用户 AI 助手 主持人 会议 备课会 会议主题
+""".split())
+
+_ALL_STOPWORDS = STOPWORDS | EDUCATION_STOPWORDS
+
+# 对话行前缀（「用户: 张老师: 内容」）
+_SPEAKER_PREFIX_RE = re.compile(r'^(?:[^:：\n]{1,12}[:：]\s*){1,2}')
+# 无 jieba 时的短语切分：标点、空白和常见虚词
+_PHRASE_SPLIT_RE = re.compile(r'[\s，。！？；：、,.!?;:（）()【】\[\]“”"\'《》<>…—\-]+|[的了和是在也就都把被让给对与及或而但吗呢吧啊呀]')
+_WORD_RE = re.compile(r'^(?:[一-鿿]{2,}|[a-zA-Z][a-zA-Z0-9\-]{1,})$')
+
+_idf_table: Dict[str, float] = {}
+_median_idf = 10.0
+
+if JIEBA_AVAILABLE:
+    import jieba
+    for _term in EDUCATION_TERMS:
+        jieba.add_word(_term, freq=20000)
+    try:
+        import jieba.analyse
+        _idf_table = jieba.analyse.default_tfidf.idf_freq
+        _median_idf = jieba.analyse.default_tfidf.median_idf
+    except Exception as e:  # 词典加载失败时所有词使用相同的 IDF
+        logger.warning(f"加载 jieba IDF 词典失败，关键词提取只使用词频: {e}")
+
+
+def _strip_speaker(line: str) -> str:
+    """去掉对话行的角色和说话人前缀"""
+    return _SPEAKER_PREFIX_RE.sub('', line.strip(), count=1)
+
+
+def _is_candidate(word: str) -> bool:
+    return bool(_WORD_RE.match(word)) and word not in _ALL_STOPWORDS and len(word) <= 12
+
+
+def _segment(text: str) -> List[str]:
+    """将一行文本切分为候选词（保持顺序）"""
+    if JIEBA_AVAILABLE:
+        return [w.strip() for w in jieba.lcut(text) if _is_candidate(w.strip())]
+
+    # 无 jieba：先匹配术语词典，再按标点和虚词切出 2-6 字短语
+    words = []
+    for phrase in _PHRASE_SPLIT_RE.split(text):
+        if not phrase:
+            continue
+        terms = [t for t in EDUCATION_TERMS if t in phrase]
+        words.extend(t for t in terms if t not in _ALL_STOPWORDS)
+        if not terms and 2 <= len(phrase) <= 6 and _is_candidate(phrase):
+            words.append(phrase)
+    return words
+
+
+def _textrank(sentences: List[List[str]], window: int = 5, damping: float = 0.85,
+              iterations: int = 30) -> Dict[str, float]:
+    """在候选词共现图上运行 TextRank"""
+    graph: Dict[str, Counter] = defaultdict(Counter)
+    for words in sentences:
+        for i, word in enumerate(words):
+            for other in words[i + 1:i + window]:
+                if other != word:
+                    graph[word][other] += 1
+                    graph[other][word] += 1
+    if not graph:
+        return {}
+
+    scores = {word: 1.0 for word in graph}
+    out_weight = {word: sum(edges.values()) for word, edges in graph.items()}
+    for _ in range(iterations):
+        scores = {
+            word: (1 - damping) + damping * sum(
+                weight / out_weight[neighbor] * scores[neighbor] for neighbor, weight in edges.items()
+            )
+            for word, edges in graph.items()
+        }
+    return scores
+
+
+def extract_keywords(chat_content: str, top_k: int = 3) -> List[str]:
+    """
+    从会议对话中提取搜索关键词
+
+    得分 = 归一化 TF-IDF 与归一化 TextRank 的平均值；较新的对话行权重更高，
+    教育领域术语额外加权。
+
+    Args:
+        chat_content: 对话文本（每行一条消息）
+        top_k: 返回的关键词数量
+
+    Returns:
+        关键词列表（按得分从高到低）
+    """
+    lines = [_strip_speaker(line) for line in (chat_content or '').split('\n')]
+    lines = [line for line in lines if line]
+    if not lines:
+        return []
+
+    sentences = [_segment(line) for line in lines]
+    term_weights: Counter = Counter()
+    for index, words in enumerate(sentences):
+        # 越靠后的对话越接近当前讨论主题
+        recency = 1.0 + index / len(sentences)
+        for word in words:
+            term_weights[word] += recency
+    if not term_weights:
+        return []
+
+    total = sum(term_weights.values())
+    tfidf = {word: weight / total * _idf_table.get(word, _median_idf) for word, weight in term_weights.items()}
+    textrank = _textrank(sentences)
+
+    max_tfidf = max(tfidf.values()) or 1.0
+    max_textrank = max(textrank.values()) if textrank else 1.0
+    scores = {}
+    for word, value in tfidf.items():
+        score = 0.5 * value / max_tfidf + 0.5 * textrank.get(word, 0.0) / max_textrank
+        if word in EDUCATION_TERMS:
+            score *= 1.5
+        scores[word] = score
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    keywords: List[str] = []
+    for word, _ in ranked:
+        # 跳过被已选关键词包含的词（如已有「教学设计」时跳过「设计」）
+        if any(word in chosen or chosen in word for chosen in keywords):
+            continue
+        keywords.append(word)
+        if len(keywords) >= top_k:
+            break
+    return keywords
+
+
+def extract_search_keywords(chat_content: str, top_k: int = 3) -> Tuple[List[str], str]:
+    """
+    提取用于网络资料搜索的关键词
+
+    Returns:
+        (用于搜索的关键词列表, 用于展示的关键词)
+    """
+    keywords = extract_keywords(chat_content, top_k=top_k)
+    return keywords, '、'.join(keywords)
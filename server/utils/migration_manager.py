@@ -1,58 +1,180 @@
 """
 数据库迁移管理工具
-在应用启动时自动执行数据库迁移
+在数据库锁内执行版本化迁移：多进程（多个 worker / 多个容器）同时启动时只有一个进程执行，
+其余进程等待锁释放后发现已是最新版本直接跳过。也支持演练模式，只报告待执行的 DDL 和锁影响估计。
 """
+import io
 import os
 import logging
-from flask_migrate import upgrade
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from alembic import command
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import current_app
+from sqlalchemy import text
+
+from database import db, MIGRATIONS_DIR
+from utils import online_ddl
 
 logger = logging.getLogger(__name__)
 
+# MySQL GET_LOCK 使用的锁名（同一 MySQL 实例上的多个库共用锁名空间，带上库名区分）
+MIGRATION_LOCK_NAME = 'schema_migration'
+
+
+def _alembic_config():
+    """迁移配置（不让 env.py 重新配置日志，避免覆盖应用的日志设置）"""
+    config = current_app.extensions['migrate'].migrate.get_config(MIGRATIONS_DIR)
+    config.attributes['configure_logger'] = False
+    return config
+
+
+@contextmanager
+def migration_lock(engine, timeout: int):
+    """
+    数据库级互斥锁
+
+    MySQL 使用 GET_LOCK（持有锁的连接断开时自动释放，进程崩溃不会留下死锁）；
+    其他数据库（本地开发用的 SQLite）不加锁。
+
+    Yields:
+        是否取得锁（等待超时为 False）
+    """
+    if engine.dialect.name != 'mysql':
+        yield True
+        return
+
+    with engine.connect() as conn:
+        name = f"{conn.execute(text('SELECT DATABASE()')).scalar()}:{MIGRATION_LOCK_NAME}"
+        acquired = conn.execute(text('SELECT GET_LOCK(:name, :timeout)'), {'name': name, 'timeout': timeout}).scalar()
+        if acquired != 1:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
+
+
+def pending_revisions(connection, script: ScriptDirectory) -> list:
+    """尚未应用的迁移（按执行顺序）"""
+    current = MigrationContext.configure(connection).get_current_heads()
+    revisions = list(script.iterate_revisions('heads', current or 'base'))
+    revisions.reverse()
+    return [revision for revision in revisions if revision.revision not in current]
 
-def run_migrations(app):
+
+def run_migrations(app, prepare: Optional[Callable] = None):
     """
-    执行数据库迁移
-    
+    在数据库锁内执行待应用的迁移
+
     Args:
         app: Flask应用实例
+        prepare: 取得锁之后、执行迁移之前调用（如 create_all 创建缺失的表）
+
+    Returns:
+        是否成功（失败时已记录日志）
     """
     with app.app_context():
-        migrations_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
-        versions_dir = os.path.join(migrations_dir, 'versions')
-        
         # 检查迁移目录是否存在
-        if not os.path.exists(migrations_dir):
+        if not os.path.exists(os.path.join(MIGRATIONS_DIR, 'env.py')):
             logger.warning("迁移目录不存在，跳过自动迁移。请先运行: flask db init")
             return False
-        
-        # 检查是否有迁移文件
-        if os.path.exists(versions_dir):
-            version_files = [f for f in os.listdir(versions_dir) if f.endswith('.py')]
-            if not version_files:
-                logger.info("没有待执行的迁移文件")
-                return True
-        
+
+        timeout = app.config.get('MIGRATION_LOCK_TIMEOUT', 600)
         try:
-            # 执行迁移
-            upgrade()
-            logger.info("✓ 数据库迁移执行成功")
-            return True
+            with migration_lock(db.engine, timeout) as acquired:
+                if not acquired:
+                    logger.error(f"等待数据库迁移锁超时（{timeout} 秒），可能有其他进程正在执行迁移")
+                    return False
+
+                if prepare:
+                    prepare()
+
+                config = _alembic_config()
+                with db.engine.connect() as conn:
+                    pending = pending_revisions(conn, ScriptDirectory.from_config(config))
+                if not pending:
+                    logger.info("✓ 数据库结构已是最新版本")
+                    return True
+
+                logger.info(f"执行 {len(pending)} 个数据库迁移: {', '.join(r.revision for r in pending)}")
+                command.upgrade(config, 'head')
+                logger.info("✓ 数据库迁移执行成功")
+                return True
         except Exception as e:
             error_msg = str(e).lower()
-            
-            # 如果是迁移目录不存在或没有迁移文件，这是正常的
-            if 'no such file' in error_msg or 'migrations' in error_msg:
-                logger.info("迁移目录未初始化，这是正常的（首次运行或新环境）")
-                logger.info("提示: 如需使用迁移功能，请先运行: flask db init")
-                return True
-            
+
             # 如果是数据库连接问题
             if 'operationalerror' in error_msg or 'connection' in error_msg:
                 logger.error(f"数据库连接失败，无法执行迁移: {str(e)}")
                 return False
-            
+
             # 其他错误
             logger.error(f"数据库迁移执行失败: {str(e)}")
             logger.exception("迁移异常详情:")
             return False
 
+
+def plan_migrations(app) -> List[dict]:
+    """
+    演练：列出待执行的迁移和每条 DDL 的锁影响估计，不修改数据库
+
+    迁移文件中通过 utils.online_ddl 执行的操作会检查表结构、估计表大小；
+    直接调用 alembic op 的操作只能得到 SQL，按可能锁表处理。
+
+    Returns:
+        [ { "revision", "description", "steps": [ { "table", "operation", "sql", "algorithm", "lock",
+            "fallback", "impact", "rows", "data_mb" } ], "other_sql": [str] } ]
+    """
+    with app.app_context():
+        script = ScriptDirectory.from_config(_alembic_config())
+        plans = []
+        with db.engine.connect() as conn:
+            for revision in pending_revisions(conn, script):
+                # 离线模式：直接调用 op 的语句只输出到缓冲区，不会执行
+                buffer = io.StringIO()
+                context = MigrationContext.configure(
+                    dialect_name=conn.dialect.name,
+                    opts={'as_sql': True, 'output_buffer': buffer}
+                )
+                with Operations.context(context), online_ddl.recording(conn) as steps:
+                    revision.module.upgrade()
+
+                other_sql = [statement.strip() for statement in buffer.getvalue().split(';\n') if statement.strip()]
+                plans.append({
+                    'revision': revision.revision,
+                    'description': (revision.doc or '').strip(),
+                    'steps': steps,
+                    'other_sql': other_sql,
+                })
+            conn.rollback()
+        return plans
+
+
+def format_plan(plans: List[dict]) -> str:
+    """演练结果的文本报告"""
+    if not plans:
+        return "数据库结构已是最新版本，没有待执行的迁移"
+
+    lines = [f"待执行迁移 {len(plans)} 个："]
+    for plan in plans:
+        lines.append(f"\n[{plan['revision']}] {plan['description']}")
+        if not plan['steps'] and not plan['other_sql']:
+            lines.append("  （无需变更：对应的字段/索引已存在）")
+        for step in plan['steps']:
+            size = f"约 {step['rows']} 行"
+            if step['data_mb'] is not None:
+                size += f" / {step['data_mb']} MB"
+            lines.append(f"  - {step['operation']}（{size}）")
+            lines.append(f"    SQL: {step['sql']}")
+            if step['fallback']:
+                lines.append(f"    不支持时改用: {'; '.join(step['fallback'])}")
+            lines.append(f"    影响: {step['impact']}")
+        for statement in plan['other_sql']:
+            lines.append(f"  - SQL: {statement}")
+            lines.append(f"    影响: {online_ddl.lock_impact(None, None)}")
+    return '\n'.join(lines)
@@ -0,0 +1,225 @@
+"""
+在线 DDL 辅助函数（供迁移文件使用）
+
+MySQL 上为 ALTER 语句显式指定算法和锁级别，避免结构变更期间锁表：
+- 添加字段：ALGORITHM=INSTANT（MySQL 8.0.12+，只修改元数据），不支持时退回 ALGORITHM=INPLACE, LOCK=NONE
+- 创建/删除索引：ALGORITHM=INPLACE, LOCK=NONE（重建索引期间不阻塞读写）
+服务器无法按指定算法执行时直接报错，不会悄悄退化为锁表复制（COPY）；
+确认可以接受锁表时设置 MIGRATION_ALLOW_BLOCKING_DDL=true。其他数据库（SQLite 等）直接使用 alembic 的 op。
+
+所有操作先按字段名/索引名检查是否已存在，与 create_all 新建的库共存，重复执行无副作用。
+演练模式下（见 utils.migration_manager.plan_migrations）只记录计划和锁影响估计，不执行。
+
+用法（迁移文件中）:
+    from utils.online_ddl import add_column, create_index, drop_index
+    add_column('meetings', sa.Column('remark', sa.String(200), nullable=True))
+    create_index('ix_meetings_user_created', 'meetings', ['user_id', 'created_at'])
+"""
+import logging
+from contextlib import contextmanager
+from typing import List, Optional
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.schema import CreateColumn
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# MySQL 错误码：指定的 ALGORITHM/LOCK 不支持该操作
+UNSUPPORTED_ALTER_ERRORS = (1845, 1846)
+
+# 演练模式：记录的步骤列表和用于检查表结构的真实连接
+_recording = None
+
+
+@contextmanager
+def recording(connection):
+    """
+    演练模式：期间的辅助函数调用只记录步骤（返回的列表），不执行
+
+    Args:
+        connection: 用于检查表结构和估计表大小的数据库连接
+    """
+    global _recording
+    steps = []
+    _recording = (steps, connection)
+    try:
+        yield steps
+    finally:
+        _recording = None
+
+
+def _bind():
+    return _recording[1] if _recording else op.get_bind()
+
+
+def _is_mysql(bind) -> bool:
+    return bind.dialect.name == 'mysql'
+
+
+def _supports_instant(bind) -> bool:
+    """MySQL 8.0.12 起支持 ALGORITHM=INSTANT 添加字段"""
+    version = bind.dialect.server_version_info or ()
+    return bool(version) and tuple(version[:3]) >= (8, 0, 12)
+
+
+def _quote(bind, name: str) -> str:
+    return bind.dialect.identifier_preparer.quote(name)
+
+
+def _existing_columns(bind, table: str) -> Optional[set]:
+    inspector = sa.inspect(bind)
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _existing_indexes(bind, table: str) -> Optional[set]:
+    inspector = sa.inspect(bind)
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def table_size(bind, table: str) -> dict:
+    """
+    估计表大小（MySQL 取 information_schema 中的统计值，其他数据库 COUNT(*)）
+
+    Returns:
+        { "rows": int, "data_mb": float | None }
+    """
+    if _is_mysql(bind):
+        row = bind.execute(sa.text(
+            "SELECT TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {'table': table}).first()
+        if not row:
+            return {'rows': 0, 'data_mb': 0.0}
+        return {'rows': int(row[0] or 0), 'data_mb': round((row[1] or 0) / (1024 * 1024), 1)}
+    rows = bind.execute(sa.text(f'SELECT COUNT(*) FROM {_quote(bind, table)}')).scalar()
+    return {'rows': int(rows or 0), 'data_mb': None}
+
+
+def lock_impact(algorithm: Optional[str], lock: Optional[str]) -> str:
+    """按算法和锁级别说明对线上读写的影响"""
+    if algorithm == 'INSTANT':
+        return '只修改元数据，瞬间完成；需要短暂获取元数据锁（会等待该表上未结束的事务）'
+    if algorithm == 'INPLACE' and lock == 'NONE':
+        return '在线执行，不阻塞读写；耗时与表大小成正比，开始和结束时短暂获取元数据锁'
+    if algorithm is None and lock is None:
+        return '未指定在线算法，MySQL 上可能锁表复制（COPY），执行期间阻塞写入'
+    return f'ALGORITHM={algorithm}, LOCK={lock}'
+
+
+def _run(table: str, operation: str, statement: str, options: List[tuple], fallback=None):
+    """
+    执行（或在演练模式下记录）一条 DDL
+
+    Args:
+        table: 表名
+        operation: 操作说明（用于日志和演练报告）
+        statement: 不含算法子句的 DDL 语句
+        options: MySQL 上依次尝试的 (ALGORITHM, LOCK)，LOCK 可为 None
+        fallback: 非 MySQL 数据库上执行的函数（alembic op）
+    """
+    bind = _bind()
+    mysql = _is_mysql(bind)
+
+    if _recording:
+        algorithm, lock = options[0] if mysql else (None, None)
+        step = {
+            'table': table,
+            'operation': operation,
+            'sql': statement + (_algorithm_clause(algorithm, lock) if mysql else ''),
+            'algorithm': algorithm,
+            'lock': lock,
+            'fallback': [_algorithm_clause(*option).lstrip(', ') for option in options[1:]] if mysql else [],
+            'impact': lock_impact(algorithm, lock) if mysql else '非 MySQL 数据库，直接执行',
+        }
+        step.update(table_size(bind, table))
+        _recording[0].append(step)
+        return
+
+    if not mysql:
+        fallback()
+        logger.info(f"✓ {operation}")
+        return
+
+    last_error = None
+    for algorithm, lock in options:
+        try:
+            op.execute(statement + _algorithm_clause(algorithm, lock))
+            logger.info(f"✓ {operation}（ALGORITHM={algorithm}{f', LOCK={lock}' if lock else ''}）")
+            return
+        except sa.exc.DBAPIError as e:
+            code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+            if code not in UNSUPPORTED_ALTER_ERRORS:
+                raise
+            last_error = e
+            logger.warning(f"{operation}: 不支持 ALGORITHM={algorithm}，尝试下一种方式")
+
+    if not Config.MIGRATION_ALLOW_BLOCKING_DDL:
+        raise RuntimeError(
+            f"{operation} 无法在线执行（需要锁表复制），已中止。"
+            f"确认可以接受锁表后设置 MIGRATION_ALLOW_BLOCKING_DDL=true 重新执行: {last_error}"
+        )
+    logger.warning(f"{operation}: 以锁表方式执行（MIGRATION_ALLOW_BLOCKING_DDL=true）")
+    op.execute(statement)
+
+
+def _algorithm_clause(algorithm: str, lock: Optional[str]) -> str:
+    clause = f', ALGORITHM={algorithm}'
+    if lock:
+        clause += f', LOCK={lock}'
+    return clause
+
+
+def add_column(table: str, column: sa.Column):
+    """
+    添加字段（字段已存在或表不存在时跳过）
+
+    MySQL 8.0.12+ 使用 ALGORITHM=INSTANT，否则 ALGORITHM=INPLACE, LOCK=NONE。
+    INSTANT 只能把字段加在表的末尾，不要指定 AFTER/FIRST。
+    """
+    bind = _bind()
+    existing = _existing_columns(bind, table)
+    if existing is None or column.name in existing:
+        return
+
+    definition = str(CreateColumn(column).compile(dialect=bind.dialect))
+    statement = f'ALTER TABLE {_quote(bind, table)} ADD COLUMN {definition}'
+    options = [('INPLACE', 'NONE')]
+    if _supports_instant(bind):
+        options.insert(0, ('INSTANT', None))
+    _run(table, f'表 {table} 添加字段 {column.name}', statement, options,
+         fallback=lambda: op.add_column(table, column))
+
+
+def create_index(name: str, table: str, columns: List[str], unique: bool = False):
+    """创建索引（索引已存在或表不存在时跳过），MySQL 上使用 ALGORITHM=INPLACE, LOCK=NONE"""
+    bind = _bind()
+    existing = _existing_indexes(bind, table)
+    if existing is None or name in existing:
+        return
+
+    column_list = ', '.join(_quote(bind, column) for column in columns)
+    statement = (
+        f"ALTER TABLE {_quote(bind, table)} ADD {'UNIQUE ' if unique else ''}INDEX "
+        f"{_quote(bind, name)} ({column_list})"
+    )
+    _run(table, f'表 {table} 创建索引 {name}', statement, [('INPLACE', 'NONE')],
+         fallback=lambda: op.create_index(name, table, columns, unique=unique))
+
+
+def drop_index(name: str, table: str):
+    """删除索引（索引不存在时跳过），MySQL 上使用 ALGORITHM=INPLACE, LOCK=NONE（只修改元数据）"""
+    bind = _bind()
+    existing = _existing_indexes(bind, table)
+    if not existing or name not in existing:
+        return
+
+    statement = f'ALTER TABLE {_quote(bind, table)} DROP INDEX {_quote(bind, name)}'
+    _run(table, f'表 {table} 删除索引 {name}', statement, [('INPLACE', 'NONE')],
+         fallback=lambda: op.drop_index(name, table_name=table))
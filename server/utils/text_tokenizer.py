@@ -0,0 +1,72 @@
+"""
+中文文本分词工具
+优先使用 jieba 分词；未安装时退化为「中文字符二元组 + 英文/数字单词」切分
+"""
+import logging
+import re
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入jieba分词
+try:
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+    JIEBA_AVAILABLE = True
+except ImportError:
+    JIEBA_AVAILABLE = False
+    logger.warning("jieba 未安装，中文分词将使用字符二元组。请运行: pip install jieba")
+
+_CJK_RUN_RE = re.compile(r'[一-鿿]+')
+_TOKEN_RE = re.compile(r'[一-鿿]+|[a-zA-Z][a-zA-Z0-9_\-]*|\d+(?:\.\d+)?')
+
+# 通用停用词（检索和关键词提取共用）
+STOPWORDS = frozenset("""
+的 了 和 是 在 我 有 也 就 不 人 都 一 一个 上 中 到 说 要 去 你 会 着 没有 看 好 自己 这 那 这个 那个
+吗 呢 吧 啊 呀 哦 嗯 把 被 让 给 对 与 及 或 而 但 如果 因为 所以 然后 还是 可以 什么 怎么 怎样
+我们 你们 他们 她们 它们 这些 那些 这样 那样 一下 一些 已经 还有 比较 非常 进行 通过 使用 以及
+之 其 为 以 于 则 等 等等 并 并且 还 又 很 更 最 再 能 可能 应该 需要 大家 老师 同学
+the a an of to and or in on for is are was were be with as by at this that it
+""".split())
+
+
+def _bigram_tokens(run: str) -> List[str]:
+    """将连续中文切分为字符二元组（单字时保留单字）"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str, for_search: bool = True, keep_stopwords: bool = False) -> List[str]:
+    """
+    将文本切分为检索用的词项
+
+    Args:
+        text: 文本
+        for_search: 使用 jieba 搜索引擎模式（对长词再切分，提高召回）
+        keep_stopwords: 是否保留停用词
+
+    Returns:
+        词项列表（英文统一小写）
+    """
+    if not text:
+        return []
+
+    tokens: List[str] = []
+    if JIEBA_AVAILABLE:
+        words = jieba.lcut_for_search(text) if for_search else jieba.lcut(text)
+        for word in words:
+            word = word.strip().lower()
+            if word and _TOKEN_RE.fullmatch(word):
+                tokens.append(word)
+    else:
+        for match in _TOKEN_RE.finditer(text):
+            word = match.group(0)
+            if _CJK_RUN_RE.fullmatch(word):
+                tokens.extend(_bigram_tokens(word))
+            else:
+                tokens.append(word.lower())
+
+    if keep_stopwords:
+        return tokens
+    return [t for t in tokens if t not in STOPWORDS]